@@ -0,0 +1,5 @@
+"""CPU benchmarks for the GP wrappers.
+
+Run ``python -m benchmarks.run --help`` from the repository root.
+
+"""
@@ -0,0 +1,135 @@
+"""A/B benchmark of data-driven hyperparameter initialization.
+
+Every case is fitted twice on the same data, with the default
+hyperparameters of the module (A) and with ``init_hyperparameters=True``
+(B), and the number of epochs each fit needs to reach a target
+training loss (the negative marginal log likelihood) is recorded. By
+default the target is the final loss of A after ``--max-epochs``
+epochs, i.e. B's count shows how many epochs it needs to get as far as
+A; a fit that never reaches the target counts as ``None``.
+
+The default hyperparameters suit data in unit range, so the inputs and
+targets of the synthetic data are scaled with ``--x-scale`` and
+``--y-scale`` (and shifted by ``--y-offset``) to mimic data in its
+original units.
+
+Examples
+--------
+::
+
+    python -m benchmarks.init_ab --x-scale 50 --y-scale 20 --y-offset 100
+
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from benchmarks import models
+from benchmarks.run import FAMILIES
+from benchmarks.run import environment
+from benchmarks.run import module_params
+
+
+AB_FAMILIES = ["exact_regression", "variational_regression"]
+
+
+def epochs_to_target(losses, target):
+    """Return the first (1-based) epoch whose loss is at most
+    ``target``, or None."""
+    reached = np.flatnonzero(np.asarray(losses) <= target)
+    return int(reached[0]) + 1 if len(reached) else None
+
+
+def fit_losses(case, init, args):
+    family = FAMILIES[case["family"]]
+    X, y = models.make_data(case["n_samples"], case["n_dims"])
+    X = X * args.x_scale
+    y = y * args.y_scale + args.y_offset
+    net = family["estimator"](
+        module=family["module"],
+        batch_size=case["batch_size"],
+        max_epochs=args.max_epochs,
+        lr=args.lr,
+        train_split=None,
+        verbose=0,
+        init_hyperparameters=init,
+        **module_params(family, case["n_dims"])
+    )
+    net.fit(X, y)
+    return [float(loss) for loss in net.history[:, "train_loss"]]
+
+
+def run_ab(case, args):
+    """Fit ``case`` with and without data-driven initialization and
+    return the epochs to the target loss."""
+    losses_a = fit_losses(case, False, args)
+    losses_b = fit_losses(case, True, args)
+    target = args.target_loss if args.target_loss is not None else losses_a[-1]
+    return {
+        **case,
+        "target_loss": target,
+        "default_epochs": epochs_to_target(losses_a, target),
+        "default_final_loss": losses_a[-1],
+        "data_init_epochs": epochs_to_target(losses_b, target),
+        "data_init_final_loss": losses_b[-1],
+    }
+
+
+def format_result(result):
+    return (
+        "{family:<24} n={n_samples:<6} d={n_dims:<3} target={target_loss:10.4g} "
+        "default: {default_epochs!s:>5} epochs (final {default_final_loss:10.4g})  "
+        "data init: {data_init_epochs!s:>5} epochs (final {data_init_final_loss:10.4g})"
+    ).format(**result)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", nargs="+", default=AB_FAMILIES, choices=AB_FAMILIES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[500, 2000])
+    parser.add_argument("--dims", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--batch-size", type=int, default=256,
+                        help="minibatch size for the variational family")
+    parser.add_argument("--max-epochs", type=int, default=100)
+    parser.add_argument("--lr", type=float, default=0.1)
+    parser.add_argument("--target-loss", type=float,
+                        help="fixed target loss instead of the final loss of the default fit")
+    parser.add_argument("--x-scale", type=float, default=10.0)
+    parser.add_argument("--y-scale", type=float, default=10.0)
+    parser.add_argument("--y-offset", type=float, default=0.0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    results = []
+    for family_name in args.families:
+        for n_dims in args.dims:
+            for n_samples in args.sizes:
+                case = {
+                    "family": family_name,
+                    "n_samples": n_samples,
+                    "n_dims": n_dims,
+                    "batch_size": args.batch_size if FAMILIES[family_name]["minibatch"] else -1,
+                }
+                result = run_ab(case, args)
+                print(format_result(result), flush=True)
+                results.append(result)
+
+    if args.output:
+        report = {
+            "environment": environment(),
+            "settings": {k: v for k, v in vars(args).items() if k != "output"},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
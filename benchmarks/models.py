@@ -0,0 +1,42 @@
+"""GP models and synthetic data used by the benchmarks.
+
+The models are the defaults of :mod:`gpwrapper.models`, one per module
+type handled in ``GaussianProcess.initialize_module``. The grid models
+take the grid as ``module__`` parameters, see ``FAMILIES`` in
+:mod:`benchmarks.run`; they are None for gpytorch versions without
+grid-inducing variational GPs.
+
+"""
+
+import math
+
+import torch
+
+from gpwrapper.models import AdditiveGridInducingModel
+from gpwrapper.models import ExactGPModel
+from gpwrapper.models import GridInducingModel
+from gpwrapper.models import VariationalGPModel
+
+
+__all__ = [
+    "AdditiveGridInducingModel",
+    "ExactGPModel",
+    "GridInducingModel",
+    "VariationalGPModel",
+    "make_data",
+]
+
+
+def make_data(n_samples, n_dims, classification=False, seed=0):
+    """Return inputs in [-1, 1]^d and noisy targets of a smooth function.
+
+    For classification, the targets are the signs (-1 or 1) of the
+    function values.
+
+    """
+    gen = torch.Generator().manual_seed(seed)
+    X = torch.rand(n_samples, n_dims, generator=gen).mul(2).sub(1)
+    f = torch.sin(X.sum(-1) * math.pi)
+    if classification:
+        return X, torch.sign(f + 1e-6)
+    return X, f + torch.randn(n_samples, generator=gen) * 0.1
@@ -0,0 +1,307 @@
+"""Benchmark fit and predict of the GP wrappers on synthetic data.
+
+Every combination of model family, number of samples, input dimension
+and batch size is run in a fresh process so that the peak memory of
+one case does not leak into the next. For each case the benchmark
+records the wall time per training epoch, the predict latency and
+throughput, and the peak resident memory.
+
+Examples
+--------
+Run the default grid and write the results::
+
+    python -m benchmarks.run --output results.json
+
+Compare a new run against a previous one; the exit status is 1 if any
+metric got slower (or bigger) by more than the tolerance::
+
+    python -m benchmarks.run --baseline results.json --tolerance 0.25
+
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+from queue import Empty
+import sys
+import time
+
+import numpy as np
+import torch
+
+import gpytorch
+import gpwrapper
+from benchmarks import models
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+FAMILIES = {
+    "exact_regression": {
+        "estimator": gpwrapper.ExactGaussianProcessRegressor,
+        "module": models.ExactGPModel,
+        "classification": False,
+        "minibatch": False,
+    },
+    "variational_regression": {
+        "estimator": gpwrapper.VariationalGaussianProcessRegressor,
+        "module": models.VariationalGPModel,
+        "classification": False,
+        "minibatch": True,
+    },
+    "variational_classification": {
+        "estimator": gpwrapper.VariationalGaussianProcessClassifier,
+        "module": models.VariationalGPModel,
+        "classification": True,
+        "minibatch": True,
+    },
+    "grid_inducing_regression": {
+        "estimator": gpwrapper.VariationalGaussianProcessRegressor,
+        "module": models.GridInducingModel,
+        "module_params": lambda n_dims: {
+            "grid_size": 32,
+            "grid_bounds": [(-2, 2)] * n_dims,
+        },
+        "classification": False,
+        "minibatch": True,
+        # the grid has grid_size ** n_dims points
+        "max_dims": 2,
+    },
+    "additive_grid_inducing_classification": {
+        "estimator": gpwrapper.VariationalGaussianProcessClassifier,
+        "module": models.AdditiveGridInducingModel,
+        "module_params": lambda n_dims: {
+            "grid_size": 64,
+            "grid_bounds": (-2, 2),
+            "n_components": n_dims,
+        },
+        "classification": True,
+        "minibatch": True,
+    },
+}
+# the grid models are missing in later gpytorch versions
+FAMILIES = {name: family for name, family in FAMILIES.items() if family["module"]}
+
+# metrics where larger values are worse, compared in baseline mode
+COMPARED_METRICS = ["fit_time_per_epoch_s", "predict_latency_s", "peak_rss_mb"]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if sys.platform == "darwin":
+        return peak / 2 ** 20
+    return peak / 2 ** 10
+
+
+def module_params(family, n_dims):
+    """Return the ``module__`` parameters of ``family`` for
+    ``n_dims``-dimensional inputs."""
+    params = family.get("module_params", lambda n_dims: {})(n_dims)
+    return {"module__" + key: val for key, val in params.items()}
+
+
+def run_case(case, epochs, n_test, repeats, threads):
+    """Fit and predict a single case and return the measurements."""
+    if threads:
+        torch.set_num_threads(threads)
+    family = FAMILIES[case["family"]]
+    X, y = models.make_data(
+        case["n_samples"], case["n_dims"], classification=family["classification"]
+    )
+    X_test, _ = models.make_data(n_test, case["n_dims"], seed=1)
+
+    net = family["estimator"](
+        module=family["module"],
+        batch_size=case["batch_size"],
+        max_epochs=epochs,
+        train_split=None,
+        verbose=0,
+        **module_params(family, case["n_dims"])
+    )
+    result = {"rss_before_fit_mb": _peak_rss_mb()}
+
+    tic = time.perf_counter()
+    net.fit(X, y)
+    result["fit_time_s"] = time.perf_counter() - tic
+    result["fit_time_per_epoch_s"] = float(np.mean(net.history[:, "dur"]))
+    result["n_batches_per_epoch"] = len(net.history[-1, "batches"])
+
+    def predict():
+        if family["classification"]:
+            return net.predict(X_test)
+        return net.predict_mean_var(X_test)
+
+    # fit builds the prediction caches; the first call is still timed
+    # on its own since it includes one-off costs such as allocations
+    tic = time.perf_counter()
+    predict()
+    result["first_predict_latency_s"] = time.perf_counter() - tic
+
+    latencies = []
+    for _ in range(repeats):
+        tic = time.perf_counter()
+        predict()
+        latencies.append(time.perf_counter() - tic)
+    result["predict_latency_s"] = float(np.median(latencies))
+    result["predict_throughput"] = n_test / result["predict_latency_s"]
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _run_case_in_child(queue, *args):
+    try:
+        queue.put({"status": "ok", **run_case(*args)})
+    except Exception as exc:  # pylint: disable=broad-except
+        queue.put({"status": "error", "error": "{}: {}".format(type(exc).__name__, exc)})
+
+
+def run_isolated(case, epochs, n_test, repeats, threads, timeout):
+    """Run ``run_case`` in a new process and return its result."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(
+        target=_run_case_in_child, args=(queue, case, epochs, n_test, repeats, threads)
+    )
+    proc.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=min(1.0, max(deadline - time.monotonic(), 0)))
+        except Empty:
+            if not proc.is_alive():
+                # the child may have put its result just before exiting
+                try:
+                    result = queue.get(timeout=1.0)
+                except Empty:
+                    result = {
+                        "status": "error",
+                        "error": "crashed with exit code {}".format(proc.exitcode),
+                    }
+            elif time.monotonic() >= deadline:
+                proc.terminate()
+                result = {
+                    "status": "error",
+                    "error": "timed out after {}s".format(timeout),
+                }
+    proc.join()
+    return {**case, **result}
+
+
+def iter_cases(families, sizes, dims, batch_sizes):
+    for family_name in families:
+        family = FAMILIES[family_name]
+        for n_dims in dims:
+            if n_dims > family.get("max_dims", n_dims):
+                continue
+            for n_samples in sizes:
+                for batch_size in batch_sizes if family["minibatch"] else [-1]:
+                    yield {
+                        "family": family_name,
+                        "n_samples": n_samples,
+                        "n_dims": n_dims,
+                        "batch_size": batch_size,
+                    }
+
+
+def case_key(result):
+    return (result["family"], result["n_samples"], result["n_dims"], result["batch_size"])
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of ``(case, metric, old, new)`` regressions."""
+    old_results = {case_key(r): r for r in baseline["results"] if r["status"] == "ok"}
+    regressions = []
+    for result in results:
+        old = old_results.get(case_key(result))
+        if old is None or result["status"] != "ok":
+            continue
+        for metric in COMPARED_METRICS:
+            if old.get(metric) is None or result.get(metric) is None:
+                continue
+            if result[metric] > old[metric] * (1 + tolerance):
+                regressions.append((case_key(result), metric, old[metric], result[metric]))
+    return regressions
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "torch": torch.__version__,
+        "gpytorch": getattr(gpytorch, "__version__", "unknown"),
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def format_result(result):
+    head = "{family:<38} n={n_samples:<7} d={n_dims:<3} bs={batch_size:<6}".format(**result)
+    if result["status"] != "ok":
+        return head + " " + result["error"]
+    return head + (
+        " epoch={fit_time_per_epoch_s:8.4f}s predict={predict_latency_s:8.4f}s "
+        "({predict_throughput:10.0f}/s) peak_rss={peak_rss_mb}MB"
+    ).format(**result)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", nargs="+", default=list(FAMILIES), choices=list(FAMILIES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[500, 1000, 2000, 4000])
+    parser.add_argument("--dims", nargs="+", type=int, default=[1, 2, 8])
+    parser.add_argument(
+        "--batch-sizes", nargs="+", type=int, default=[256, 1024],
+        help="minibatch sizes for the variational families (exact GPs always use -1)",
+    )
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--n-test", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0, help="torch threads, 0 for the default")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds per case")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    results = []
+    for case in iter_cases(args.families, args.sizes, args.dims, args.batch_sizes):
+        result = run_isolated(
+            case, args.epochs, args.n_test, args.repeats, args.threads, args.timeout
+        )
+        print(format_result(result), flush=True)
+        results.append(result)
+
+    report = {
+        "environment": environment(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for key, metric, old, new in regressions:
+        print("REGRESSION {} {}: {:.4g} -> {:.4g} ({:+.0%})".format(
+            key, metric, old, new, new / old - 1))
+    if not regressions:
+        print("No regressions against {} (tolerance {:.0%}).".format(args.baseline, args.tolerance))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
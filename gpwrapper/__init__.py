@@ -1,17 +1,22 @@
 """Neural net classes."""
 
+import asyncio
 import fnmatch
 from itertools import chain
 import json
+import math
 import re
 import tempfile
 import warnings
+import weakref
 
 import numpy as np
 from sklearn.base import BaseEstimator
+from sklearn.base import clone
 import torch
 from torch.utils.data import DataLoader
 
+from skorch.callbacks import Callback
 from skorch.callbacks import EpochTimer
 from skorch.callbacks import PrintLog
 from skorch.callbacks import EpochScoring
@@ -25,13 +30,35 @@ from skorch.exceptions import NotInitializedError
 from skorch.history import History
 from skorch.utils import duplicate_items
 from skorch.utils import is_dataset
+from skorch.utils import is_pandas_ndframe
 from skorch.utils import noop
 from skorch.utils import open_file_like
 from skorch.utils import params_for
+from skorch.utils import to_numpy
+from skorch.utils import to_tensor
 
 import gpytorch
 import inspect
 
+from gpwrapper.artifact import load_artifact
+from gpwrapper.artifact import save_artifact
+from gpwrapper.dataset import BlockShuffleLoader
+from gpwrapper.dataset import ChunkedDataset
+from gpwrapper.dataset import PrefetchIterator
+from gpwrapper.dataset import unwrap_subset
+from gpwrapper.history import ColumnarHistory
+from gpwrapper.hyperparameters import initialize_from_data
+from gpwrapper.inducing import select_inducing_points
+from gpwrapper.parallel import fit_restarts
+from gpwrapper.parallel import predict_sharded
+from gpwrapper.parallel import shared_empty
+from gpwrapper.serving import PredictionService
+from gpwrapper.utils import InputConverter
+from gpwrapper.utils import NoPhaseTimer
+from gpwrapper.utils import PhaseTimer
+from gpwrapper.utils import TensorExport
+from gpwrapper.utils import get_torch_dtype
+
 
 # pylint: disable=unused-argument
 def train_loss_score(net, X=None, y=None):
@@ -43,6 +70,191 @@ def valid_loss_score(net, X=None, y=None):
     return net.history[-1, "batches", -1, "valid_loss"]
 
 
+class _EpochBatchScoring(BatchScoring):
+    """``BatchScoring`` that only records epochs whose own batches have
+    the score, e.g. not the epochs without scores of
+    ``loo_validation=k``. History lookups of batch keys fall back to
+    the last epoch that has them, which would repeat stale scores."""
+
+    def on_epoch_end(self, net, **kwargs):
+        batches = net.history[-1, "batches"]
+        if hasattr(batches, "contains"):  # a ColumnarHistory batch table
+            scored = batches.contains(slice(None), self.name_)
+        else:
+            scored = any(self.name_ in batch for batch in batches)
+        if scored:
+            super(_EpochBatchScoring, self).on_epoch_end(net, **kwargs)
+
+
+# GaussianRandomVariable exposes mean() and var() as methods, while
+# MultivariateNormal exposes mean and variance as properties.
+def _mean(distribution):
+    mean = distribution.mean
+    return mean() if callable(mean) else mean
+
+
+def _variance(distribution):
+    var = getattr(distribution, "var", None)
+    return var() if callable(var) else distribution.variance
+
+
+def _covariance(distribution):
+    covar = getattr(distribution, "covar", None)
+    covar = covar() if callable(covar) else distribution.covariance_matrix
+    return covar.evaluate() if hasattr(covar, "evaluate") else covar
+
+
+def _cholesky(matrix):
+    linalg = getattr(torch, "linalg", None)
+    if linalg is not None and hasattr(linalg, "cholesky"):
+        return linalg.cholesky(matrix)
+    return torch.cholesky(matrix)
+
+
+def _inverse_lower_triangular(matrix):
+    eye = torch.eye(matrix.shape[-1], dtype=matrix.dtype, device=matrix.device)
+    eye = eye.expand_as(matrix)
+    linalg = getattr(torch, "linalg", None)
+    if linalg is not None and hasattr(linalg, "solve_triangular"):
+        return linalg.solve_triangular(matrix, eye, upper=False)
+    return torch.triangular_solve(eye, matrix, upper=False)[0]
+
+
+# number of training samples above which loo_validation warns about
+# the cost of the scores
+LOO_WARN_SAMPLES = 10000
+
+# bytes of the covariance between the conditioning points and one chunk
+# that the default chunk size of the chunked predictions is sized to
+PREDICTION_CHUNK_BYTES = 2 ** 27
+
+
+def loo_scores(marginal, y):
+    """Return the leave-one-out negative log predictive density and
+    mean squared error of a Gaussian process.
+
+    ``marginal`` is the marginal distribution N(m, K) of the training
+    targets ``y``. Leaving out the i-th point, the predictive mean is
+    ``y_i - [K^-1 (y - m)]_i / [K^-1]_ii`` and the predictive variance
+    is ``1 / [K^-1]_ii`` (Rasmussen & Williams, 2006, eq. 5.12), so
+    all n scores follow from a single Cholesky factorization
+    ``K = L L^T``: ``K^-1 (y - m)`` is one solve with the factor, and
+    ``[K^-1]_ii`` is the squared norm of the i-th column of ``L^-1``.
+
+    The factorization is computed in float64 and takes ``O(n^3)`` time
+    and two ``n x n`` float64 buffers (the factor and its inverse).
+
+    """
+    with torch.no_grad():
+        covar = _covariance(marginal).double()
+        # batches of GPs (see ``fit_many``) have covar of shape (b, n, n)
+        shape = covar.shape[:-1]
+        residual = y.reshape(shape) - _mean(marginal).reshape(shape)
+        chol = _cholesky(covar)
+        del covar
+        alpha = torch.cholesky_solve(residual.double().unsqueeze(-1), chol)
+        alpha = alpha.squeeze(-1)
+        # K^-1 = L^-T L^-1, so the diagonal of K^-1 holds the column
+        # sums of squares of L^-1; the full K^-1 is never formed
+        inv_diag = _inverse_lower_triangular(chol).pow_(2).sum(-2)
+        loo_residual = alpha / inv_diag
+        nlpd = 0.5 * (math.log(2 * math.pi) - inv_diag.log() + loo_residual * alpha)
+    return nlpd.mean().item(), loo_residual.pow(2).mean().item()
+
+
+def _retarget_optimizer(optimizer, old_module, new_module):
+    """Make ``optimizer`` update the parameters of ``new_module`` in
+    place of the equally named ones of ``old_module``, keeping its
+    state."""
+    if old_module is new_module:
+        return
+    names = {id(param): name for name, param in old_module.named_parameters()}
+    new_params = dict(new_module.named_parameters())
+    state = {}
+    for group in optimizer.param_groups:
+        params = []
+        for param in group["params"]:
+            new_param = new_params.get(names.get(id(param)), param)
+            if param in optimizer.state:
+                state[new_param] = optimizer.state[param]
+            params.append(new_param)
+        group["params"] = params
+    optimizer.state.clear()
+    optimizer.state.update(state)
+
+
+def _overrides(obj, base, hook):
+    """Whether the method ``hook`` of ``obj`` differs from the one of
+    ``base``."""
+    method = getattr(obj, hook)
+    return getattr(method, "__func__", method) is not getattr(base, hook, None)
+
+
+def _skips_hook(callback, hook):
+    """Whether ``callback`` declares its ``hook`` a no-op with its
+    current parameters through an optional ``skips_hook`` method."""
+    skips_hook = getattr(callback, "skips_hook", None)
+    return skips_hook is not None and skips_hook(hook)
+
+
+async def _await_future(future, timeout):
+    """Await the concurrent ``future``; cancelling the awaiting task or
+    timing out cancels ``future`` if it has not started yet."""
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+
+def _accepts_kwarg(cls, name):
+    params = inspect.signature(cls).parameters
+    return name in params or any(
+        param.kind == param.VAR_KEYWORD for param in params.values()
+    )
+
+
+def _batch_kwargs(cls, batch_size):
+    # gpytorch >= 0.1 takes a batch_shape instead of a batch_size and
+    # silently ignores the latter
+    if "batch_shape" in inspect.signature(cls).parameters:
+        return {"batch_shape": torch.Size([batch_size])}
+    return {"batch_size": batch_size}
+
+
+def _check_series_parameters(net, n_series):
+    """Raise a ValueError if a parameter of the module or likelihood of
+    ``net`` is not batched over the ``n_series`` series, which would
+    couple their fits."""
+    for name, param in chain(
+        net.module_.named_parameters(), net.likelihood_.named_parameters()
+    ):
+        if param.dim() == 0 or param.shape[0] != n_series:
+            raise ValueError(
+                "fit_many needs one set of hyperparameters per series, but the "
+                "parameter {} has shape {} instead of a leading dimension of "
+                "{}; pass the batch size on to all means, kernels and "
+                "likelihoods.".format(name, tuple(param.shape), n_series)
+            )
+
+
+def _as_2d(X):
+    return X.unsqueeze(-1) if X.dim() == 1 else X
+
+
+def _pad_rows(X, n_rows):
+    if len(X) == n_rows:
+        return X
+    padding = X[-1:].expand((n_rows - len(X),) + X.shape[1:])
+    return torch.cat([X, padding])
+
+
+def _as_batch_tensor(data):
+    """Return ``data`` as a tensor sharing its memory, or None if the
+    default collation would not produce a single tensor from it."""
+    if isinstance(data, torch.Tensor):
+        return data
+    if isinstance(data, np.ndarray) and data.dtype != np.object_:
+        return torch.from_numpy(data)
+    return None
+
+
 # pylint: disable=too-many-instance-attributes
 class GaussianProcess(object):
     # pylint: disable=anomalous-backslash-in-string
@@ -93,9 +305,14 @@ class GaussianProcess(object):
       The uninitialized criterion (loss) used to optimize the
       module.
 
-    optimizer : torch optim (class, default=torch.optim.SGD)
+    optimizer : torch optim (class, default=torch.optim.Adam)
       The uninitialized optimizer (update rule) used to optimize the
-      module
+      module. Optimizers that re-evaluate the loss, such as
+      :class:`torch.optim.LBFGS`, are supported; for exact GPs,
+      ``optimizer=torch.optim.LBFGS, lr=1,
+      optimizer__line_search_fn='strong_wolfe'`` (torch >= 1.4) with
+      the default ``batch_size=-1`` usually converges in a handful of
+      epochs.
 
     lr : float (default=0.01)
       Learning rate passed to the optimizer. You may use ``lr`` instead
@@ -110,7 +327,8 @@ class GaussianProcess(object):
       ``iterator_train__batch_size`` and ``iterator_test__batch_size``,
       which would result in the same outcome. If ``batch_size`` is -1,
       a single batch with all the data will be used during training
-      and validation.
+      and validation; with the default iterators, that batch is built
+      once per ``fit`` from the data itself (see ``get_full_batch``).
 
     iterator_train : torch DataLoader
       The default PyTorch :class:`~torch.utils.data.DataLoader` used for
@@ -118,7 +336,15 @@ class GaussianProcess(object):
 
     iterator_valid : torch DataLoader
       The default PyTorch :class:`~torch.utils.data.DataLoader` used for
-      validation and test data, i.e. during inference.
+      validation data.
+
+    iterator_test : torch DataLoader
+      The default PyTorch :class:`~torch.utils.data.DataLoader` used for
+      test data, i.e. when a ``Dataset`` is passed to one of the
+      streaming prediction methods. The chunk size used for streaming
+      prediction is taken from ``iterator_test__batch_size``; if that
+      is not set, the chunks are sized to bound their memory, see
+      ``predict_proba_iter``.
 
     dataset : torch Dataset (default=skorch.dataset.Dataset)
       The dataset is necessary for the incoming data to work with
@@ -163,6 +389,62 @@ class GaussianProcess(object):
       tensors will be pushed to cuda tensors before being sent to the
       module.
 
+    time_phases : bool (default=False)
+      Whether to measure the wall time spent in each phase of the fit
+      loop: fetching a batch (``data``), ``infer``, ``get_loss``,
+      ``backward``, the optimizer ``step`` and callback dispatch
+      (``notify``); validation phases are prefixed with ``valid_``.
+      The durations are recorded in the history as ``dur_<phase>``,
+      per batch and summed per epoch, and hence show up in
+      :class:`.PrintLog`.
+
+    dtype : torch dtype, numpy dtype or str (default=torch.float32)
+      The floating point dtype of the module's parameters and of the
+      tensors that input data (``X`` and floating point ``y``) is
+      converted to. Arrays and tensors that already have this dtype
+      are used without copying them; see ``convert_input``.
+
+    n_restarts : int (default=1)
+      Number of times ``fit`` optimizes the hyperparameters, each time
+      starting from a different initialization; the fit with the
+      lowest final training loss is kept. See
+      :func:`gpwrapper.parallel.fit_restarts`.
+
+    n_jobs : int or None (default=1)
+      Number of processes the restarts are distributed over. None or
+      -1 means one per CPU.
+
+    restart_scale : float (default=1.0)
+      Standard deviation of the Gaussian noise added to the raw
+      parameters to initialize the restarts other than the first.
+
+    restart_random_state : int or None (default=None)
+      Seed of the restarts' seeds. If None, it is drawn from torch's
+      global random number generator.
+
+    init_hyperparameters : bool (default=False)
+      Whether to initialize the hyperparameters from the training data
+      before fitting: lengthscales from the pairwise distances of the
+      inputs and, with a Gaussian likelihood, the output scale, noise
+      and constant mean from the targets. Options are passed with the
+      ``init_hyperparameters__`` prefix, e.g.
+      ``init_hyperparameters__quantile=0.25``. See
+      :func:`gpwrapper.hyperparameters.initialize_from_data`. The
+      values are clipped into the bounds of the hyperparameters, with
+      a warning. The default noise bounds of a Gaussian likelihood
+      (``likelihood__log_noise_bounds=(-10, -5)``) would cap the noise
+      at about 0.0067, so they are not applied then; pass the bounds
+      explicitly to keep them.
+
+    prefetch : int (default=0)
+      Number of minibatches that are fetched from the iterators,
+      converted to ``dtype`` and moved to ``device`` on a background
+      thread while the current minibatch trains; 0 fetches them on the
+      training thread. The time the training loop waited for data is
+      recorded in the history as ``prefetch_wait`` (and
+      ``valid_prefetch_wait``) per epoch. See
+      :class:`gpwrapper.dataset.PrefetchIterator`.
+
     Attributes
     ----------
     prefixes\_ : list of str
@@ -175,7 +457,39 @@ class GaussianProcess(object):
       device. If a ``NeuralNet`` trained with a CUDA-enabled device is
       unpickled on a machine without CUDA or with CUDA disabled, the
       listed attributes are mapped to CPU.  Expand this list if you
-      want to add other cuda-dependent attributes.
+      want to add other cuda-dependent attributes. The listed
+      attributes are pickled together, with their tensors exported
+      as numpy arrays (see :class:`gpwrapper.utils.TensorExport`), so
+      that references between them survive pickling and pickle
+      protocol 5 can transfer the tensors out-of-band.
+
+    prediction_cache_attributes\_ : list of str
+      Names of the attributes on ``module_`` in which GPyTorch keeps
+      its test-independent posterior caches (the mean solve and the
+      LOVE variance root). Attributes that the module does not have
+      are ignored.
+
+    prediction_cache\_ : dict or None
+      The posterior caches of ``module_`` captured after the last
+      ``fit``/``partial_fit`` call, together with the key of the
+      parameters and training data they were computed for. ``None``
+      if there is nothing to cache (e.g. for variational models) or
+      the cache was invalidated.
+
+    input_converter\_ : InputConverter
+      Converts the input data according to ``dtype``. Its
+      ``n_shared``, ``n_copied`` and ``bytes_copied`` attributes
+      count how often input data could be used as is and how much of
+      it had to be copied.
+
+    restarts\_ : list of dict
+      If ``n_restarts`` is greater than 1, the seed, final training
+      loss and number of epochs of every restart, and whether it was
+      the one that was kept.
+
+    hyperparameter_init\_ : dict
+      If ``init_hyperparameters`` is True, the values the
+      hyperparameters were initialized to, by name.
 
     initialized\_ : bool
       Whether the :class:`.NeuralNet` was initialized.
@@ -190,18 +504,62 @@ class GaussianProcess(object):
       The complete (i.e. default and other), initialized callbacks, in
       a tuple with unique names.
 
+    callback_dispatch\_ : dict
+      Maps each hook in ``callback_hooks_`` to the bound methods of
+      the net and the callbacks that ``notify`` calls for it, i.e.
+      the ones that are not inherited no-ops.
+
+    prediction_service\_ : PredictionService
+      The service that runs the predictions of ``apredict`` and
+      ``apredict_proba``, created on first use with the parameters
+      prefixed by ``prediction_service__``, e.g.
+      ``prediction_service__max_latency=0.002``. It is not pickled
+      or cloned. Its worker thread is stopped by ``close``, on leaving
+      a ``with`` block of the net, or when the net is garbage
+      collected.
+
     """
     prefixes_ = [
         "module",
         "iterator_train",
         "iterator_valid",
+        "iterator_test",
         "optimizer",
         "criterion",
+        "likelihood",
         "callbacks",
         "dataset",
+        "prediction_service",
+        # not "init_hyperparameters", which is a parameter itself
+        "init_hyperparameters__",
+    ]
+
+    cuda_dependent_attributes_ = [
+        "module_",
+        "likelihood_",
+        "criterion_",
+        "optimizer_",
+        "scheduler_",
     ]
 
-    cuda_dependent_attributes_ = ["module_", "optimizer_"]
+    phase_timer_ = NoPhaseTimer()
+
+    prediction_cache_attributes_ = ["prediction_strategy", "mean_cache", "covar_cache"]
+
+    # the hooks bound by initialize_callback_dispatch, in the order
+    # they are called during training
+    callback_hooks_ = [
+        "on_train_begin",
+        "on_epoch_begin",
+        "on_batch_begin",
+        "on_grad_computed",
+        "on_batch_end",
+        "on_epoch_end",
+        "on_train_end",
+    ]
+
+    # the class of the history created by initialize_history
+    history_cls_ = History
 
     # pylint: disable=too-many-arguments
     def __init__(
@@ -223,6 +581,14 @@ class GaussianProcess(object):
         verbose=1,
         device="cpu",
         scheduler=None,
+        time_phases=False,
+        dtype=torch.float32,
+        n_restarts=1,
+        n_jobs=1,
+        restart_scale=1.0,
+        restart_random_state=None,
+        init_hyperparameters=False,
+        prefetch=0,
         **kwargs
     ):
         self.module = module
@@ -242,6 +608,14 @@ class GaussianProcess(object):
         self.verbose = verbose
         self.device = device
         self.scheduler = scheduler
+        self.time_phases = time_phases
+        self.dtype = dtype
+        self.n_restarts = n_restarts
+        self.n_jobs = n_jobs
+        self.restart_scale = restart_scale
+        self.restart_random_state = restart_random_state
+        self.init_hyperparameters = init_hyperparameters
+        self.prefetch = prefetch
 
         self._check_deprecated_params(**kwargs)
         history = kwargs.pop("history", None)
@@ -283,7 +657,7 @@ class GaussianProcess(object):
             ),
             (
                 "valid_loss",
-                BatchScoring(
+                _EpochBatchScoring(
                     valid_loss_score, name="valid_loss", target_extractor=noop
                 ),
             ),
@@ -304,11 +678,29 @@ class GaussianProcess(object):
         * on_epoch_end
         * on_batch_begin
         * on_batch_end
+        * on_grad_computed
+
+        Only the methods bound in ``callback_dispatch_`` are called,
+        i.e. hooks that the net or a callback does not override are
+        skipped.
 
         """
-        getattr(self, method_name)(self, **cb_kwargs)
-        for _, cb in self.callbacks_:
-            getattr(cb, method_name)(self, **cb_kwargs)
+        try:
+            methods = self.callback_dispatch_[method_name]
+        except (AttributeError, KeyError):
+            # e.g. a hook that is not in callback_hooks_
+            methods = [getattr(self, method_name)]
+            methods += [getattr(cb, method_name) for _, cb in self.callbacks_]
+        for method in methods:
+            method(self, **cb_kwargs)
+
+    def has_subscribers(self, method_name):
+        """Whether ``notify(method_name, ...)`` calls any method; use it
+        to skip computing arguments nobody would receive."""
+        dispatch = getattr(self, "callback_dispatch_", None)
+        if dispatch is None or method_name not in dispatch:
+            return True
+        return bool(dispatch[method_name])
 
     # pylint: disable=unused-argument
     def on_train_begin(self, net, **kwargs):
@@ -416,6 +808,37 @@ class GaussianProcess(object):
             callbacks_.append((name, cb))
 
         self.callbacks_ = callbacks_
+        self.initialize_callback_dispatch()
+        return self
+
+    def initialize_callback_dispatch(self):
+        """Bind the hooks in ``callback_hooks_`` of the net and of the
+        callbacks that do something, and save them in the
+        ``callback_dispatch_`` attribute.
+
+        ``notify`` calls only these methods, so no time is spent on
+        the hooks that ``Callback`` (and ``GaussianProcess``) implement
+        as no-ops, most of which are called for every batch. A
+        callback whose hook is a no-op for some of its parameters can
+        leave it out by returning True from ``skips_hook(hook)``; the
+        dispatch is rebuilt when callbacks or their parameters are set
+        with ``set_params``.
+
+        """
+        dispatch = {}
+        for hook in self.callback_hooks_:
+            methods = []
+            # the net's own on_epoch_begin and on_batch_begin add rows
+            # to the history; its other hooks do nothing by default
+            if hook in ("on_epoch_begin", "on_batch_begin") or _overrides(
+                self, GaussianProcess, hook
+            ):
+                methods.append(getattr(self, hook))
+            for _, cb in self.callbacks_:
+                if _overrides(cb, Callback, hook) and not _skips_hook(cb, hook):
+                    methods.append(getattr(cb, hook))
+            dispatch[hook] = methods
+        self.callback_dispatch_ = dispatch
         return self
 
     def initialize_criterion(self, X, y):
@@ -449,12 +872,16 @@ class GaussianProcess(object):
             self.likelihood_ = self.likelihood
             return
 
+        kwargs = self._get_params_for("likelihood")
         if self.likelihood == gpytorch.likelihoods.BernoulliLikelihood:
-            self.likelihood_ = self.likelihood()
+            self.likelihood_ = self.likelihood(**kwargs)
         elif self.likelihood == gpytorch.likelihoods.GaussianLikelihood:
-            self.likelihood_ = self.likelihood(log_noise_bounds=(-10, -5))
+            if not self.init_hyperparameters:
+                # the noise estimated from the data is mostly above these
+                kwargs.setdefault("log_noise_bounds", (-10, -5))
+            self.likelihood_ = self.likelihood(**kwargs)
         elif self.likelihood == gpytorch.likelihoods.SoftmaxLikelihood:
-            self.likeliihod_ = self.likelihood()  # under construction
+            self.likeliihod_ = self.likelihood(**kwargs)  # under construction
         else:
             raise RuntimeError("Unrecognizable likelihood!")
 
@@ -467,23 +894,24 @@ class GaussianProcess(object):
         """
 
         self.initialize_likelihood()
+        kwargs = self._get_params_for("module")
         if not inspect.isclass(self.module):  # already initialized module
             self.module_ = self.module
 
         elif issubclass(self.module, gpytorch.models.exact_gp.ExactGP):
-            self.module_ = self.module(X, y, self.likelihood_)
+            self.module_ = self.module(X, y, self.likelihood_, **kwargs)
         elif issubclass(self.module, gpytorch.models.variational_gp.VariationalGP):
-            self.module_ = self.module(X)
+            self.module_ = self.module(X, **kwargs)
         elif issubclass(
             self.module,
             gpytorch.models.grid_inducing_variational_gp.GridInducingVariationalGP,
         ):
-            self.module_ = self.module()
+            self.module_ = self.module(**kwargs)
         elif issubclass(
             self.module,
             gpytorch.models.additive_grid_inducing_variational_gp.AdditiveGridInducingVariationalGP,
         ):
-            self.module_ = self.module()
+            self.module_ = self.module(**kwargs)
         else:
             raise RuntimeError("Unrecognized model type!")
         """
@@ -499,12 +927,41 @@ class GaussianProcess(object):
 
             module = module(**kwargs)
         """
+        dtype = get_torch_dtype(self.dtype)
+        self.module_ = self.module_.to(dtype=dtype)
+        self.likelihood_ = self.likelihood_.to(dtype=dtype)
         if self.device == "gpu":
             self.module_ = self.module_.cuda()
         else:
             self.module_ = self.module_
         return self
 
+    def initialize_hyperparameters(self, X, y=None):
+        """Initializes the hyperparameters of the module and the
+        likelihood from the training data if ``init_hyperparameters``
+        is True.
+
+        Only inputs that are a single 1- or 2-dimensional array are
+        supported; for others, a warning is issued and the defaults of
+        the module are kept.
+
+        """
+        if not self.init_hyperparameters or X is None:
+            return self
+        X = self.convert_input(X)
+        y = self.convert_input(y, target=True)
+        if not isinstance(X, torch.Tensor) or X.dim() > 2:
+            warnings.warn(
+                "init_hyperparameters only supports a single 1- or 2-dimensional "
+                "input; keeping the default hyperparameters."
+            )
+            return self
+        kwargs = self._get_params_for("init_hyperparameters")
+        self.hyperparameter_init_ = initialize_from_data(
+            self.module_, self.likelihood_, X, y, **kwargs
+        )
+        return self
+
     def initialize_optimizer(self):
         """Initialize the model optimizer. If ``self.optimizer__lr``
         is not set, use ``self.lr`` instead.
@@ -522,6 +979,12 @@ class GaussianProcess(object):
         else:
             self.optimizer_ = self.optimizer
 
+        if isinstance(self.optimizer_, torch.optim.LBFGS) and self.batch_size != -1:
+            warnings.warn(
+                "LBFGS assumes a deterministic objective but batch_size is {}; "
+                "use batch_size=-1 to train on the full batch.".format(self.batch_size)
+            )
+
     def initialize_scheduler(self):
         if inspect.isclass(self.scheduler):
             self.scheduler_ = torch.optim.lr_scheduler.MultiStepLR(
@@ -532,7 +995,7 @@ class GaussianProcess(object):
 
     def initialize_history(self):
         """Initializes the history."""
-        self.history = History()
+        self.history = self.history_cls_()
 
     def initialize(self, X=None, y=None):
         """Initializes all components of the :class:`.NeuralNet` and
@@ -541,14 +1004,113 @@ class GaussianProcess(object):
         """
         self.initialize_callbacks()
         self.initialize_module(X, y)
+        self.initialize_hyperparameters(X, y)
         self.initialize_criterion(X, y)
         self.initialize_optimizer()
         self.initialize_scheduler()
         self.initialize_history()
+        self.prediction_cache_ = None
 
         self.initialized_ = True
         return self
 
+    def initialize_prediction_cache(self):
+        """Computes the test-independent posterior caches of an exact
+        GP and stores them in the ``prediction_cache_`` attribute.
+
+        The caches (the solve against the training targets and the
+        LOVE root of the training covariance) only depend on the
+        module's parameters and training data, so they are computed
+        once here instead of on every ``predict_proba`` call.
+
+        """
+        self.prediction_cache_ = None
+        train_inputs = getattr(self.module_, "train_inputs", None)
+        if not isinstance(self.module_, gpytorch.models.exact_gp.ExactGP) or not train_inputs:
+            return self
+
+        attributes = [
+            attr for attr in self.prediction_cache_attributes_ if hasattr(self.module_, attr)
+        ]
+        self.module_.eval()
+        self.likelihood_.eval()
+        for attr in attributes:
+            setattr(self.module_, attr, None)
+
+        # a posterior call on a single training point populates the caches
+        with torch.no_grad(), gpytorch.fast_pred_var():
+            self.module_(*(x.narrow(-2, 0, 1) for x in train_inputs))
+
+        self._store_prediction_cache()
+        return self
+
+    def _store_prediction_cache(self):
+        """Store the caches currently held by ``module_``."""
+        self.prediction_cache_ = {
+            "key": self._get_prediction_cache_key(),
+            "state": {
+                attr: getattr(self.module_, attr)
+                for attr in self.prediction_cache_attributes_
+                if hasattr(self.module_, attr)
+            },
+        }
+
+    def _get_prediction_cache_key(self):
+        # The version counter of a tensor is bumped by every in-place
+        # modification (optimizer steps, load_state_dict), and
+        # set_train_data replaces the training tensors altogether.
+        tensors = chain(
+            getattr(self.module_, "train_inputs", None) or (),
+            [getattr(self.module_, "train_targets", None)],
+            self.module_.parameters(),
+            self.likelihood_.parameters(),
+        )
+        return tuple((id(t), t._version) for t in tensors if t is not None)
+
+    def _load_prediction_cache(self):
+        """Make ``module_`` use the cached posterior, rebuilding the
+        cache first if the parameters or the training data changed
+        since it was computed.
+
+        """
+        cache = getattr(self, "prediction_cache_", None)
+        if cache is None or cache["key"] != self._get_prediction_cache_key():
+            self.initialize_prediction_cache()
+            cache = self.prediction_cache_
+        if cache is None:
+            return
+        for attr, val in cache["state"].items():
+            setattr(self.module_, attr, val)
+
+    def convert_input(self, data, target=False):
+        """Convert input data to tensors of dtype ``self.dtype``.
+
+        numpy arrays (including ``np.memmap``), tensors, pandas
+        objects and lists, tuples or dicts of those are supported;
+        other data, e.g. a ``Dataset``, is returned unchanged. Data
+        that already has the right dtype is not copied. Integer and
+        boolean parts of a tuple or list after the first one, e.g. the
+        task indices of an ``IndexKernel``, keep their dtype.
+
+        Parameters
+        ----------
+        data : input data
+          The data to convert.
+
+        target : bool (default=False)
+          Whether ``data`` is the target. Integer targets, e.g. class
+          labels, keep their dtype.
+
+        """
+        return self._get_input_converter()(data, keep_integer=target)
+
+    def _get_input_converter(self):
+        dtype = get_torch_dtype(self.dtype)
+        converter = getattr(self, "input_converter_", None)
+        if converter is None or converter.dtype != dtype:
+            converter = self.input_converter_ = InputConverter(dtype)
+        return converter
+
     def check_data(self, X, y=None):
         pass
 
@@ -576,13 +1138,14 @@ class GaussianProcess(object):
         self.likelihood_.eval()
 
         with torch.no_grad():
-            y_pred = self.infer(Xi, **fit_params)
-            loss = self.get_loss(y_pred, yi, X=Xi, training=False)
+            with self.phase_timer_("valid_infer"):
+                y_pred = self.infer(Xi, **fit_params)
+            with self.phase_timer_("valid_get_loss"):
+                loss = self.get_loss(y_pred, yi, X=Xi, training=False)
         return {"loss": loss, "y_pred": y_pred}
 
-    def train_step(self, Xi, yi, **fit_params):
-        """Perform a forward step using batched data, update module
-        parameters, and return the loss.
+    def train_step_single(self, Xi, yi, **fit_params):
+        """Compute y_pred, loss value, and update net's gradients.
 
         The module is set to be in train mode (e.g. dropout is
         applied).
@@ -600,24 +1163,69 @@ class GaussianProcess(object):
           the module and to the ``self.train_split`` call.
 
         """
-        self.optimizer_.zero_grad()
-        # Xi = Variable(Xi); yi = Variable(yi)
-        y_pred = self.infer(Xi, **fit_params)
-        loss = self.get_loss(y_pred, yi, X=Xi, training=True)
-        loss.backward()
-
-        self.notify(
-            "on_grad_computed", named_parameters=list(self.module_.named_parameters())
-        )
+        timer = self.phase_timer_
+        # validation_step leaves the module in eval mode
+        self.module_.train()
+        self.likelihood_.train()
+        with timer("infer"):
+            y_pred = self.infer(Xi, **fit_params)
+        with timer("get_loss"):
+            loss = self.get_loss(y_pred, yi, X=Xi, training=True)
+        with timer("backward"):
+            loss.backward()
+
+        if self.has_subscribers("on_grad_computed"):
+            with timer("notify"):
+                self.notify(
+                    "on_grad_computed",
+                    named_parameters=list(self.module_.named_parameters()),
+                )
+        return {"loss": loss, "y_pred": y_pred}
+
+    def train_step(self, Xi, yi, **fit_params):
+        """Prepares a loss function callable and passes it to the
+        optimizer, hence performing one optimization step.
+
+        Loss function callable as required by some optimizers (and
+        accepted by all of them):
+        https://pytorch.org/docs/master/optim.html#optimizer-step-closure
+
+        Optimizers such as :class:`torch.optim.LBFGS` call the closure
+        several times per step to re-evaluate the loss; each call
+        computes the gradients anew and notifies ``on_grad_computed``.
+        The returned step is the one of the first call, i.e. the loss
+        before the parameters were updated. The losses of all calls
+        are recorded in the batch history as ``closure_losses``, a
+        list with a single entry for optimizers that call the closure
+        once.
 
-        # print('Iter %d/%d - Loss: %.3f   log_lengthscale: %.3f   log_noise: %.3f' % (
-        #    1 + 1, self.max_epochs, loss.data[0],
-        #    self.module_.covar_module.log_lengthscale.data[0, 0],
-        #    self.module_.likelihood.log_noise.data[0]
-        # ))
+        Parameters
+        ----------
+        Xi : input data
+          A batch of the input data.
 
-        self.optimizer_.step()
-        return {"loss": loss, "y_pred": y_pred}
+        yi : target data
+          A batch of the target data.
+
+        **fit_params : dict
+          Additional parameters passed to the ``forward`` method of
+          the module and to the ``self.train_split`` call.
+
+        """
+        steps = []
+
+        def step_fn():
+            self.optimizer_.zero_grad()
+            step = self.train_step_single(Xi, yi, **fit_params)
+            steps.append(step)
+            return step["loss"]
+
+        with self.phase_timer_("step"):
+            self.optimizer_.step(step_fn)
+        self.history.record_batch(
+            "closure_losses", [step["loss"].item() for step in steps]
+        )
+        return steps[0]
 
     def evaluation_step(self, Xi, training=False):
         """Perform a forward step to produce the output used for
@@ -673,6 +1281,7 @@ class GaussianProcess(object):
         # set train data and label
         if hasattr(self.module_, "set_train_data"):
             self.module_.set_train_data(X, y)
+        self.prediction_cache_ = None
 
         self.module_.train()
         self.likelihood_.train()
@@ -689,38 +1298,73 @@ class GaussianProcess(object):
         y_train_is_ph = uses_placeholder_y(dataset_train)
         y_valid_is_ph = uses_placeholder_y(dataset_valid)
 
+        timer = self.phase_timer_ = PhaseTimer() if self.time_phases else NoPhaseTimer()
+
+        # with a single batch per epoch, skip the iterators altogether
+        train_batch = self.get_full_batch(dataset_train, training=True)
+        valid_batch = None
+        if dataset_valid is not None:
+            valid_batch = self.get_full_batch(dataset_valid, training=False)
+
         for epoch in range(epochs):
             self.notify("on_epoch_begin", **on_epoch_kwargs)
             if self.scheduler is not None:
                 self.scheduler_.step()
 
-            train_loader = self.get_iterator(dataset_train, training=True)
-            for batch_idx, (Xi, yi) in enumerate(train_loader):
+            epoch_durations = {}
+            valid_loader = None
+            if train_batch is not None:
+                train_loader = [train_batch]
+            else:
+                train_loader = self.get_prefetch_iterator(
+                    self.get_iterator(dataset_train, training=True)
+                )
+            for batch_idx, (Xi, yi) in enumerate(timer.iterate(train_loader, "data")):
                 yi_res = yi if not y_train_is_ph else None
-                self.notify("on_batch_begin", X=Xi, y=yi_res, training=True)
+                with timer("notify"):
+                    self.notify("on_batch_begin", X=Xi, y=yi_res, training=True)
                 step = self.train_step(Xi, yi, **fit_params)
                 self.history.record_batch("train_loss", step["loss"].data.item())
                 self.history.record_batch("train_batch_size", get_len(Xi))
-                self.notify("on_batch_end", X=Xi, y=yi_res, training=True, **step)
+                with timer("notify"):
+                    self.notify("on_batch_end", X=Xi, y=yi_res, training=True, **step)
+                self._record_phase_durations(timer.pop(), epoch_durations)
                 # print(
                 #    'Train Epoch: %d [%03d/%03d], Loss: %.6f' % \
                 #    (epoch + 1, batch_idx + 1, len(train_loader), step['loss'].data.item()))
 
-            if dataset_valid is None:
-                self.notify("on_epoch_end", **on_epoch_kwargs)
-                continue
-
-            for Xi, yi in self.get_iterator(dataset_valid, training=False):
-                yi_res = yi if not y_valid_is_ph else None
-                self.notify("on_batch_begin", X=Xi, y=yi_res, training=False)
-                step = self.validation_step(Xi, yi, **fit_params)
-                self.history.record_batch("valid_loss", step["loss"].data.item())
-                self.history.record_batch("valid_batch_size", get_len(Xi))
-                self.notify("on_batch_end", X=Xi, y=yi_res, training=False, **step)
-
+            if dataset_valid is not None:
+                if valid_batch is not None:
+                    valid_loader = [valid_batch]
+                else:
+                    valid_loader = self.get_prefetch_iterator(
+                        self.get_iterator(dataset_valid, training=False)
+                    )
+                for Xi, yi in timer.iterate(valid_loader, "valid_data"):
+                    yi_res = yi if not y_valid_is_ph else None
+                    with timer("valid_notify"):
+                        self.notify("on_batch_begin", X=Xi, y=yi_res, training=False)
+                    step = self.validation_step(Xi, yi, **fit_params)
+                    self.history.record_batch("valid_loss", step["loss"].data.item())
+                    self.history.record_batch("valid_batch_size", get_len(Xi))
+                    with timer("valid_notify"):
+                        self.notify("on_batch_end", X=Xi, y=yi_res, training=False, **step)
+                    self._record_phase_durations(timer.pop(), epoch_durations)
+
+            for phase, duration in epoch_durations.items():
+                self.history.record("dur_" + phase, duration)
+            if isinstance(train_loader, PrefetchIterator):
+                self.history.record("prefetch_wait", train_loader.wait_time)
+            if isinstance(valid_loader, PrefetchIterator):
+                self.history.record("valid_prefetch_wait", valid_loader.wait_time)
             self.notify("on_epoch_end", **on_epoch_kwargs)
         return self
 
+    def _record_phase_durations(self, durations, totals):
+        for phase, duration in durations.items():
+            self.history.record_batch("dur_" + phase, duration)
+            totals[phase] = totals.get(phase, 0.0) + duration
+
     # pylint: disable=unused-argument
     def partial_fit(self, X, y=None, classes=None, **fit_params):
         """Fit the module.
@@ -757,8 +1401,8 @@ class GaussianProcess(object):
           the module and to the ``self.train_split`` call.
 
         """
-        if isinstance(X, np.ndarray):
-            X = torch.from_numpy(X.astype("f"))
+        X = self.convert_input(X)
+        y = self.convert_input(y, target=True)
 
         if not self.initialized_:
             self.initialize(X, y)
@@ -769,6 +1413,7 @@ class GaussianProcess(object):
         except KeyboardInterrupt:
             pass
         self.notify("on_train_end", X=X, y=y)
+        self.initialize_prediction_cache()
         return self
 
     def fit(self, X, y=None, **fit_params):
@@ -802,8 +1447,22 @@ class GaussianProcess(object):
           the module and to the ``self.train_split`` call.
 
         """
-        if isinstance(X, np.ndarray):
-            X = torch.from_numpy(X.astype("f"))
+        X = self.convert_input(X)
+        y = self.convert_input(y, target=True)
+
+        if self.n_restarts > 1:
+            fit_restarts(
+                self,
+                X,
+                y,
+                self.n_restarts,
+                n_jobs=self.n_jobs,
+                scale=self.restart_scale,
+                random_state=self.restart_random_state,
+                **fit_params
+            )
+            self.initialize_prediction_cache()
+            return self
 
         if not self.warm_start or not self.initialized_:
             self.initialize(X, y)
@@ -990,21 +1649,13 @@ class GaussianProcess(object):
         # and regard the decomposed parts as parameters for the model's forward function
         self.module_.eval()
         self.likelihood_.eval()
+        self._load_prediction_cache()
 
+        X = self.convert_input(X)
         if isinstance(X, tuple) or isinstance(X, list):
-            test_x = []
-            for part in X:
-                if isinstance(part, np.ndarray):
-                    p = torch.from_numpy(p.astype("f"))
-                    test_x.append(p)
-                else:
-                    test_x.append(part)
-            observed_pred = self.likelihood_(self.module_(*test_x))
+            observed_pred = self.likelihood_(self.module_(*X))
             return observed_pred
 
-        if isinstance(X, np.ndarray):
-            X = torch.from_numpy(X.astype("f"))
-
         with gpytorch.fast_pred_var():  # TODO: need to change flags due to different situations
             observed_pred = self.likelihood_(self.module_(X))
         return observed_pred
@@ -1037,18 +1688,314 @@ class GaussianProcess(object):
         -------
         y_pred : numpy ndarray
 
+        The predictions are computed chunk by chunk, see
+        ``predict_proba_iter``.
+
         """
+        y_preds = []
+        for y_proba in self.predict_proba_iter(X):
+            if issubclass(
+                self.likelihood_.__class__, gpytorch.likelihoods.BernoulliLikelihood
+            ):
+                y_preds.append(_mean(y_proba).ge(0.5).float().mul(2).sub(1))
+            elif issubclass(
+                self.likelihood_.__class__, gpytorch.likelihoods.SoftmaxLikelihood
+            ):
+                y_preds.append(y_proba.argmax())
+            else:
+                y_preds.append(_mean(y_proba))
+        if not y_preds:
+            return torch.empty(0, dtype=get_torch_dtype(self.dtype))
+        return torch.cat(y_preds)
+
+    def _n_conditioning_points(self):
+        """Return the number of points the predictions are conditioned
+        on: the training samples of exact GPs and the inducing points
+        of variational GPs (1 if there are neither)."""
+        train_inputs = getattr(self.module_, "train_inputs", None)
+        if train_inputs:
+            return max(len(train_inputs[0]), 1)
+        for name, tensor in chain(
+            self.module_.named_parameters(), self.module_.named_buffers()
+        ):
+            if name.endswith("inducing_points") and tensor.dim():
+                return max(len(tensor), 1)
+        return 1
+
+    def _get_chunk_size(self, X, chunk_size=None):
+        if chunk_size is None:
+            chunk_size = self._get_params_for("iterator_test").get("batch_size")
+        if chunk_size is None:
+            # bound the memory of the cross-covariance of each chunk
+            itemsize = torch.empty(0, dtype=get_torch_dtype(self.dtype)).element_size()
+            chunk_size = PREDICTION_CHUNK_BYTES // (
+                self._n_conditioning_points() * itemsize
+            )
+        if chunk_size == -1:
+            chunk_size = get_len(X)
+        return max(chunk_size, 1)
+
+    def _iter_prediction_chunks(self, X, chunk_size=None):
+        """Yield consecutive chunks of ``X``.
+
+        Arrays, memory-mapped arrays and tensors (or lists/tuples of
+        them) are sliced directly, so only one chunk at a time is read
+        and converted. Anything else goes through ``get_dataset`` and
+        ``iterator_test``.
+
+        """
+        parts = X if isinstance(X, (tuple, list)) else [X]
+        if not all(isinstance(part, (np.ndarray, torch.Tensor)) for part in parts):
+            dataset = X if is_dataset(X) else self.get_dataset(X)
+            kwargs = self._get_params_for("iterator_test")
+            kwargs["batch_size"] = self._get_chunk_size(dataset, chunk_size)
+            for Xi, _ in self.iterator_test(dataset, **kwargs):
+                yield Xi
+            return
 
+        chunk_size = self._get_chunk_size(X, chunk_size)
+        for start in range(0, get_len(X), chunk_size):
+            chunk = self.convert_input(
+                [part[start:start + chunk_size] for part in parts]
+            )
+            yield chunk if isinstance(X, (tuple, list)) else chunk[0]
+
+    def predict_proba_iter(self, X, chunk_size=None):
+        """Yield the predictive distribution of ``X`` chunk by chunk.
+
+        In contrast to ``predict_proba``, ``X`` is never pushed through
+        the module at once, so the peak memory is bounded by the chunk
+        size and not by the size of ``X``.
+
+        Parameters
+        ----------
+        X : input data, compatible with skorch.dataset.Dataset
+          Besides the types supported by ``predict_proba``, memory-mapped
+          arrays (``np.memmap``) are read one chunk at a time.
+
+        chunk_size : int or None (default=None)
+          Number of samples per chunk; -1 means a single chunk with all
+          the data. If None, use ``iterator_test__batch_size`` if set,
+          else as many samples as keep the covariance between the
+          training samples (or inducing points) and a chunk within
+          ``PREDICTION_CHUNK_BYTES``.
+
+        Yields
+        ------
+        y_proba : gpytorch random variable
+          The predictive distribution of one chunk.
+
+        """
+        self.module_.eval()
+        self.likelihood_.eval()
+        self._load_prediction_cache()
+
+        for Xi in self._iter_prediction_chunks(X, chunk_size):
+            with torch.no_grad(), gpytorch.fast_pred_var():
+                y_proba = self.likelihood_(self.infer(Xi))
+            yield y_proba
+
+    def predict_iter(self, X, chunk_size=None):
+        """Yield the predictive mean and variance of ``X`` chunk by
+        chunk as numpy arrays. See ``predict_proba_iter`` for the
+        parameters.
+
+        Yields
+        ------
+        mean : numpy ndarray
+          The predictive mean of one chunk.
+
+        var : numpy ndarray
+          The predictive (marginal) variance of one chunk.
+
+        """
+        for y_proba in self.predict_proba_iter(X, chunk_size=chunk_size):
+            # yielding within no_grad would disable the gradients of the
+            # caller until the generator resumes
+            with torch.no_grad():
+                mean, var = to_numpy(_mean(y_proba)), to_numpy(_variance(y_proba))
+            yield mean, var
+
+    def predict_into(self, X, mean_out, var_out=None, chunk_size=None, n_jobs=1):
+        """Write the predictive mean (and variance) of ``X`` into
+        preallocated arrays, chunk by chunk. See ``predict_proba_iter``
+        for the parameters.
+
+        The output arrays may be memory-mapped (``np.memmap``) to score
+        data sets whose predictions do not fit into memory either.
+
+        With ``n_jobs`` other than 1, ``X`` is sharded across that many
+        forked processes (None or -1 means one per CPU), see
+        :func:`gpwrapper.parallel.predict_sharded`; the output arrays
+        must then be shared with them, i.e. memory-mapped or created
+        with :func:`gpwrapper.parallel.shared_empty`, or a ValueError is
+        raised.
+
+        Returns
+        -------
+        mean_out, var_out
+          The output arrays that were passed in.
+
+        """
+        if n_jobs != 1:
+            return predict_sharded(
+                self, X, mean_out, var_out, n_jobs=n_jobs, chunk_size=chunk_size
+            )
+        start = 0
+        for mean, var in self.predict_iter(X, chunk_size=chunk_size):
+            stop = start + len(mean)
+            mean_out[start:stop] = mean
+            if var_out is not None:
+                var_out[start:stop] = var
+            start = stop
+        return mean_out, var_out
+
+    def _predict_mean_var(self, X, return_std=False, chunk_size=None, n_jobs=1):
+        if n_jobs != 1 and get_len(X):
+            mean_out, var_out = self._predict_mean_var_sharded(X, chunk_size, n_jobs)
+        else:
+            mean_out = var_out = None
+            start = 0
+            for mean, var in self.predict_iter(X, chunk_size=chunk_size):
+                if mean_out is None:
+                    n_samples = get_len(X)
+                    mean_out = np.empty((n_samples,) + mean.shape[1:], dtype=mean.dtype)
+                    var_out = np.empty((n_samples,) + var.shape[1:], dtype=var.dtype)
+                stop = start + len(mean)
+                mean_out[start:stop] = mean
+                var_out[start:stop] = var
+                start = stop
+            if mean_out is None:
+                # X is empty
+                mean_out = to_numpy(torch.empty(0, dtype=get_torch_dtype(self.dtype)))
+                var_out = mean_out.copy()
+
+        if return_std:
+            # round-off can make tiny variances slightly negative
+            np.clip(var_out, 0, None, out=var_out)
+            np.sqrt(var_out, out=var_out)
+        return mean_out, var_out
+
+    def _predict_mean_var_sharded(self, X, chunk_size, n_jobs):
+        # the shape and dtype of the outputs are only known after a
+        # prediction, which also computes the prediction caches before
+        # the workers are forked
+        X0 = next(self._iter_prediction_chunks(X, chunk_size=1))
+        mean, var = next(self.predict_iter(X0, chunk_size=-1))
+        n_samples = get_len(X)
+        mean_out = shared_empty((n_samples,) + mean.shape[1:], mean.dtype)
+        var_out = shared_empty((n_samples,) + var.shape[1:], var.dtype)
+        return self.predict_into(
+            X, mean_out, var_out, chunk_size=chunk_size, n_jobs=n_jobs
+        )
+
+    def get_prediction_service(self):
+        """Return the :class:`gpwrapper.serving.PredictionService`
+        that serves ``apredict`` and ``apredict_proba``, creating it
+        on first use."""
+        service = getattr(self, "prediction_service_", None)
+        if service is None:
+            # the worker thread only holds a weak reference, so that it
+            # doesn't keep the net alive
+            service = PredictionService(
+                weakref.proxy(self), **self._get_params_for("prediction_service")
+            )
+            self.prediction_service_ = service
+        return service
+
+    def close(self):
+        """Stop the prediction service of ``apredict`` and
+        ``apredict_proba``, if it was started, after answering the
+        requests queued to it. It is started again on the next call.
+
+        The net can also be used as a context manager, which calls
+        ``close`` on exit.
+
+        """
+        service = self.__dict__.pop("prediction_service_", None)
+        if service is not None:
+            service.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        service = self.__dict__.get("prediction_service_")
+        if service is not None:
+            # don't block the garbage collector on the worker
+            service.close(timeout=0)
+
+    async def apredict(self, X, timeout=None):
+        """Coroutine version of ``predict`` for asyncio applications.
+
+        The predictions are computed on the worker thread of the net's
+        prediction service (see ``get_prediction_service``), so the
+        event loop is never blocked. Arrays, tensors and pandas
+        objects of concurrent calls are merged into batched
+        predictions; other input is predicted call by call, in order
+        with the batches.
+
+        Cancelling the awaiting task, or exceeding ``timeout``, drops
+        the request if its prediction has not started yet.
+
+        Parameters
+        ----------
+        X : input data
+          See ``predict``.
+
+        timeout : float or None (default=None)
+          Seconds to wait for the result before raising
+          ``asyncio.TimeoutError``.
+
+        Returns
+        -------
+        y_pred : torch tensor
+
+        """
+        service = self.get_prediction_service()
+        mergeable = isinstance(X, (np.ndarray, torch.Tensor)) or is_pandas_ndframe(X)
+        if not mergeable or issubclass(
+            self.likelihood_.__class__, gpytorch.likelihoods.SoftmaxLikelihood
+        ):
+            return await _await_future(service.run(self.predict, X), timeout)
+
+        mean, _ = await _await_future(service.submit(X), timeout)
+        y_pred = torch.as_tensor(mean)
         if issubclass(
             self.likelihood_.__class__, gpytorch.likelihoods.BernoulliLikelihood
         ):
-            return self.predict_proba(X).mean().detach().ge(0.5).float().mul(2).sub(1)
-        elif issubclass(
-            self.likelihood_.__class__, gpytorch.likelihoods.SoftmaxLikelihood
-        ):
-            return self.predict_proba(X).argmax().detach()
-        else:
-            return self.predict_proba(X).mean().detach()
+            y_pred = y_pred.ge(0.5).float().mul(2).sub(1)
+        return y_pred
+
+    async def apredict_proba(self, X, timeout=None):
+        """Coroutine version of ``predict_proba`` for asyncio
+        applications.
+
+        The joint predictive distribution of ``X`` can't be merged
+        with other requests, so each call is run on its own, on the
+        worker thread of the net's prediction service; see
+        ``apredict`` for ``timeout`` and cancellation. The mean and
+        covariance of a Gaussian predictive distribution are evaluated
+        on the worker thread as well, so the result holds dense
+        tensors instead of lazily evaluated ones.
+
+        """
+        service = self.get_prediction_service()
+        return await _await_future(service.run(self._predict_proba_dense, X), timeout)
+
+    def _predict_proba_dense(self, X):
+        # the mean and the covariance of a Gaussian are evaluated here,
+        # on the service's thread, and not lazily when they are used
+        with torch.no_grad():
+            y_proba = self.predict_proba(X)
+            if hasattr(type(y_proba), "covar") or hasattr(
+                type(y_proba), "covariance_matrix"
+            ):
+                y_proba = type(y_proba)(_mean(y_proba), _covariance(y_proba))
+        return y_proba
 
     # pylint: disable=unused-argument
     def get_loss(self, y_pred, y_true, X=None, training=False):
@@ -1080,7 +2027,15 @@ class GaussianProcess(object):
 
         """
         y_true = to_tensor(y_true, device=self.device)
-        return -self.criterion_(y_pred, y_true)
+        loss = -self.criterion_(y_pred, y_true)
+        if loss.dim() > 0:
+            # a batch of independent GPs (see ``fit_many``): their
+            # objectives are summed so that each one gets its own gradient
+            if training:
+                series_loss = to_numpy(loss.detach()).tolist()
+                self.history.record_batch("series_loss", series_loss)
+            loss = loss.sum()
+        return loss
 
     def get_dataset(self, X, y=None):
         """Get a dataset that contains the input data and is passed to
@@ -1191,6 +2146,14 @@ class GaussianProcess(object):
         ``self.iterator_test__batch_size`` are not set, use
         ``self.batch_size`` instead.
 
+        A :class:`gpwrapper.dataset.ChunkedDataset`, or a subset of one
+        such as the datasets split off by ``train_split``, is iterated
+        over with a :class:`gpwrapper.dataset.BlockShuffleLoader`
+        instead of the default ``DataLoader``, which would read its rows
+        one by one. A ValueError is raised if the dataset's dtype differs
+        from ``dtype`` or if the iterator parameters include ones that
+        only a ``DataLoader`` supports, such as ``num_workers``.
+
         Parameters
         ----------
         dataset : torch Dataset (default=skorch.dataset.Dataset)
@@ -1220,8 +2183,109 @@ class GaussianProcess(object):
         if kwargs["batch_size"] == -1:
             kwargs["batch_size"] = len(dataset)
 
+        source = unwrap_subset(dataset)[0]
+        if isinstance(source, ChunkedDataset) and iterator is DataLoader:
+            prefix = "iterator_train" if training else "iterator_valid"
+            self._check_chunked_dataset(source, prefix, kwargs)
+            iterator = BlockShuffleLoader
         return iterator(dataset, **kwargs)
 
+    def _check_chunked_dataset(self, dataset, prefix, kwargs):
+        dtype = get_torch_dtype(self.dtype)
+        if get_torch_dtype(dataset.dtype) != dtype:
+            raise ValueError(
+                "The ChunkedDataset converts its rows to {}, but the dtype of "
+                "the net is {}; create the dataset with dtype={}.".format(
+                    get_torch_dtype(dataset.dtype), dtype, dtype
+                )
+            )
+        supported = list(inspect.signature(BlockShuffleLoader).parameters)[1:]
+        unsupported = sorted(key for key in kwargs if key not in supported)
+        if unsupported:
+            raise ValueError(
+                "A ChunkedDataset is iterated over with a BlockShuffleLoader, "
+                "which does not support {}; it supports {}. Use the prefetch "
+                "parameter to load batches in the background.".format(
+                    ", ".join("{}__{}".format(prefix, key) for key in unsupported),
+                    ", ".join(supported),
+                )
+            )
+
+    def get_prefetch_iterator(self, iterator):
+        """Wrap ``iterator`` in a :class:`.PrefetchIterator` that
+        prepares ``prefetch`` batches ahead, or return it unchanged if
+        ``prefetch`` is 0."""
+        if not self.prefetch:
+            return iterator
+        # created here so that the worker thread doesn't set it
+        self._get_input_converter()
+        return PrefetchIterator(iterator, self.prefetch, transform=self._prepare_batch)
+
+    def _prepare_batch(self, batch):
+        Xi, yi = batch
+        Xi = to_tensor(self.convert_input(Xi), device=self.device)
+        yi = to_tensor(self.convert_input(yi, target=True), device=self.device)
+        return Xi, yi
+
+    def get_full_batch(self, dataset, training=False):
+        """Return the single batch ``(Xi, yi)`` that iterating over
+        ``dataset`` would yield, or None if that is not possible
+        without going through the iterator.
+
+        For full-batch training (``batch_size=-1``) with the default
+        iterators, collating the rows of a :class:`.Dataset` of
+        tensors or arrays only recovers the data it was built from.
+        In that case the data is returned as is, and the train and
+        validation parts of a contiguous split are returned as views;
+        other splits are gathered once.
+
+        """
+        if training:
+            kwargs = self._get_params_for("iterator_train")
+            iterator = self.iterator_train
+        else:
+            kwargs = self._get_params_for("iterator_valid")
+            iterator = self.iterator_valid
+
+        batch_size = kwargs.pop("batch_size", self.batch_size)
+        kwargs.pop("shuffle", None)
+        if iterator is not DataLoader or kwargs:
+            return None
+        if batch_size != -1 and batch_size < len(dataset):
+            return None
+
+        indices = None
+        if isinstance(dataset, torch.utils.data.Subset):
+            dataset, indices = dataset.dataset, dataset.indices
+        # a Dataset subclass may transform the rows
+        if (
+            type(dataset).__getitem__ is not Dataset.__getitem__
+            or type(dataset).transform is not Dataset.transform
+        ):
+            return None
+
+        Xi = _as_batch_tensor(dataset.X)
+        yi = _as_batch_tensor(dataset.y)
+        if Xi is None or (yi is None and dataset.y is not None):
+            return None
+        if dataset.y is None:
+            # the placeholder that Dataset.transform collates to
+            yi = torch.zeros(len(dataset), 1)
+
+        if indices is not None:
+            indices = np.asarray(indices)
+            if len(indices) == 0:
+                return None
+            start = int(indices[0])
+            if np.array_equal(indices, np.arange(start, start + len(indices))):
+                Xi = Xi.narrow(0, start, len(indices))
+                yi = yi.narrow(0, start, len(indices))
+            else:
+                indices = torch.from_numpy(indices.astype(np.int64))
+                Xi = Xi.index_select(0, indices)
+                yi = yi.index_select(0, indices)
+        return Xi, yi
+
     def _get_params_for(self, prefix):
         return params_for(prefix, self.__dict__)
 
@@ -1257,7 +2321,8 @@ class GaussianProcess(object):
         return [pgroups], kwargs
 
     def _get_param_names(self):
-        return self.__dict__.keys()
+        # the prediction service runs a thread bound to this instance
+        return [key for key in self.__dict__ if key != "prediction_service_"]
 
     def _get_params_callbacks(self, deep=True):
         """sklearn's .get_params checks for `hasattr(value,
@@ -1375,6 +2440,9 @@ class GaussianProcess(object):
                     "which does not exist.".format(part0)
                 )
 
+        # the dispatch holds bound methods of the replaced callbacks,
+        # and changed parameters may change which hooks a callback uses
+        self.initialize_callback_dispatch()
         return self
 
     def _replace_callback(self, name, new_val):
@@ -1388,14 +2456,19 @@ class GaussianProcess(object):
 
     def __getstate__(self):
         state = self.__dict__.copy()
-        for key in self.cuda_dependent_attributes_:
-            if key in state:
-                val = state.pop(key)
-                with tempfile.SpooledTemporaryFile() as f:
-                    torch.save(val, f)
-                    f.seek(0)
-                    state[key] = f.read()
-
+        # the caches reference module_ internals and are rebuilt lazily
+        state.pop("prediction_cache_", None)
+        # bound methods of the callbacks, rebuilt on unpickling
+        state.pop("callback_dispatch_", None)
+        state.pop("prediction_service_", None)
+        # exported together so that e.g. the optimizer keeps
+        # referencing the module's parameters
+        exported = {
+            key: state.pop(key)
+            for key in self.cuda_dependent_attributes_
+            if key in state
+        }
+        state["cuda_dependent_export_"] = TensorExport(exported)
         return state
 
     def __setstate__(self, state):
@@ -1405,8 +2478,14 @@ class GaussianProcess(object):
             return device.startswith("cuda")
 
         disable_cuda = False
+        export = state.pop("cuda_dependent_export_", None)
+        if export is not None:
+            state.update(export.obj)
+            disable_cuda = export.remapped_to_cpu
+
+        # pickles of earlier versions hold torch.save dumps instead
         for key in self.cuda_dependent_attributes_:
-            if key not in state:
+            if not isinstance(state.get(key), bytes):
                 continue
             dump = state.pop(key)
             with tempfile.SpooledTemporaryFile() as f:
@@ -1418,6 +2497,9 @@ class GaussianProcess(object):
                 else:
                     val = torch.load(f)
             state[key] = val
+
+        if uses_cuda(state["device"]) and not torch.cuda.is_available():
+            disable_cuda = True
         if disable_cuda:
             warnings.warn(
                 "Model configured to use CUDA but no CUDA devices "
@@ -1427,6 +2509,8 @@ class GaussianProcess(object):
             state["device"] = "cpu"
 
         self.__dict__.update(state)
+        if "callbacks_" in state:
+            self.initialize_callback_dispatch()
 
     def save_params(self, f):
         """Save only the module's parameters, not the whole object.
@@ -1498,6 +2582,48 @@ class GaussianProcess(object):
             model = torch.load(f)
 
         self.module_.load_state_dict(model)
+        self.prediction_cache_ = None
+
+    def save_artifact(self, path):
+        """Save a fitted exact GP as a self-contained inference
+        artifact.
+
+        In contrast to ``save_params``, the artifact also contains the
+        training data and the precomputed prediction caches, so that
+        it can be restored without the training data and predicts
+        right away. See :mod:`gpwrapper.artifact` for the format.
+
+        Parameters
+        ----------
+        path : str
+          The directory to write the artifact to.
+
+        Examples
+        --------
+        >>> before = ExactGaussianProcessRegressor(mymodule).fit(X, y)
+        >>> before.save_artifact('path/to/dir')
+        >>> after = ExactGaussianProcessRegressor(mymodule)
+        >>> after.load_artifact('path/to/dir')
+
+        """
+        save_artifact(self, path)
+
+    def load_artifact(self, path, mmap=True):
+        """Initialize the net from an inference artifact written by
+        ``save_artifact``.
+
+        Parameters
+        ----------
+        path : str
+          The directory the artifact was written to.
+
+        mmap : bool (default=True)
+          Whether to memory-map the training data and caches instead
+          of reading them into memory. Processes that map the same
+          artifact share its pages.
+
+        """
+        return load_artifact(self, path, mmap=mmap)
 
     def save_history(self, f):
         """Saves the history of ``NeuralNet`` as a json file. In order
@@ -1505,6 +2631,10 @@ class GaussianProcess(object):
         Python data structures. Numpy and PyTorch types should not
         be in the history.
 
+        For long histories, ``gpwrapper.history.export_history`` writes
+        a compact binary format instead, and the ``HistoryExport``
+        callback appends to it after every epoch.
+
         Parameters
         ----------
         f : file-like object or str
@@ -1522,8 +2652,7 @@ class GaussianProcess(object):
         >>> after.fit(X, y, epoch=2) # Train for another 2 epochs
 
         """
-        with open_file_like(f, "w") as fp:
-            json.dump(self.history.to_list(), fp)
+        self.history.to_file(f)
 
     def load_history(self, f):
         """Load the history of a ``NeuralNet`` from a json file. See
@@ -1535,7 +2664,7 @@ class GaussianProcess(object):
 
         """
         with open_file_like(f, "r") as fp:
-            self.history = History(json.load(fp))
+            self.history = self.history_cls_(json.load(fp))
 
     def __repr__(self):
         params = self.get_params(deep=False)
@@ -1589,20 +2718,102 @@ def get_neural_net_reg_doc(doc):
     return doc
 
 
+exact_gp_additional_text = """
+    loo_validation : bool or int (default=False)
+      If True, ``train_split`` is ignored and the closed-form
+      leave-one-out scores on the training data are recorded as
+      ``valid_loss`` (negative log predictive density) and
+      ``valid_mse`` instead. They are computed from the training
+      forward pass of each epoch, so no data is held out and no
+      additional forward pass is needed. The training loss is computed
+      with gpytorch's iterative solves, which expose no factorization
+      that the scores could reuse, so they take a float64 Cholesky
+      factorization of the n x n kernel matrix and the inverse of its
+      factor, i.e. ``O(n^3)`` time and ``16 n^2`` bytes of memory, on
+      top of the training step. If an int k, the scores are only
+      computed every k-th epoch (True is every epoch), and the other
+      epochs have no ``valid_loss`` and ``valid_mse``. A warning is
+      issued above ``LOO_WARN_SAMPLES`` (10000) samples.
+
+"""
+
+
+def get_exact_gp_doc(doc):
+    doc = get_neural_net_reg_doc(doc)
+    start = doc.index("    Attributes\n")
+    return doc[:start] + exact_gp_additional_text.lstrip("\n") + doc[start:]
+
+
 # pylint: disable=missing-docstring
 class ExactGaussianProcess(GaussianProcess):
-    __doc__ = get_neural_net_reg_doc(GaussianProcess.__doc__)
+    __doc__ = get_exact_gp_doc(GaussianProcess.__doc__)
 
     def __init__(
         self,
         module,
         criterion=gpytorch.mlls.ExactMarginalLogLikelihood,
         *args,
+        loo_validation=False,
         **kwargs
     ):
         super(ExactGaussianProcess, self).__init__(
             module, criterion=criterion, *args, **kwargs
         )
+        self.loo_validation = loo_validation
+
+    def get_split_datasets(self, X, y=None, **fit_params):
+        """See ``NeuralNet.get_split_datasets``.
+
+        With ``loo_validation``, all of the data is used for training
+        and there is no validation dataset.
+
+        """
+        if self.loo_validation:
+            dataset = self.get_dataset(X, y)
+            if len(dataset) > LOO_WARN_SAMPLES:
+                warnings.warn(
+                    "loo_validation factorizes the {0} x {0} kernel matrix in "
+                    "float64 every {1} epoch(s), which takes {2:.3g} GB; consider "
+                    "a train_split instead.".format(
+                        len(dataset),
+                        int(self.loo_validation),
+                        16 * len(dataset) ** 2 / 2 ** 30,
+                    )
+                )
+            return dataset, None
+        return super(ExactGaussianProcess, self).get_split_datasets(X, y, **fit_params)
+
+    def train_step(self, Xi, yi, **fit_params):
+        """See ``NeuralNet.train_step``.
+
+        With ``loo_validation``, the leave-one-out scores of the batch
+        are computed from the training prior before the parameter
+        update and recorded as the batch's ``valid_loss`` (the
+        negative log predictive density) and ``valid_mse``, in the
+        epochs selected by ``loo_validation``.
+
+        """
+        step = super(ExactGaussianProcess, self).train_step(Xi, yi, **fit_params)
+        if self._is_loo_epoch():
+            with self.phase_timer_("loo"):
+                nlpd, mse = loo_scores(self.likelihood_(step["y_pred"]), yi)
+            self.history.record_batch("valid_loss", nlpd)
+            self.history.record_batch("valid_mse", mse)
+            self.history.record_batch("valid_batch_size", get_len(Xi))
+        return step
+
+    def _is_loo_epoch(self):
+        every = int(self.loo_validation)
+        # the history already has the row of the current epoch
+        return every > 0 and len(self.history) % every == 0
+
+    def on_epoch_end(self, net, **kwargs):
+        if not self._is_loo_epoch():
+            return
+        weights, scores = zip(
+            *self.history[-1, "batches", :, ["valid_batch_size", "valid_mse"]]
+        )
+        self.history.record("valid_mse", float(np.average(scores, weights=weights)))
 
     # pylint: disable=signature-differs
     def fit(self, X, y, **fit_params):
@@ -1622,7 +2833,7 @@ class ExactGaussianProcess(GaussianProcess):
 
 # pylint: disable=missing-docstring
 class ExactGaussianProcessRegressor(ExactGaussianProcess):
-    __doc__ = get_neural_net_reg_doc(ExactGaussianProcess.__doc__)
+    __doc__ = get_exact_gp_doc(GaussianProcess.__doc__)
 
     def __init__(self, module, likelihood=GaussianLikelihood, *args, **kwargs):
         super(ExactGaussianProcessRegressor, self).__init__(
@@ -1644,24 +2855,380 @@ class ExactGaussianProcessRegressor(ExactGaussianProcess):
         # https://github.com/PyCQA/pylint/issues/1085
         return super(ExactGaussianProcessRegressor, self).fit(X, y, **fit_params)
 
+    def update(self, X_new, y_new, n_steps=0, **fit_params):
+        """Add observations to a fitted GP without refitting it.
+
+        The hyperparameters are kept fixed, and the cached posterior
+        of the training data is extended to the new observations with
+        low-rank updates (through GPyTorch's ``get_fantasy_model``),
+        which costs O(n^2) per update for n training points instead of
+        the O(n^3) of factorizing the kernel matrix anew. Optionally,
+        the hyperparameters are refined afterwards by a few warm-started
+        epochs on all of the data; this recomputes the caches.
+
+        ``module_`` and ``likelihood_`` are replaced by the updated
+        copies; the optimizer keeps its state.
+
+        GPyTorch versions without prediction strategies (such as 0.1)
+        have no ``get_fantasy_model``. There, the observations are
+        appended to the training data instead and the posterior is
+        recomputed in O(n^3) on the next prediction, with a warning.
+        ``update_method_`` records which of ``'fantasy_model'`` and
+        ``'recompute'`` was used.
+
+        Parameters
+        ----------
+        X_new : input data
+          The new inputs, of shape (m, n_features) or (m,).
+
+        y_new : target data
+          The new targets, of shape (m,).
+
+        n_steps : int (default=0)
+          Number of epochs to train the hyperparameters for after
+          adding the observations.
+
+        **fit_params : dict
+          Additional parameters passed to the ``forward`` method of
+          the module.
+
+        Returns
+        -------
+        self
+
+        """
+        if not self.initialized_:
+            raise NotInitializedError(
+                "This {} is not fitted yet; call 'fit' before 'update'.".format(
+                    type(self).__name__
+                )
+            )
+        X_new = _as_2d(self.convert_input(X_new))
+        y_new = self.convert_input(y_new, target=True)
+
+        # the fantasy model is built from the test-independent caches
+        self.module_.eval()
+        self.likelihood_.eval()
+        self._load_prediction_cache()
+        old_module = self.module_
+        if getattr(old_module, "prediction_strategy", None) is not None:
+            with torch.no_grad():
+                self.module_ = old_module.get_fantasy_model(X_new, y_new)
+            self.likelihood_ = self.module_.likelihood
+            self._store_prediction_cache()
+            self.update_method_ = "fantasy_model"
+        else:
+            warnings.warn(
+                "This gpytorch version cannot update the posterior with new "
+                "observations; the training data is replaced and the posterior "
+                "is recomputed in O(n^3) on the next prediction."
+            )
+            train_inputs = [
+                torch.cat([x, X_new]) for x in old_module.train_inputs
+            ]
+            train_targets = torch.cat([old_module.train_targets, y_new])
+            old_module.set_train_data(tuple(train_inputs), train_targets, strict=False)
+            self.prediction_cache_ = None
+            self.update_method_ = "recompute"
+        self.criterion_.model = self.module_
+        self.criterion_.likelihood = self.likelihood_
+        _retarget_optimizer(self.optimizer_, old_module, self.module_)
+
+        if n_steps:
+            X = self.module_.train_inputs
+            self.partial_fit(
+                X[0] if len(X) == 1 else X,
+                self.module_.train_targets,
+                epochs=n_steps,
+                **fit_params
+            )
+        return self
+
+    def fit_many(self, Xs, ys, **fit_params):
+        """Fit one independent GP per series, many at a time.
+
+        Series with inputs and targets of the same shape are stacked
+        and fit together as a single batched GP, with one set of
+        hyperparameters per series, so that the overhead of a fit
+        (initialization, the fit loop, callbacks) is paid once per
+        distinct shape instead of once per series. To this end, the
+        module class must accept a ``batch_size`` argument (e.g. to
+        pass on to its mean and kernel) and is initialized with
+        ``module__batch_size`` set to the number of series in the
+        batch; the likelihood gets the same ``batch_size`` (or
+        ``batch_shape``, in the gpytorch versions that take one). A
+        ValueError is raised if a parameter of the module or
+        likelihood is not batched over the series after all, since
+        the series would then not be fit independently.
+
+        Padding series of different lengths would change their exact
+        marginal likelihood, so they are fit in separate batches.
+        ``train_split`` is not used.
+
+        The objective of each batch is the sum of the negative
+        marginal log likelihoods of its series, hence its
+        ``train_loss`` is a sum as well; the individual losses are
+        recorded per batch as ``series_loss``, and
+        ``get_series_history`` returns them per series.
+
+        Parameters
+        ----------
+        Xs : list of input data
+          One array or tensor of shape (n_samples, n_features) or
+          (n_samples,) per series.
+
+        ys : list of target data
+          One array or tensor of shape (n_samples,) per series.
+
+        **fit_params : dict
+          Additional parameters passed to the ``forward`` method of
+          the module.
+
+        Returns
+        -------
+        self
+
+        """
+        if len(Xs) != len(ys):
+            raise ValueError("Xs and ys have inconsistent lengths.")
+        if not inspect.isclass(self.module) or not _accepts_kwarg(
+            self.module, "batch_size"
+        ):
+            raise TypeError(
+                "fit_many requires a module class that takes a batch_size argument."
+            )
+
+        Xs = [_as_2d(self.convert_input(X)) for X in Xs]
+        ys = [self.convert_input(y, target=True) for y in ys]
+        buckets = {}
+        for i, (X, y) in enumerate(zip(Xs, ys)):
+            buckets.setdefault((X.shape, y.shape), []).append(i)
+
+        self.series_nets_ = []
+        self.series_index_ = [None] * len(Xs)
+        for indices in buckets.values():
+            net = self._get_series_net(len(indices))
+            X = torch.stack([Xs[i] for i in indices])
+            y = torch.stack([ys[i] for i in indices])
+            _check_series_parameters(net.initialize(X, y), len(indices))
+            net.fit(X, y, **fit_params)
+            for pos, i in enumerate(indices):
+                self.series_index_[i] = (len(self.series_nets_), pos)
+            self.series_nets_.append(net)
+        return self
+
+    def _get_series_net(self, n_series):
+        # like sklearn.clone, only pass the parameters and not what
+        # was learned; the callbacks get fresh copies
+        params = {
+            key: val
+            for key, val in self.get_params(deep=False).items()
+            if not key.endswith("_") and key != "history"
+        }
+        params["callbacks"] = clone(params["callbacks"], safe=False)
+        params.update({"train_split": None, "module__batch_size": n_series})
+        likelihood = params["likelihood"]
+        batch_keys = ["likelihood__batch_size", "likelihood__batch_shape"]
+        if inspect.isclass(likelihood) and not any(key in params for key in batch_keys):
+            for key, val in _batch_kwargs(likelihood, n_series).items():
+                params["likelihood__" + key] = val
+        return type(self)(**params)
+
+    def predict_many(self, Xs, return_std=False):
+        """Return the predictive mean and variance (or standard
+        deviation) of each series fit by ``fit_many``.
+
+        Parameters
+        ----------
+        Xs : list of input data
+          The test inputs of each series, in the order the series were
+          passed to ``fit_many``. Series fit together may have
+          different numbers of test points.
+
+        return_std : bool (default=False)
+          Whether to return the standard deviation instead of the
+          variance.
+
+        Returns
+        -------
+        predictions : list of tuples
+          A ``(mean, var_or_std)`` tuple of numpy arrays per series.
+
+        """
+        self._check_series_fitted()
+        if len(Xs) != len(self.series_index_):
+            raise ValueError(
+                "Expected test inputs for {} series, got {}.".format(
+                    len(self.series_index_), len(Xs)
+                )
+            )
+
+        Xs = [_as_2d(self.convert_input(X)) for X in Xs]
+        predictions = [None] * len(Xs)
+        for bucket, net in enumerate(self.series_nets_):
+            indices = [
+                i for i, (b, _) in enumerate(self.series_index_) if b == bucket
+            ]
+            # test points are predicted independently of each other,
+            # so padding them to a common length is exact
+            n_test = max(len(Xs[i]) for i in indices)
+            X = torch.stack([_pad_rows(Xs[i], n_test) for i in indices])
+            mean, var = net._predict_mean_var(X, return_std=return_std, chunk_size=-1)
+            for pos, i in enumerate(indices):
+                predictions[i] = (mean[pos, :len(Xs[i])], var[pos, :len(Xs[i])])
+        return predictions
+
+    def get_series_history(self, i):
+        """Return the training loss of the ``i``-th series fit by
+        ``fit_many`` at the end of each epoch as a numpy array."""
+        self._check_series_fitted()
+        bucket, pos = self.series_index_[i]
+        history = self.series_nets_[bucket].history
+        series_losses = history[:, "batches", -1, "series_loss"]
+        return np.array([losses[pos] for losses in series_losses])
+
+    def _check_series_fitted(self):
+        if not hasattr(self, "series_nets_"):
+            raise NotInitializedError(
+                "This {} has not fit any series yet; call 'fit_many' first.".format(
+                    type(self).__name__
+                )
+            )
+
+    def predict_mean_var(self, X, return_std=False, chunk_size=None, n_jobs=1):
+        """Return the predictive mean and the marginal predictive
+        variance (or standard deviation) of ``X``.
+
+        Only the diagonal of the predictive covariance is computed, so
+        memory and time are linear in the number of test points. The
+        predictions are computed chunk by chunk (see
+        ``predict_proba_iter``) and written into contiguous arrays.
+
+        Parameters
+        ----------
+        X : input data, compatible with skorch.dataset.Dataset
+          See ``predict_proba_iter``.
+
+        return_std : bool (default=False)
+          Whether to return the standard deviation instead of the
+          variance.
+
+        chunk_size : int or None (default=None)
+          See ``predict_proba_iter``.
+
+        n_jobs : int or None (default=1)
+          If not 1, ``X`` (arrays or tensors) is sharded across that
+          many forked processes, which share the parameters and
+          prediction caches and write to outputs in shared memory; see
+          :func:`gpwrapper.parallel.predict_sharded`. None or -1 means
+          one per CPU.
+
+        Returns
+        -------
+        mean : numpy ndarray
+
+        var_or_std : numpy ndarray
+
+        """
+        return self._predict_mean_var(
+            X, return_std=return_std, chunk_size=chunk_size, n_jobs=n_jobs
+        )
+
+
+variational_gp_additional_text = """
+    n_inducing : int or None (default=None)
+      If not None, ``VariationalGP`` modules are initialized with this
+      many inducing points selected from the training inputs instead
+      of with all of them. Options of the selection are passed with
+      the ``inducing__`` prefix, e.g. ``inducing__batch_size=4096``.
+
+    inducing_method : str or callable (default='kmeans')
+      How the inducing points are selected: ``'kmeans'`` (minibatch
+      k-means), ``'greedy_variance'`` (greedy conditional variance)
+      or a callable; see
+      :func:`gpwrapper.inducing.select_inducing_points`.
+
+"""
+
+variational_gp_additional_attributes = """
+    inducing_points\\_ : torch tensor
+      The inducing points selected if ``n_inducing`` is set.
+"""
+
+
+def get_variational_gp_doc(doc):
+    doc = get_neural_net_reg_doc(doc)
+    start = doc.index("    Attributes\n")
+    doc = doc[:start] + variational_gp_additional_text.lstrip("\n") + doc[start:]
+    start = doc.index("    ----------\n", start) + len("    ----------\n")
+    return doc[:start] + variational_gp_additional_attributes.lstrip("\n") + "\n" + doc[start:]
+
 
 # pylint: disable=missing-docstring
 class VariationalGaussianProcess(GaussianProcess):
-    __doc__ = get_neural_net_reg_doc(GaussianProcess.__doc__)
+    __doc__ = get_variational_gp_doc(GaussianProcess.__doc__)
+
+    prefixes_ = GaussianProcess.prefixes_ + ["inducing__"]
+
+    # stochastic training records many batches, store them compactly
+    history_cls_ = ColumnarHistory
 
     def __init__(
         self,
         module,
         criterion=gpytorch.mlls.VariationalMarginalLogLikelihood,
         *args,
+        n_inducing=None,
+        inducing_method="kmeans",
         **kwargs
     ):
         super(VariationalGaussianProcess, self).__init__(
             module, criterion=criterion, *args, **kwargs
         )
+        self.n_inducing = n_inducing
+        self.inducing_method = inducing_method
+
+    def initialize_module(self, X, y):
+        """See ``GaussianProcess.initialize_module``.
+
+        If ``n_inducing`` is set, ``VariationalGP`` modules get the
+        inducing points selected by ``select_inducing_points`` instead
+        of ``X``. This is required if ``X`` is a
+        :class:`gpwrapper.dataset.ChunkedDataset`, whose inputs are
+        never loaded into memory at once.
+
+        """
+        builds_from_inputs = inspect.isclass(self.module) and issubclass(
+            self.module, gpytorch.models.variational_gp.VariationalGP
+        )
+        if isinstance(X, ChunkedDataset):
+            if builds_from_inputs and self.n_inducing is None:
+                raise ValueError(
+                    "Set n_inducing to build a VariationalGP module from a "
+                    "ChunkedDataset; its inputs are not loaded into memory."
+                )
+            X, y = X.X, X.y
+        if self.n_inducing is not None and X is not None and builds_from_inputs:
+            X = self.select_inducing_points(X)
+        return super(VariationalGaussianProcess, self).initialize_module(X, y)
+
+    def select_inducing_points(self, X):
+        """Selects ``n_inducing`` inducing points from ``X`` with
+        ``inducing_method``, stores them as ``inducing_points_`` and
+        returns them."""
+        kwargs = self._get_params_for("inducing")
+        points = select_inducing_points(
+            X, self.n_inducing, method=self.inducing_method, **kwargs
+        )
+        self.inducing_points_ = torch.as_tensor(
+            points, dtype=get_torch_dtype(self.dtype)
+        )
+        return self.inducing_points_
 
     # pylint: disable=signature-differs
     def partial_fit(self, X, y=None, classes=None, **fit_params):
+        X = self.convert_input(X)
+        y = self.convert_input(y, target=True)
 
         if not self.initialized_:
             self.initialize(X, y)
@@ -1672,12 +3239,13 @@ class VariationalGaussianProcess(GaussianProcess):
         except KeyboardInterrupt:
             pass
         self.notify("on_train_end", X=X, y=y)
+        self.initialize_prediction_cache()
         return self
 
 
 # pylint: disable=missing-docstring
 class VariationalGaussianProcessClassifier(VariationalGaussianProcess):
-    __doc__ = get_neural_net_reg_doc(GaussianProcess.__doc__)
+    __doc__ = get_variational_gp_doc(GaussianProcess.__doc__)
 
     def __init__(self, module, likelihood=BernoulliLikelihood, *args, **kwargs):
         super(VariationalGaussianProcessClassifier, self).__init__(
@@ -1687,9 +3255,15 @@ class VariationalGaussianProcessClassifier(VariationalGaussianProcess):
 
 # pylint: disable=missing-docstring
 class VariationalGaussianProcessRegressor(VariationalGaussianProcess):
-    __doc__ = get_neural_net_reg_doc(GaussianProcess.__doc__)
+    __doc__ = get_variational_gp_doc(GaussianProcess.__doc__)
 
     def __init__(self, module, likelihood=GaussianLikelihood, *args, **kwargs):
         super(VariationalGaussianProcessRegressor, self).__init__(
             module, likelihood=likelihood, *args, **kwargs
         )
+
+    def predict_mean_var(self, X, return_std=False, chunk_size=None, n_jobs=1):
+        """See ``ExactGaussianProcessRegressor.predict_mean_var``."""
+        return self._predict_mean_var(
+            X, return_std=return_std, chunk_size=chunk_size, n_jobs=n_jobs
+        )
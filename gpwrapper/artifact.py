@@ -0,0 +1,234 @@
+"""Self-contained inference artifacts for exact GPs.
+
+An artifact is a directory holding everything needed to predict with a
+fitted exact GP:
+
+* ``meta.json``: the format version, the names of the other files and
+  some information about the environment it was written in,
+* ``params.pt``: the state dict of the module (including the
+  likelihood),
+* one ``.npy`` file per training input and one for the training
+  targets,
+* one ``.npy`` file per precomputed prediction cache, i.e. the solve
+  against the training targets (``mean_cache``) and the LOVE root of
+  the inverse training covariance (``covar_cache``). They are held by
+  the module's ``prediction_strategy``, or, with the GPyTorch 0.1 API,
+  by the module itself; ``meta.json`` records which (``cache_owner``).
+
+The arrays are written with :func:`numpy.save`, so loading them with
+``mmap_mode='r'`` maps the files into memory instead of reading them;
+processes that load the same artifact share the pages. Since the
+caches are restored as well, the first prediction does not need to
+factorize the training covariance.
+
+"""
+
+import inspect
+from itertools import chain
+import json
+import os
+import warnings
+
+import numpy as np
+import torch
+
+import gpytorch
+from skorch.exceptions import NotInitializedError
+
+
+__all__ = ["save_artifact", "load_artifact"]
+
+
+FORMAT_VERSION = 1
+
+CACHE_NAMES = ["mean_cache", "covar_cache"]
+
+
+def _get_caches(strategy):
+    """Return the prediction caches computed so far by ``strategy``."""
+    caches = {}
+    state = vars(strategy)
+    # GPyTorch 0.1 keeps the caches by name in "__cache", later
+    # versions by (name, args, kwargs) in "_memoize_cache"
+    items = chain(
+        (state.get("__cache") or {}).items(),
+        (state.get("_memoize_cache") or {}).items(),
+    )
+    for key, val in items:
+        name = key[0] if isinstance(key, tuple) else key
+        if name in CACHE_NAMES and torch.is_tensor(val):
+            caches[name] = val
+    return caches
+
+
+def _set_cache(strategy, name, val):
+    try:
+        from gpytorch.utils.memoize import add_to_cache
+    except ImportError:
+        vars(strategy).setdefault("__cache", {})[name] = val
+    else:
+        add_to_cache(strategy, name, val)
+
+
+def _build_prediction_strategy(module):
+    """Create the prediction strategy ``module`` would create on its
+    first posterior call, without computing any caches."""
+    from gpytorch.models import exact_prediction_strategies
+
+    train_inputs = module.train_inputs
+    train_targets = module.train_targets
+    # the prior of the training data, as in ExactGP.__call__
+    train_output = super(gpytorch.models.ExactGP, module).__call__(*train_inputs)
+    params = inspect.signature(exact_prediction_strategies.prediction_strategy).parameters
+    if "train_prior_dist" in params:
+        return exact_prediction_strategies.prediction_strategy(
+            train_inputs=train_inputs,
+            train_prior_dist=train_output,
+            train_labels=train_targets,
+            likelihood=module.likelihood,
+        )
+    train_train_covar = train_output.lazy_covariance_matrix
+    if hasattr(train_train_covar, "evaluate_kernel"):
+        train_train_covar = train_train_covar.evaluate_kernel()
+    return exact_prediction_strategies.prediction_strategy(
+        train_targets.size(-1),
+        train_inputs,
+        train_output.mean,
+        train_train_covar,
+        train_targets,
+        module.likelihood,
+        False,
+    )
+
+
+def _get_device(module):
+    """Return the device of the parameters of ``module``, which
+    ``initialize`` moved there according to the net's ``device``."""
+    for param in chain(module.parameters(), module.buffers()):
+        return param.device
+    return torch.device("cpu")
+
+
+def _check_exact(net):
+    if not hasattr(net, "module_"):
+        raise NotInitializedError(
+            "Cannot save an artifact of an un-initialized model. "
+            "Please fit the model with .fit(...) first."
+        )
+    if not isinstance(net.module_, gpytorch.models.ExactGP):
+        raise TypeError("Inference artifacts are only supported for exact GPs.")
+
+
+def save_artifact(net, path):
+    """Write the fitted exact GP ``net`` to the directory ``path``.
+
+    The prediction caches are computed first if necessary. See the
+    module docstring for the layout of the directory.
+
+    """
+    _check_exact(net)
+    module = net.module_
+    net.module_.eval()
+    net.likelihood_.eval()
+    net._load_prediction_cache()  # pylint: disable=protected-access
+
+    os.makedirs(path, exist_ok=True)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "estimator": type(net).__name__,
+        "module": type(module).__name__,
+        "torch_version": torch.__version__,
+        "gpytorch_version": getattr(gpytorch, "__version__", "unknown"),
+        "params": "params.pt",
+        "train_inputs": [],
+        "train_targets": "train_targets.npy",
+        "caches": {},
+    }
+    torch.save(module.state_dict(), os.path.join(path, meta["params"]))
+
+    def save_array(name, tensor):
+        np.save(os.path.join(path, name), tensor.detach().cpu().numpy())
+
+    for i, train_input in enumerate(module.train_inputs):
+        name = "train_input_{}.npy".format(i)
+        save_array(name, train_input)
+        meta["train_inputs"].append(name)
+    save_array(meta["train_targets"], module.train_targets)
+
+    strategy = getattr(module, "prediction_strategy", None)
+    if strategy is not None:
+        meta["cache_owner"] = "prediction_strategy"
+        caches = _get_caches(strategy)
+    else:
+        meta["cache_owner"] = "module"
+        caches = {
+            name: getattr(module, name)
+            for name in CACHE_NAMES
+            if torch.is_tensor(getattr(module, name, None))
+        }
+    for name, cache in caches.items():
+        meta["caches"][name] = name + ".npy"
+        save_array(meta["caches"][name], cache)
+
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_artifact(net, path, mmap=True):
+    """Restore a fitted exact GP written by :func:`save_artifact` into
+    ``net``, which must be configured with the same module class.
+
+    The training data and caches are memory-mapped unless ``mmap`` is
+    False. They are used as they are if they have ``net``'s dtype and
+    converted otherwise.
+
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["format_version"] > FORMAT_VERSION:
+        raise ValueError(
+            "Artifact format version {} is not supported (newest is {}).".format(
+                meta["format_version"], FORMAT_VERSION
+            )
+        )
+
+    def load_array(name):
+        return np.load(os.path.join(path, name), mmap_mode="r" if mmap else None)
+
+    train_inputs = net.convert_input([load_array(name) for name in meta["train_inputs"]])
+    train_targets = net.convert_input(load_array(meta["train_targets"]), target=True)
+    X = train_inputs[0] if len(train_inputs) == 1 else train_inputs
+    net.initialize(X, train_targets)
+    _check_exact(net)
+
+    module = net.module_
+    # loaded onto the CPU, whatever device the artifact was written on;
+    # load_state_dict copies the parameters to the module's device
+    params = torch.load(os.path.join(path, meta["params"]), map_location="cpu")
+    module.load_state_dict(params)
+    module.eval()
+    net.likelihood_.eval()
+    device = _get_device(module)
+
+    if meta["caches"]:
+        # a no-op on the CPU, where the memory maps are kept
+        caches = {
+            name: net.convert_input(load_array(filename)).to(device)
+            for name, filename in meta["caches"].items()
+        }
+        if meta["cache_owner"] == "module":
+            for name, cache in caches.items():
+                setattr(module, name, cache)
+        else:
+            with torch.no_grad():
+                strategy = _build_prediction_strategy(module)
+            for name, cache in caches.items():
+                _set_cache(strategy, name, cache)
+            module.prediction_strategy = strategy
+        net._store_prediction_cache()  # pylint: disable=protected-access
+    else:
+        warnings.warn(
+            "The artifact at {} has no prediction caches; they are computed "
+            "on the first prediction.".format(path)
+        )
+    return net
@@ -0,0 +1,450 @@
+"""A GP regressor that chooses its inference engine from the data.
+
+Which engine a GP regressor should use depends on the number of
+samples and the input dimension (see the flowchart in the README):
+exact inference takes quadratic memory and cubic time, KISS-GP
+interpolates the kernel from a grid, which is only feasible for a few
+dimensions unless the function decomposes additively, and variational
+inference works on minibatches of any size.
+:class:`AutoGaussianProcessRegressor` estimates the memory and time
+each engine would take, picks one that fits a budget and fits the
+corresponding :class:`gpwrapper.ExactGaussianProcessRegressor` or
+:class:`gpwrapper.VariationalGaussianProcessRegressor` with one of the
+default models of :mod:`gpwrapper.models`.
+
+"""
+
+import math
+import warnings
+
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.base import RegressorMixin
+import torch
+
+from skorch.exceptions import NotInitializedError
+from skorch.utils import to_numpy
+
+from gpwrapper import ExactGaussianProcessRegressor
+from gpwrapper import VariationalGaussianProcessRegressor
+from gpwrapper.models import AdditiveKissGPModel
+from gpwrapper.models import ExactGPModel
+from gpwrapper.models import GridInducingModel
+from gpwrapper.models import KissGPModel
+from gpwrapper.models import VariationalGPModel
+from gpwrapper.utils import get_torch_dtype
+
+
+__all__ = ["AutoGaussianProcessRegressor", "ENGINES"]
+
+
+# in the order of preference: the approximations trade accuracy for
+# cost, so the first engine that fits the budget is chosen
+ENGINES = ("exact", "kissgp", "additive_kissgp", "grid_inducing", "variational")
+
+# the grid kernels interpolate with cubic weights, i.e. from 4 grid
+# points per dimension
+_INTERPOLATION_POINTS = 4
+
+_DEFAULT_GRID_SIZES = {
+    "kissgp": {1: 400, 2: 100, 3: 30},
+    "additive_kissgp": 400,
+    "grid_inducing": {1: 64, 2: 32},
+}
+
+_MAX_GRID_DIMS = {"kissgp": 3, "grid_inducing": 2}
+
+
+def _grid_bounds(X, margin=0.1):
+    """Return the range of every input dimension, widened by
+    ``margin`` times its span so that the interpolation of points at
+    the border doesn't fall off the grid."""
+    X = to_numpy(X) if isinstance(X, torch.Tensor) else np.asarray(X)
+    X = X.reshape(len(X), -1)
+    lower, upper = X.min(0).astype(float), X.max(0).astype(float)
+    span = np.where(upper > lower, upper - lower, 1.0)
+    return [
+        (float(low), float(high))
+        for low, high in zip(lower - margin * span, upper + margin * span)
+    ]
+
+
+class AutoGaussianProcessRegressor(BaseEstimator, RegressorMixin):
+    # pylint: disable=anomalous-backslash-in-string
+    """GP regressor that chooses exact inference, KISS-GP or
+    variational inference by the size of the data and a budget.
+
+    On ``fit``, the memory and the time of a training epoch are
+    estimated for every engine that applies to the input dimension:
+
+    * ``'exact'``: exact GP; memory ``O(n^2)``, time ``O(n^3)``.
+    * ``'kissgp'``: exact GP with a kernel interpolated from a grid of
+      ``grid_size ** d`` points (Kronecker structure for ``d > 1``);
+      up to 3 dimensions.
+    * ``'additive_kissgp'``: exact GP with a sum of one-dimensional
+      KISS-GP kernels; only if ``additive`` is True.
+    * ``'grid_inducing'``: ``GridInducingVariationalGP`` trained on
+      minibatches; up to 2 dimensions.
+    * ``'variational'``: ``VariationalGP`` with ``n_inducing`` inducing
+      points selected by k-means, trained on minibatches.
+
+    The first engine in this order whose estimated memory is within
+    ``memory_budget`` and whose estimated fit time is within
+    ``time_budget`` is fitted. If none fits, the engine that takes the
+    least memory is used and a warning is issued. The estimates are
+    rough operation counts, converted to seconds with
+    ``flops_per_second_``; they are meant to tell the engines apart by
+    orders of magnitude, not to predict the fit time exactly.
+
+    The decision is stored in ``decision_`` and passed to ``sink`` if
+    ``verbose``.
+
+    Parameters
+    ----------
+    engine : str or None (default=None)
+      If not None, use this engine (one of ``ENGINES``) regardless of
+      the budget. Its costs are still estimated and recorded.
+
+    memory_budget : int (default=2**30)
+      The memory in bytes the fit may use, excluding the data itself.
+
+    time_budget : float or None (default=None)
+      The time in seconds the fit (``max_epochs`` epochs) may take.
+      None means no limit.
+
+    additive : bool (default=False)
+      Whether the function is assumed to decompose additively over
+      the input dimensions, which makes ``'additive_kissgp'``
+      available.
+
+    grid_size : int or None (default=None)
+      The number of grid points per dimension of the grid engines.
+      None for a default that depends on the engine and dimension.
+
+    n_inducing : int (default=512)
+      The number of inducing points of the ``'variational'`` engine.
+
+    batch_size : int (default=1024)
+      The minibatch size of the variational engines. The exact
+      engines always train on the full batch.
+
+    max_epochs : int (default=50)
+      Passed to the net.
+
+    lr : float (default=0.1)
+      Passed to the net.
+
+    dtype : torch dtype, numpy dtype or str (default=torch.float32)
+      Passed to the net; also determines the bytes per number in the
+      memory estimate.
+
+    verbose : int (default=0)
+      Passed to the net. If not 0, the decision is passed to ``sink``
+      as well.
+
+    sink : callable (default=print)
+      The target that the decision is passed to, as a string.
+
+    net_params : dict or None (default=None)
+      Further parameters of the net, e.g. ``{'train_split': None}``.
+      They take precedence over the parameters set by this class,
+      including ``batch_size``.
+
+    Attributes
+    ----------
+    flops_per_second\_ : float
+      The rate at which the operation counts of the cost estimates
+      are converted to seconds.
+
+    cg_iterations\_ : int
+      The number of conjugate gradient iterations per epoch assumed
+      for the KISS-GP engines.
+
+    decision\_ : dict
+      The chosen ``engine``, the ``reason``, ``n_samples`` and
+      ``n_dims`` of the data, the estimated ``memory_bytes``,
+      ``seconds_per_epoch`` and ``seconds_per_fit`` of the chosen
+      engine, and the estimates of all engines that were considered as
+      ``candidates``.
+
+    net\_ : GaussianProcess
+      The fitted net of the chosen engine.
+
+    """
+
+    flops_per_second_ = 1e10
+    cg_iterations_ = 20
+
+    def __init__(
+        self,
+        engine=None,
+        memory_budget=2 ** 30,
+        time_budget=None,
+        additive=False,
+        grid_size=None,
+        n_inducing=512,
+        batch_size=1024,
+        max_epochs=50,
+        lr=0.1,
+        dtype=torch.float32,
+        verbose=0,
+        sink=print,
+        net_params=None,
+    ):
+        self.engine = engine
+        self.memory_budget = memory_budget
+        self.time_budget = time_budget
+        self.additive = additive
+        self.grid_size = grid_size
+        self.n_inducing = n_inducing
+        self.batch_size = batch_size
+        self.max_epochs = max_epochs
+        self.lr = lr
+        self.dtype = dtype
+        self.verbose = verbose
+        self.sink = sink
+        self.net_params = net_params
+
+    def _get_grid_size(self, engine, n_dims):
+        if self.grid_size is not None:
+            return self.grid_size
+        default = _DEFAULT_GRID_SIZES[engine]
+        return default[n_dims] if isinstance(default, dict) else default
+
+    def _applies(self, engine, n_dims):
+        if engine == "additive_kissgp":
+            return bool(self.additive)
+        if engine == "grid_inducing" and GridInducingModel is None:
+            # not available in this gpytorch version
+            return False
+        return n_dims <= _MAX_GRID_DIMS.get(engine, n_dims)
+
+    def _estimate(self, engine, n_samples, n_dims):
+        """Return the estimated memory in bytes and operations per
+        epoch of ``engine``."""
+        n, d = n_samples, n_dims
+        itemsize = torch.empty(0, dtype=get_torch_dtype(self.dtype)).element_size()
+        # an interpolation weight and its int64 index
+        weight_bytes = itemsize + 8
+        n_batches = math.ceil(n / self.batch_size)
+        batch_size = min(self.batch_size, n)
+
+        if engine == "exact":
+            # the kernel matrix, its solve and its derivatives
+            return 3 * n * n * itemsize, n ** 3
+        if engine == "kissgp":
+            g = self._get_grid_size(engine, d)
+            w = _INTERPOLATION_POINTS ** d
+            m = g ** d
+            memory = 2 * n * w * weight_bytes + 3 * m * itemsize
+            flops = self.cg_iterations_ * (2 * n * w + d * m * math.log2(g))
+            return memory, flops
+        if engine == "additive_kissgp":
+            g = self._get_grid_size(engine, d)
+            w = _INTERPOLATION_POINTS
+            memory = d * (2 * n * w * weight_bytes + 3 * g * itemsize)
+            flops = self.cg_iterations_ * d * (2 * n * w + g * math.log2(g))
+            return memory, flops
+        if engine == "grid_inducing":
+            m = self._get_grid_size(engine, d) ** d
+            w = _INTERPOLATION_POINTS ** d
+            # the variational covariance is a dense m x m matrix
+            memory = 3 * m * m * itemsize + 2 * batch_size * w * weight_bytes
+            flops = n_batches * (m ** 3 / 3 + batch_size * w * m)
+            return memory, flops
+        m = min(self.n_inducing, n)
+        memory = 3 * m * m * itemsize + 2 * batch_size * m * itemsize
+        flops = n_batches * (m ** 3 / 3 + batch_size * m * (m + d))
+        return memory, flops
+
+    def _cost(self, engine, n_samples, n_dims):
+        memory, flops = self._estimate(engine, n_samples, n_dims)
+        seconds = flops / self.flops_per_second_
+        fits = memory <= self.memory_budget and (
+            self.time_budget is None or seconds * self.max_epochs <= self.time_budget
+        )
+        return {
+            "engine": engine,
+            "memory_bytes": int(memory),
+            "seconds_per_epoch": seconds,
+            "seconds_per_fit": seconds * self.max_epochs,
+            "fits": fits,
+        }
+
+    def estimate_costs(self, n_samples, n_dims):
+        """Return the estimated costs of the engines that apply to
+        ``n_dims`` input dimensions, in the order of ``ENGINES``.
+
+        Each entry is a dict with the ``engine``, its
+        ``memory_bytes``, ``seconds_per_epoch`` and ``seconds_per_fit``
+        and whether it ``fits`` the budget.
+
+        """
+        return [
+            self._cost(engine, n_samples, n_dims)
+            for engine in ENGINES
+            if self._applies(engine, n_dims)
+        ]
+
+    def choose_engine(self, n_samples, n_dims):
+        """Return the decision for data of ``n_samples`` samples with
+        ``n_dims`` input dimensions; see ``decision_``."""
+        candidates = self.estimate_costs(n_samples, n_dims)
+        if self.engine is not None:
+            if self.engine not in ENGINES:
+                raise ValueError(
+                    "Unknown engine {!r}; use one of {}.".format(self.engine, ENGINES)
+                )
+            if not self._applies(self.engine, n_dims):
+                raise ValueError(
+                    "Engine {!r} does not apply to {}-dimensional inputs.".format(
+                        self.engine, n_dims
+                    )
+                )
+            chosen = self._cost(self.engine, n_samples, n_dims)
+            reason = "set by the engine parameter"
+        elif any(cost["fits"] for cost in candidates):
+            chosen = next(cost for cost in candidates if cost["fits"])
+            reason = "first engine within the budget"
+        else:
+            chosen = min(candidates, key=lambda cost: cost["memory_bytes"])
+            reason = "no engine within the budget, using the least memory"
+            warnings.warn(
+                "No engine fits the budget for {} samples with {} dimensions; using "
+                "{!r}, estimated to take {:.3g} GB.".format(
+                    n_samples,
+                    n_dims,
+                    chosen["engine"],
+                    chosen["memory_bytes"] / 2 ** 30,
+                )
+            )
+
+        return {
+            "engine": chosen["engine"],
+            "reason": reason,
+            "n_samples": n_samples,
+            "n_dims": n_dims,
+            "memory_bytes": chosen["memory_bytes"],
+            "seconds_per_epoch": chosen["seconds_per_epoch"],
+            "seconds_per_fit": chosen["seconds_per_fit"],
+            "candidates": candidates,
+        }
+
+    def build_net(self, engine, X):
+        """Return the unfitted net of ``engine`` for the inputs ``X``."""
+
+        def make(net_cls, module, **kwargs):
+            params = {
+                "max_epochs": self.max_epochs,
+                "lr": self.lr,
+                "dtype": self.dtype,
+                "verbose": self.verbose,
+            }
+            params.update(kwargs)
+            params.update(self.net_params or {})
+            return net_cls(module, **params)
+
+        n_dims = int(np.prod(X.shape[1:]))
+        if engine == "exact":
+            return make(ExactGaussianProcessRegressor, ExactGPModel, batch_size=-1)
+        if engine == "variational":
+            return make(
+                VariationalGaussianProcessRegressor,
+                VariationalGPModel,
+                batch_size=self.batch_size,
+                n_inducing=min(self.n_inducing, len(X)),
+            )
+
+        grid_size = self._get_grid_size(engine, n_dims)
+        grid_bounds = _grid_bounds(X)
+        if engine == "kissgp":
+            return make(
+                ExactGaussianProcessRegressor,
+                KissGPModel,
+                batch_size=-1,
+                module__grid_size=grid_size,
+                module__grid_bounds=grid_bounds,
+            )
+        if engine == "additive_kissgp":
+            # the components share one grid
+            lower, upper = zip(*grid_bounds)
+            return make(
+                ExactGaussianProcessRegressor,
+                AdditiveKissGPModel,
+                batch_size=-1,
+                module__grid_size=grid_size,
+                module__grid_bounds=(min(lower), max(upper)),
+                module__n_components=n_dims,
+            )
+        return make(
+            VariationalGaussianProcessRegressor,
+            GridInducingModel,
+            batch_size=self.batch_size,
+            module__grid_size=grid_size,
+            module__grid_bounds=grid_bounds,
+        )
+
+    def fit(self, X, y, **fit_params):
+        """Choose the engine for ``X``, then build and fit its net.
+
+        Parameters
+        ----------
+        X : torch tensor or numpy array of shape (n_samples,) or
+          (n_samples, n_features)
+          The training inputs.
+
+        y : torch tensor or numpy array of shape (n_samples,)
+          The training targets.
+
+        **fit_params : dict
+          Passed to the ``fit`` method of the net.
+
+        """
+        n_samples = len(X)
+        n_dims = int(np.prod(X.shape[1:]))
+        self.decision_ = self.choose_engine(n_samples, n_dims)
+        if self.verbose:
+            self.sink(
+                "Using the {engine!r} engine for {n_samples} samples with {n_dims} "
+                "dimensions ({reason}); estimated {gb:.3g} GB and "
+                "{seconds_per_fit:.3g}s.".format(
+                    gb=self.decision_["memory_bytes"] / 2 ** 30, **self.decision_
+                )
+            )
+        self.net_ = self.build_net(self.decision_["engine"], X)
+        self.net_.fit(X, y, **fit_params)
+        return self
+
+    def _check_is_fitted(self):
+        if not hasattr(self, "net_"):
+            raise NotInitializedError(
+                "This AutoGaussianProcessRegressor is not fitted yet; call fit first."
+            )
+
+    def predict(self, X):
+        """Return the predictive mean of ``X``; see the net's
+        ``predict``."""
+        self._check_is_fitted()
+        return self.net_.predict(X)
+
+    def predict_proba(self, X):
+        """Return the predictive distribution of ``X``; see the net's
+        ``predict_proba``."""
+        self._check_is_fitted()
+        return self.net_.predict_proba(X)
+
+    def predict_mean_var(self, X, return_std=False, chunk_size=None, n_jobs=1):
+        """Return the predictive mean and variance of ``X``; see
+        ``ExactGaussianProcessRegressor.predict_mean_var``."""
+        self._check_is_fitted()
+        return self.net_.predict_mean_var(
+            X, return_std=return_std, chunk_size=chunk_size, n_jobs=n_jobs
+        )
+
+    def predict_into(self, X, mean_out, var_out=None, chunk_size=None, n_jobs=1):
+        """Write the predictive mean (and variance) of ``X`` into
+        preallocated arrays; see the net's ``predict_into``."""
+        self._check_is_fitted()
+        return self.net_.predict_into(
+            X, mean_out, var_out, chunk_size=chunk_size, n_jobs=n_jobs
+        )
@@ -0,0 +1,223 @@
+"""Callbacks specific to training GPs."""
+
+import numpy as np
+import torch
+
+from skorch.callbacks import Callback
+
+from gpwrapper.history import export_history
+
+
+__all__ = ["Convergence", "HistoryExport"]
+
+
+class Convergence(Callback):
+    """Stop training once the (negative) marginal log likelihood has
+    plateaued, and restore the best parameters seen.
+
+    An epoch counts as stalled if the monitored loss improved by less
+    than ``rtol`` relative to the best loss so far, or if the mean
+    gradient norm of the epoch fell below ``gtol``. Training stops
+    after ``patience`` consecutive stalled epochs. The reason for
+    stopping and the number of epochs that were saved relative to
+    ``max_epochs`` are recorded in the history as ``stop_reason`` and
+    ``epochs_saved``; the gradient norms are recorded as ``grad_norm``.
+
+    At the end of training, the parameters of the module (and of the
+    likelihood) from the epoch with the lowest monitored loss are
+    restored, unless ``restore_best`` is False. This is the epoch with
+    the lowest loss even if its improvement was below ``rtol``.
+    Training losses (keys starting with ``'train'``) are computed
+    before the optimizer steps of their epoch, so the parameters the
+    epoch started with are restored; for other keys, e.g. a validation
+    loss, the parameters the epoch ended with.
+
+    Parameters
+    ----------
+    monitor : str (default='train_loss')
+      The epoch-level history key to monitor, e.g. ``'valid_loss'``.
+      Lower values are considered better. Epochs without the key are
+      skipped.
+
+    rtol : float (default=1e-4)
+      Minimum relative improvement of the monitored loss for an epoch
+      not to count as stalled.
+
+    gtol : float or None (default=None)
+      If not None, epochs whose mean gradient norm is below ``gtol``
+      count as stalled as well.
+
+    patience : int (default=3)
+      Number of consecutive stalled epochs after which training is
+      stopped.
+
+    restore_best : bool (default=True)
+      Whether to restore the parameters of the best epoch at the end
+      of training.
+
+    sink : callable (default=print)
+      Where the message about stopping is sent to when the net is
+      verbose.
+
+    """
+
+    def __init__(
+        self,
+        monitor="train_loss",
+        rtol=1e-4,
+        gtol=None,
+        patience=3,
+        restore_best=True,
+        sink=print,
+    ):
+        self.monitor = monitor
+        self.rtol = rtol
+        self.gtol = gtol
+        self.patience = patience
+        self.restore_best = restore_best
+        self.sink = sink
+
+    def initialize(self):
+        self.best_score_ = np.inf
+        self.best_epoch_ = None
+        self.best_params_ = None
+        self.epoch_params_ = None
+        self.misses_ = 0
+        self.epochs_run_ = 0
+        return self
+
+    def skips_hook(self, hook):
+        """Whether ``hook`` is a no-op with the current parameters;
+        the net then does not call it."""
+        return hook == "on_grad_computed" and self.gtol is None
+
+    def _scores_before_update(self):
+        return self.monitor.startswith("train")
+
+    # pylint: disable=arguments-differ
+    def on_train_begin(self, net, **kwargs):
+        self.initialize()
+
+    def on_epoch_begin(self, net, **kwargs):
+        if self.restore_best and self._scores_before_update():
+            self.epoch_params_ = self._get_params(net)
+
+    def on_grad_computed(self, net, named_parameters, **kwargs):
+        if self.gtol is None:
+            return
+        sq_norm = sum(
+            float(param.grad.detach().pow(2).sum())
+            for _, param in named_parameters
+            if param.grad is not None
+        )
+        net.history.record_batch("grad_norm", sq_norm ** 0.5)
+
+    def on_epoch_end(self, net, **kwargs):
+        self.epochs_run_ += 1
+        if self.monitor not in net.history[-1]:
+            # e.g. the epochs without scores of loo_validation=k
+            return
+        score = net.history[-1, self.monitor]
+        improved = self.best_epoch_ is None or (
+            self.best_score_ - score > self.rtol * abs(self.best_score_)
+        )
+        if self.best_epoch_ is None or score < self.best_score_:
+            self.best_score_ = score
+            self.best_epoch_ = net.history[-1, "epoch"]
+            if self.restore_best and self._scores_before_update():
+                self.best_params_ = self.epoch_params_
+            elif self.restore_best:
+                self.best_params_ = self._get_params(net)
+
+        grad_converged = False
+        if self.gtol is not None:
+            grad_norm = float(np.mean(net.history[-1, "batches", :, "grad_norm"]))
+            net.history.record("grad_norm", grad_norm)
+            grad_converged = grad_norm < self.gtol
+
+        self.misses_ = 0 if improved and not grad_converged else self.misses_ + 1
+        if self.misses_ < self.patience:
+            return
+
+        if grad_converged:
+            reason = "the gradient norm fell below {}".format(self.gtol)
+        else:
+            reason = "{} improved by less than {} for {} epochs".format(
+                self.monitor, self.rtol, self.patience
+            )
+        epochs_saved = max(net.max_epochs - self.epochs_run_, 0)
+        net.history.record("stop_reason", reason)
+        net.history.record("epochs_saved", epochs_saved)
+        if net.verbose:
+            self._sink(
+                "Stopping since {}; {} epochs saved.".format(reason, epochs_saved),
+                verbose=net.verbose,
+            )
+        raise KeyboardInterrupt
+
+    def on_train_end(self, net, **kwargs):
+        if not self.restore_best or self.best_params_ is None:
+            return
+        if (
+            not self._scores_before_update()
+            and self.best_epoch_ == net.history[-1, "epoch"]
+        ):
+            # the parameters are still those of the best epoch
+            return
+        module_params, likelihood_params = self.best_params_
+        net.module_.load_state_dict(module_params)
+        if likelihood_params is not None:
+            net.likelihood_.load_state_dict(likelihood_params)
+
+    @staticmethod
+    def _get_params(net):
+        module_params = _clone_state_dict(net.module_.state_dict())
+        # exact GPs hold the likelihood as a submodule
+        if any(m is net.likelihood_ for m in net.module_.modules()):
+            return module_params, None
+        return module_params, _clone_state_dict(net.likelihood_.state_dict())
+
+    def _sink(self, text, verbose):
+        if (self.sink is not print) or verbose:
+            self.sink(text)
+
+
+class HistoryExport(Callback):
+    """Append each finished epoch of the history to a binary file.
+
+    The file is written with :func:`gpwrapper.history.export_history`
+    and may be read with :func:`gpwrapper.history.read_history_export`.
+    It is truncated when the net is (re-)initialized, e.g. by ``fit``,
+    and appended to by ``partial_fit``. Since an epoch is written at
+    its end, this callback should come after the callbacks that record
+    values for the epoch.
+
+    Parameters
+    ----------
+    path : str
+      The file to write to.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def initialize(self):
+        self.epochs_exported_ = 0
+        self.truncate_ = True
+        return self
+
+    def on_epoch_end(self, net, **kwargs):
+        if self.truncate_:
+            open(self.path, "wb").close()
+            self.truncate_ = False
+        self.epochs_exported_ = export_history(
+            net.history, self.path, start=self.epochs_exported_
+        )
+
+
+def _clone_state_dict(state_dict):
+    return {
+        key: val.detach().clone() if torch.is_tensor(val) else val
+        for key, val in state_dict.items()
+    }
@@ -0,0 +1,457 @@
+"""Training on data that does not fit into memory.
+
+A :class:`ChunkedDataset` holds the inputs and targets as ``.npy``
+files opened as memory maps, optionally split over several files
+(chunks), and only reads the rows it is asked for. Its length, and
+hence the ``n_data`` of the variational criterion, comes from the
+headers of the files.
+
+Reading random single rows of a file is slow, so the nets iterate over
+a ``ChunkedDataset`` with a :class:`BlockShuffleLoader` instead of a
+``DataLoader``: it visits contiguous blocks of rows in random order,
+reads each block at once and shuffles the rows within the block (or
+within a buffer of several blocks) before cutting it into
+minibatches. At most one buffer of blocks is in memory at any time.
+Subsets of a ``ChunkedDataset``, e.g. from the ``train_split`` of the
+nets, are read the same way.
+
+A :class:`PrefetchIterator` prepares the next minibatches of any
+iterator on a background thread while the current one trains; see
+the ``prefetch`` parameter of the nets.
+
+Example::
+
+    dataset = ChunkedDataset(["X_0.npy", "X_1.npy"], ["y_0.npy", "y_1.npy"])
+    net = VariationalGaussianProcessRegressor(
+        module=MyModel,
+        n_inducing=512,
+        batch_size=4096,
+        iterator_train__shuffle=True,
+        train_split=None,
+    )
+    net.fit(dataset, None)
+
+"""
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import torch
+
+from skorch.utils import to_numpy
+
+from gpwrapper.utils import InputConverter
+
+
+__all__ = [
+    "BlockShuffleLoader",
+    "ChunkedArray",
+    "ChunkedDataset",
+    "PrefetchIterator",
+    "unwrap_subset",
+]
+
+
+def _open_chunk(chunk):
+    if isinstance(chunk, (str, os.PathLike)):
+        # only reads the header; the data stays on disk
+        return np.load(chunk, mmap_mode="r")
+    if isinstance(chunk, torch.Tensor):
+        return to_numpy(chunk)
+    return np.asarray(chunk)
+
+
+class ChunkedArray(object):
+    """The rows of several arrays, viewed as one array along the first
+    axis without copying them.
+
+    Supports ``len``, ``shape``, ``dtype`` and indexing the rows with
+    an int, a slice with step 1 or an array of ints, which only reads
+    the requested rows.
+
+    Parameters
+    ----------
+    chunks : str, array or list of those
+      The arrays, or the paths of ``.npy`` files, which are opened as
+      read-only memory maps. All chunks must have the same trailing
+      shape and dtype.
+
+    """
+
+    def __init__(self, chunks):
+        if not isinstance(chunks, (list, tuple)):
+            chunks = [chunks]
+        self.chunks = [_open_chunk(chunk) for chunk in chunks]
+        if not self.chunks:
+            raise ValueError("ChunkedArray needs at least one chunk.")
+        first = self.chunks[0]
+        for chunk in self.chunks[1:]:
+            if chunk.shape[1:] != first.shape[1:] or chunk.dtype != first.dtype:
+                raise ValueError(
+                    "All chunks must have the same trailing shape and dtype, got "
+                    "{} {} and {} {}.".format(
+                        first.shape[1:], first.dtype, chunk.shape[1:], chunk.dtype
+                    )
+                )
+        self.offsets = np.cumsum([0] + [len(chunk) for chunk in self.chunks])
+
+    @property
+    def shape(self):
+        return (int(self.offsets[-1]),) + self.chunks[0].shape[1:]
+
+    @property
+    def dtype(self):
+        return self.chunks[0].dtype
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                raise IndexError("ChunkedArray only supports slices with step 1.")
+            return self._read(start, stop)
+        if np.isscalar(idx):
+            idx = int(idx) + len(self) if idx < 0 else int(idx)
+            if not 0 <= idx < len(self):
+                raise IndexError("row index out of range")
+            i = np.searchsorted(self.offsets, idx, side="right") - 1
+            return np.array(self.chunks[i][idx - self.offsets[i]])
+        return self._take(np.asarray(idx))
+
+    def _read(self, start, stop):
+        """Read the contiguous rows ``start:stop``."""
+        parts = []
+        first = np.searchsorted(self.offsets, start, side="right") - 1
+        for i in range(max(first, 0), len(self.chunks)):
+            if self.offsets[i] >= stop:
+                break
+            lo = max(start - self.offsets[i], 0)
+            hi = min(stop - self.offsets[i], len(self.chunks[i]))
+            parts.append(self.chunks[i][lo:hi])
+        if not parts:
+            return np.empty((0,) + self.shape[1:], dtype=self.dtype)
+        return np.concatenate(parts) if len(parts) > 1 else np.array(parts[0])
+
+    def _take(self, idx):
+        """Gather the rows ``idx``, reading each chunk's rows in
+        order."""
+        idx = np.where(idx < 0, idx + len(self), idx)
+        if idx.size and (idx.min() < 0 or idx.max() >= len(self)):
+            raise IndexError("row index out of range")
+        order = np.argsort(idx, kind="stable")
+        sorted_idx = idx[order]
+        result = np.empty((len(idx),) + self.shape[1:], dtype=self.dtype)
+        chunk_ids = np.searchsorted(self.offsets, sorted_idx, side="right") - 1
+        for i in np.unique(chunk_ids):
+            in_chunk = chunk_ids == i
+            rows = sorted_idx[in_chunk] - self.offsets[i]
+            result[order[in_chunk]] = self.chunks[i][rows]
+        return result
+
+    def __repr__(self):
+        return "{}(shape={}, dtype={}, n_chunks={})".format(
+            type(self).__name__, self.shape, self.dtype, len(self.chunks)
+        )
+
+
+class ChunkedDataset(torch.utils.data.Dataset):
+    """A dataset of inputs and targets that stay on disk.
+
+    Indexing returns a single ``(Xi, yi)`` pair of tensors, so the
+    dataset also works with a ``DataLoader``; the nets iterate over it
+    with a :class:`BlockShuffleLoader` instead, which reads whole
+    blocks with :meth:`read`.
+
+    Parameters
+    ----------
+    X : str, array or list of those
+      The inputs; see :class:`ChunkedArray`.
+
+    y : str, array, list of those or None (default=None)
+      The targets, with the same number of rows as ``X``; they may be
+      chunked differently.
+
+    dtype : torch dtype, numpy dtype or str (default=torch.float32)
+      The dtype the inputs and floating point targets are converted
+      to. It must be the ``dtype`` of the net, which raises a
+      ValueError otherwise.
+
+    """
+
+    def __init__(self, X, y=None, dtype=torch.float32):
+        self.X = X if isinstance(X, ChunkedArray) else ChunkedArray(X)
+        self.y = None
+        if y is not None:
+            self.y = y if isinstance(y, ChunkedArray) else ChunkedArray(y)
+            if len(self.y) != len(self.X):
+                raise ValueError(
+                    "X and y have different numbers of rows: {} and {}.".format(
+                        len(self.X), len(self.y)
+                    )
+                )
+        self.dtype = dtype
+        self.converter_ = InputConverter(dtype)
+
+    def __len__(self):
+        return len(self.X)
+
+    def read(self, start, stop):
+        """Return the rows ``start:stop`` as a tuple of tensors
+        ``(Xi, yi)``; ``yi`` is a placeholder of zeros if there are no
+        targets."""
+        Xi = self.converter_(self.X[start:stop])
+        if self.y is None:
+            return Xi, torch.zeros(len(Xi))
+        return Xi, self.converter_(self.y[start:stop], keep_integer=True)
+
+    def take(self, indices):
+        """Return the rows ``indices`` (an array of ints) as a tuple of
+        tensors ``(Xi, yi)``, like :meth:`read`."""
+        Xi = self.converter_(self.X[indices])
+        if self.y is None:
+            return Xi, torch.zeros(len(Xi))
+        return Xi, self.converter_(self.y[indices], keep_integer=True)
+
+    def __getitem__(self, i):
+        Xi, yi = self.read(i, i + 1)
+        return Xi[0], yi[0]
+
+
+def unwrap_subset(dataset):
+    """Return the dataset underlying ``dataset`` if it is a (possibly
+    nested) ``torch.utils.data.Subset``, and the indices of the rows of
+    ``dataset`` in it; the indices are None if ``dataset`` is not a
+    subset."""
+    indices = None
+    while isinstance(dataset, torch.utils.data.Subset):
+        subset_indices = np.asarray(dataset.indices, dtype=np.int64)
+        indices = subset_indices if indices is None else subset_indices[indices]
+        dataset = dataset.dataset
+    return dataset, indices
+
+
+class BlockShuffleLoader(object):
+    """Iterates over the minibatches of a :class:`ChunkedDataset`,
+    reading it block by block.
+
+    With ``shuffle``, the blocks are visited in random order and the
+    rows of every ``n_buffer_blocks`` consecutive blocks are shuffled
+    together. Rows left over at the end of a buffer are carried over
+    to the next one, so all minibatches but the last are full. The
+    order is drawn from torch's random number generator, like the
+    order of a shuffling ``DataLoader``.
+
+    A ``torch.utils.data.Subset`` of a ``ChunkedDataset``, such as the
+    training and validation datasets of a ``CVSplit``, is read in
+    blocks of consecutive subset rows as well: contiguous blocks
+    (e.g. of the folds of an unshuffled ``KFold``) with one read, and
+    other blocks by gathering their rows chunk by chunk.
+
+    Parameters
+    ----------
+    dataset : ChunkedDataset or Subset of a ChunkedDataset
+      The dataset to iterate over.
+
+    batch_size : int (default=1)
+      The number of rows per minibatch.
+
+    shuffle : bool (default=False)
+      Whether to shuffle the blocks and the rows within the buffers.
+
+    block_size : int (default=65536)
+      The number of contiguous rows read at once.
+
+    n_buffer_blocks : int (default=1)
+      The number of blocks whose rows are shuffled together; more
+      blocks mix the data better, at the cost of memory.
+
+    """
+
+    def __init__(
+        self, dataset, batch_size=1, shuffle=False, block_size=65536, n_buffer_blocks=1
+    ):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.block_size = block_size
+        self.n_buffer_blocks = n_buffer_blocks
+        self.source_, self.indices_ = unwrap_subset(dataset)
+        if not isinstance(self.source_, ChunkedDataset):
+            raise TypeError(
+                "BlockShuffleLoader needs a ChunkedDataset or a Subset of one, "
+                "got {}.".format(type(self.source_).__name__)
+            )
+
+    def __len__(self):
+        return -(-len(self.dataset) // self.batch_size)
+
+    def _read_block(self, start, stop):
+        if self.indices_ is None:
+            return self.source_.read(start, stop)
+        indices = self.indices_[start:stop]
+        if len(indices) and np.all(np.diff(indices) == 1):
+            return self.source_.read(int(indices[0]), int(indices[-1]) + 1)
+        return self.source_.take(indices)
+
+    def _buffers(self, rng):
+        starts = np.arange(0, len(self.dataset), self.block_size)
+        if self.shuffle:
+            rng.shuffle(starts)
+        for i in range(0, len(starts), self.n_buffer_blocks):
+            blocks = [
+                self._read_block(start, start + self.block_size)
+                for start in np.sort(starts[i : i + self.n_buffer_blocks])
+            ]
+            Xb = torch.cat([block[0] for block in blocks])
+            yb = torch.cat([block[1] for block in blocks])
+            if self.shuffle:
+                perm = torch.as_tensor(rng.permutation(len(Xb)))
+                Xb, yb = Xb[perm], yb[perm]
+            yield Xb, yb
+
+    def __iter__(self):
+        seed = int(torch.randint(2 ** 31 - 1, (1,))) if self.shuffle else 0
+        rng = np.random.RandomState(seed)
+        carry = None
+        for Xb, yb in self._buffers(rng):
+            if carry is not None:
+                Xb, yb = torch.cat([carry[0], Xb]), torch.cat([carry[1], yb])
+                carry = None
+            n_full = len(Xb) - len(Xb) % self.batch_size
+            for start in range(0, n_full, self.batch_size):
+                stop = start + self.batch_size
+                yield Xb[start:stop], yb[start:stop]
+            if n_full < len(Xb):
+                carry = Xb[n_full:], yb[n_full:]
+        if carry is not None:
+            yield carry
+
+
+_END = object()
+
+
+class _Failure(object):
+    __slots__ = ("exc",)
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class PrefetchIterator(object):
+    """Iterates over ``iterable`` on a background thread, keeping up to
+    ``n_prefetch`` items ready.
+
+    While the consumer works on one item, e.g. trains on a minibatch,
+    the thread fetches (and optionally transforms) the next ones, so
+    that loading, collating and converting the data overlap with the
+    computation; torch releases the GIL in its numerical kernels.
+    Exceptions raised while fetching are re-raised by the consumer.
+    If the consumer stops early, the thread stops after the item it
+    is working on.
+
+    The first item is fetched on the calling thread: shuffling
+    iterators such as a ``DataLoader`` or a :class:`BlockShuffleLoader`
+    draw their order from torch's global random number generator when
+    their first item is fetched, which hence happens in the same order
+    relative to the caller's random numbers as without prefetching, so
+    that ``torch.manual_seed`` still makes the order reproducible.
+
+    Every iteration starts a new thread, so the iterator can be
+    iterated over several times if ``iterable`` can.
+
+    Parameters
+    ----------
+    iterable : iterable
+      The items to prefetch, e.g. a ``DataLoader``.
+
+    n_prefetch : int (default=2)
+      The maximum number of items prepared ahead.
+
+    transform : callable or None (default=None)
+      Applied to every item on the background thread.
+
+    Attributes
+    ----------
+    wait_time : float
+      The total time in seconds the consumer waited for items.
+
+    n_items : int
+      The number of items yielded.
+
+    """
+
+    def __init__(self, iterable, n_prefetch=2, transform=None):
+        if n_prefetch < 1:
+            raise ValueError("n_prefetch must be at least 1.")
+        self.iterable = iterable
+        self.n_prefetch = n_prefetch
+        self.transform = transform
+        self.wait_time = 0.0
+        self.n_items = 0
+
+    def __len__(self):
+        return len(self.iterable)
+
+    def _produce(self, iterator, items, stop):
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    return
+                if self.transform is not None:
+                    item = self.transform(item)
+                items.put(item)
+            items.put(_END)
+        except Exception as exc:  # pylint: disable=broad-except
+            items.put(_Failure(exc))
+
+    def __iter__(self):
+        tic = time.perf_counter()
+        iterator = iter(self.iterable)
+        try:
+            first = next(iterator)
+        except StopIteration:
+            return
+        if self.transform is not None:
+            first = self.transform(first)
+        self.wait_time += time.perf_counter() - tic
+
+        items = queue.Queue(maxsize=self.n_prefetch)
+        stop = threading.Event()
+        worker = threading.Thread(
+            target=self._produce,
+            args=(iterator, items, stop),
+            name="PrefetchIterator",
+            daemon=True,
+        )
+        worker.start()
+        try:
+            self.n_items += 1
+            yield first
+            while True:
+                tic = time.perf_counter()
+                item = items.get()
+                self.wait_time += time.perf_counter() - tic
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                self.n_items += 1
+                yield item
+        finally:
+            stop.set()
+            # free a slot in case the worker waits to put an item
+            while worker.is_alive():
+                try:
+                    items.get_nowait()
+                except queue.Empty:
+                    pass
+                worker.join(0.01)
@@ -0,0 +1,542 @@
+"""A history that stores the batch-level values in NumPy columns.
+
+skorch's :class:`~skorch.history.History` keeps one dict per batch.
+For long runs, e.g. stochastic variational training over millions of
+minibatches, these dicts dominate the memory of the net and make
+``save_history`` slow. :class:`ColumnarHistory` keeps the same
+interface, but the batches of each epoch are stored in a
+:class:`BatchTable`, which holds one preallocated, growable NumPy
+array per key.
+
+The binary export written by :func:`export_history` is a sequence of
+``.npy`` records that may be appended to epoch by epoch. Each epoch
+starts with a header, a ``uint8`` array holding UTF-8 encoded JSON
+with the epoch-level values, the number of batches and the
+description of the batch columns. It is followed by the values of the
+numeric columns and, for columns that are missing in some batches,
+by their masks. Non-numeric batch values are stored in the header.
+
+"""
+
+import json
+import numbers
+import warnings
+
+import numpy as np
+
+from skorch.history import History
+from skorch.utils import open_file_like
+
+
+__all__ = ["BatchTable", "ColumnarHistory", "export_history", "read_history_export"]
+
+
+# The indexing helpers below are copied from skorch.history, where
+# they are private, so that ColumnarHistory indexes exactly like
+# History without depending on skorch's internals.
+
+
+# pylint: disable=invalid-name
+class _none:
+    """Special placeholder since ``None`` is a valid value."""
+
+
+def _not_none(items):
+    """Whether the item is a placeholder or contains a placeholder."""
+    if not isinstance(items, (tuple, list)):
+        items = (items,)
+    return all(item is not _none for item in items)
+
+
+def _filter_none(items):
+    """Filter special placeholder value, preserves sequence type."""
+    type_ = list if isinstance(items, list) else tuple
+    return type_(filter(_not_none, items))
+
+
+def _getitem(item, i):
+    """Extract value or values from dicts.
+
+    Covers the case of a single key or multiple keys. If not found,
+    return placeholders instead.
+
+    """
+    if not isinstance(i, (tuple, list)):
+        return item.get(i, _none)
+    type_ = list if isinstance(item, list) else tuple
+    return type_(item.get(j, _none) for j in i)
+
+
+def _unpack_index(i):
+    """Unpack index and return exactly four elements.
+
+    If index is more shallow than 4, return None for trailing
+    dimensions. If index is deeper than 4, raise a KeyError.
+
+    """
+    if len(i) > 4:
+        raise KeyError(
+            "Tried to index history with {} indices but only "
+            "4 indices are possible.".format(len(i))
+        )
+
+    # fill trailing indices with None
+    i_e, k_e, i_b, k_b = i + tuple([None] * (4 - len(i)))
+
+    # handle special case of
+    # history[j, 'batches', somekey]
+    # which should really be
+    # history[j, 'batches', :, somekey]
+    if i_b is not None and not isinstance(i_b, (int, slice)):
+        if k_b is not None:
+            raise KeyError(
+                "The last argument '{}' is invalid; it must be a "
+                "string or tuple of strings.".format(k_b)
+            )
+        warnings.warn(
+            "Argument 3 to history slicing must be of type int or slice, e.g. "
+            "history[:, 'batches', 'train_loss'] should be "
+            "history[:, 'batches', :, 'train_loss'].",
+            DeprecationWarning,
+        )
+        i_b, k_b = slice(None), i_b
+
+    return i_e, k_e, i_b, k_b
+
+
+def _kind(value):
+    if isinstance(value, (bool, np.bool_)):
+        return "b"
+    if isinstance(value, numbers.Integral):
+        return "i"
+    if isinstance(value, numbers.Real):
+        return "f"
+    return "O"
+
+
+_DTYPES = {"b": np.bool_, "i": np.int64, "f": np.float64, "O": object}
+
+# a column of a kind can hold values of all lower kinds
+_KIND_ORDER = {"b": 0, "i": 1, "f": 2, "O": 3}
+
+
+class BatchTable(object):
+    """The batches of one epoch, stored column by column.
+
+    Each key recorded for a batch gets a column of values and a mask
+    of the batches it was recorded for. Booleans, integers and floats
+    are stored in arrays of the respective dtype; a column is
+    converted to float if integers and floats are mixed, and to an
+    object array if anything else, e.g. a list, is recorded. The
+    columns are preallocated and grow by doubling.
+
+    Indexing with an int returns the batch as a dict and indexing
+    with a slice returns a list of dicts, like the list of dicts of
+    skorch's ``History``. :meth:`select` returns the values of one or
+    more keys directly from the columns.
+
+    """
+
+    def __init__(self, capacity=16):
+        self._capacity = max(int(capacity), 1)
+        self._n_rows = 0
+        self._values = {}
+        self._masks = {}
+
+    @classmethod
+    def from_records(cls, records):
+        """Create a table from a list of batch dicts."""
+        table = cls(capacity=len(records))
+        for record in records:
+            table.append(record)
+        return table
+
+    @property
+    def keys(self):
+        """The recorded keys, in the order they were first recorded."""
+        return list(self._values)
+
+    def new_row(self):
+        """Register a new batch."""
+        if self._n_rows == self._capacity:
+            self._resize(2 * self._capacity)
+        self._n_rows += 1
+
+    def append(self, record):
+        """Register a new batch with the values of the dict
+        ``record``."""
+        self.new_row()
+        for key, value in record.items():
+            self.record(key, value)
+
+    def record(self, key, value, row=-1):
+        """Set the value of ``key`` for the batch ``row``, by default
+        the current one."""
+        row = self._check_row(row)
+        kind = _kind(value)
+        values = self._values.get(key)
+        if values is None:
+            values = self._add_column(key, kind)
+        elif _KIND_ORDER[kind] > _KIND_ORDER[values.dtype.kind]:
+            values = self._promote(key, kind)
+        try:
+            values[row] = value
+        except (OverflowError, TypeError, ValueError):
+            values = self._promote(key, "O")
+            values[row] = value
+        self._masks[key][row] = True
+
+    def select(self, idx, key):
+        """Return the values of ``key`` for the batches ``idx``.
+
+        If ``key`` is a tuple or list of keys, tuples of values are
+        returned. With a slice, only batches that have all keys are
+        included in the resulting list; with an int, missing values
+        are skorch's placeholder.
+
+        """
+        keys = key if isinstance(key, (tuple, list)) else [key]
+        if isinstance(idx, slice):
+            if any(k not in self._values for k in keys):
+                return []
+            mask = np.logical_and.reduce([self._masks[k][: self._n_rows] for k in keys])
+            columns = [self._values[k][: self._n_rows][idx] for k in keys]
+            mask = mask[idx]
+            if not mask.all():
+                columns = [column[mask] for column in columns]
+            columns = [column.tolist() for column in columns]
+            if not isinstance(key, (tuple, list)):
+                return columns[0]
+            return list(zip(*columns))
+
+        row = self._check_row(idx)
+        values = [self._get(k, row) for k in keys]
+        if not isinstance(key, (tuple, list)):
+            return values[0]
+        return tuple(values)
+
+    def contains(self, idx, key):
+        """Whether any of the batches ``idx`` has all of ``key``."""
+        keys = key if isinstance(key, (tuple, list)) else [key]
+        if any(k not in self._values for k in keys):
+            return False
+        if isinstance(idx, slice):
+            masks = [self._masks[k][: self._n_rows][idx] for k in keys]
+            return bool(np.logical_and.reduce(masks).any())
+        row = self._check_row(idx)
+        return all(self._masks[k][row] for k in keys)
+
+    def trim(self):
+        """Release the preallocated space that is not used."""
+        self._resize(max(self._n_rows, 1))
+
+    def to_list(self):
+        """Return the batches as a list of dicts."""
+        return [self[i] for i in range(self._n_rows)]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(self._n_rows)[idx]]
+        row = self._check_row(idx)
+        return {
+            key: self._get(key, row) for key in self._values if self._masks[key][row]
+        }
+
+    def __len__(self):
+        return self._n_rows
+
+    def __iter__(self):
+        for i in range(self._n_rows):
+            yield self[i]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        n_rows = max(self._n_rows, 1)
+        state["_capacity"] = n_rows
+        state["_values"] = {k: v[:n_rows].copy() for k, v in self._values.items()}
+        state["_masks"] = {k: v[:n_rows].copy() for k, v in self._masks.items()}
+        return state
+
+    def __repr__(self):
+        return "{}(n_batches={}, keys={})".format(
+            type(self).__name__, self._n_rows, self.keys
+        )
+
+    def _check_row(self, row):
+        if row < 0:
+            row += self._n_rows
+        if not 0 <= row < self._n_rows:
+            raise IndexError("batch index out of range")
+        return row
+
+    def _get(self, key, row):
+        if key not in self._values or not self._masks[key][row]:
+            return _none
+        value = self._values[key][row]
+        return value if self._values[key].dtype.kind == "O" else value.item()
+
+    def _add_column(self, key, kind):
+        self._values[key] = np.zeros(self._capacity, dtype=_DTYPES[kind])
+        self._masks[key] = np.zeros(self._capacity, dtype=bool)
+        return self._values[key]
+
+    def _promote(self, key, kind):
+        values = self._values[key]
+        if kind == "O":
+            promoted = np.empty(len(values), dtype=object)
+            # keep the Python types of the values recorded so far
+            promoted[:] = values.tolist()
+        else:
+            promoted = values.astype(_DTYPES[kind])
+        self._values[key] = promoted
+        return promoted
+
+    def _resize(self, capacity):
+        for store in (self._values, self._masks):
+            for key, column in store.items():
+                resized = np.zeros(capacity, dtype=column.dtype)
+                n = min(len(column), capacity)
+                resized[:n] = column[:n]
+                store[key] = resized
+        self._capacity = capacity
+
+
+class ColumnarHistory(History):
+    """A :class:`~skorch.history.History` whose batches are stored in
+    NumPy columns.
+
+    It is used like skorch's ``History``: the epochs are dicts, and the
+    same indexing, e.g. ``history[-1, 'batches', -1, 'train_loss']`` or
+    ``history[:, 'batches', :, ('valid_batch_size', 'valid_loss')]``,
+    returns the same values. The ``'batches'`` entry of an epoch is a
+    :class:`BatchTable` instead of a list of dicts, though, and
+    selecting batch values only reads the columns of the requested
+    epochs. The table of an epoch is trimmed to its size when the next
+    epoch starts.
+
+    ``to_list`` and ``to_file`` convert the batches back to lists of
+    dicts; see :func:`export_history` for a compact binary format that
+    can be written incrementally.
+
+    Parameters
+    ----------
+    epochs : list of dicts (default=())
+      Epochs to start with, e.g. loaded from a JSON file. Their
+      batches are converted to tables.
+
+    """
+
+    def __init__(self, epochs=()):
+        super(ColumnarHistory, self).__init__()
+        for epoch in epochs:
+            epoch = dict(epoch)
+            batches = epoch.get("batches", [])
+            if not isinstance(batches, BatchTable):
+                epoch["batches"] = BatchTable.from_records(batches)
+            self.append(epoch)
+
+    def new_epoch(self):
+        """Register a new epoch row."""
+        if self:
+            self._last_epoch()["batches"].trim()
+        self.append({"batches": BatchTable()})
+
+    def new_batch(self):
+        """Register a new batch row for the current epoch."""
+        self._last_epoch()["batches"].new_row()
+
+    def record_batch(self, attr, value):
+        """Add a new value to the given column for the current
+        batch.
+
+        """
+        self._last_epoch()["batches"].record(attr, value)
+
+    def to_list(self):
+        """Return history object as a list of dicts, with the batches
+        as lists of dicts."""
+        return [_epoch_to_dict(epoch) for epoch in list.__iter__(self)]
+
+    def to_file(self, f):
+        """Saves the history as a json file. See ``History.to_file``."""
+        with open_file_like(f, "w") as fp:
+            json.dump(self.to_list(), fp)
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, slice)):
+            i = (i,)
+
+        # i_e: index epoch, k_e: key epoch
+        # i_b: index batch, k_b: key batch
+        i_e, k_e, i_b, k_b = _unpack_index(i)
+        keyerror_msg = "Key '{}' was not found in history."
+
+        if i_b is not None and k_e != "batches":
+            raise KeyError(
+                "History indexing beyond the 2nd level is "
+                "only possible if key 'batches' is used, "
+                "found key '{}'.".format(k_e)
+            )
+
+        items = list(list.__iter__(self))
+
+        if i_b is not None and k_b is None:
+            items = [row[k_e][i_b] for row in items]
+        elif i_b is not None:
+            # As in History, epochs without the key are skipped before
+            # the epochs are selected; only the selected epochs' values
+            # are read from the columns, though.
+            tables = [row[k_e] for row in items if row[k_e].contains(i_b, k_b)]
+            if not tables:
+                raise KeyError(keyerror_msg.format(k_b))
+            if i_e is None:
+                return [table.select(i_b, k_b) for table in tables]
+            if isinstance(i_e, slice):
+                return [table.select(i_b, k_b) for table in tables[i_e]]
+            return tables[i_e].select(i_b, k_b)
+
+        # extract epoch-level values, but only if not already done
+        if (k_e is not None) and (i_b is None):
+            items = [_getitem(row, k_e) for row in items]
+            if not _filter_none(items):
+                raise KeyError(keyerror_msg.format(k_e))
+
+        # extract the epochs
+        if i_e is not None:
+            items = items[i_e]
+            if isinstance(i_e, slice):
+                items = _filter_none(items)
+            if items is _none:
+                raise KeyError(keyerror_msg.format(k_e))
+
+        return items
+
+    def _last_epoch(self):
+        if not self:
+            raise ValueError("Call new_epoch before recording for the first time.")
+        return list.__getitem__(self, -1)
+
+
+def _epoch_to_dict(epoch):
+    epoch = dict(epoch)
+    batches = epoch.get("batches")
+    if isinstance(batches, BatchTable):
+        epoch["batches"] = batches.to_list()
+    return epoch
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(
+        "Object of type {} is not JSON serializable".format(type(value).__name__)
+    )
+
+
+def _write_epoch(fp, epoch):
+    epoch = dict(epoch)
+    batches = epoch.pop("batches", [])
+    if not isinstance(batches, BatchTable):
+        batches = BatchTable.from_records(batches)
+    n_rows = len(batches)
+    columns, arrays = [], []
+    for key in batches.keys:
+        values = batches._values[key][:n_rows]  # pylint: disable=protected-access
+        mask = batches._masks[key][:n_rows]  # pylint: disable=protected-access
+        column = {"key": key, "dtype": values.dtype.str, "masked": not mask.all()}
+        if values.dtype.kind == "O":
+            column["values"] = [v if m else None for v, m in zip(values.tolist(), mask)]
+            column["mask"] = mask.tolist()
+        else:
+            arrays.append(values)
+            if column["masked"]:
+                arrays.append(mask)
+        columns.append(column)
+
+    header = {"epoch": epoch, "n_batches": n_rows, "columns": columns}
+    header = json.dumps(header, default=_json_default).encode("utf-8")
+    np.save(fp, np.frombuffer(header, dtype=np.uint8), allow_pickle=False)
+    for array in arrays:
+        np.save(fp, array, allow_pickle=False)
+
+
+def _read_epoch(fp):
+    header = np.load(fp, allow_pickle=False)
+    header = json.loads(header.tobytes().decode("utf-8"))
+    n_rows = header["n_batches"]
+    batches = BatchTable(capacity=n_rows)
+    batches._n_rows = n_rows  # pylint: disable=protected-access
+    for column in header["columns"]:
+        key = column["key"]
+        if np.dtype(column["dtype"]).kind == "O":
+            values = np.empty(n_rows, dtype=object)
+            values[:] = column["values"]
+            mask = np.array(column["mask"], dtype=bool)
+        else:
+            values = np.load(fp, allow_pickle=False)
+            if column["masked"]:
+                mask = np.load(fp, allow_pickle=False)
+            else:
+                mask = np.ones(n_rows, dtype=bool)
+        batches._values[key] = values  # pylint: disable=protected-access
+        batches._masks[key] = mask  # pylint: disable=protected-access
+    batches.trim()
+
+    epoch = header["epoch"]
+    epoch["batches"] = batches
+    return epoch
+
+
+def export_history(history, f, start=0):
+    """Append the epochs of ``history`` from ``start`` on to ``f`` in
+    the binary format described in the module docstring.
+
+    ``history`` may be a :class:`ColumnarHistory` or skorch's
+    ``History``. To export incrementally, open the file in append mode
+    and pass the number of epochs exported so far as ``start``; note
+    that values recorded for an epoch after it was exported are not
+    exported.
+
+    Parameters
+    ----------
+    history : History
+      The history to export.
+
+    f : file-like object or str
+      Where to append the epochs to. Opened in append mode if it is a
+      path.
+
+    start : int (default=0)
+      Index of the first epoch to export.
+
+    Returns
+    -------
+    n_epochs : int
+      The number of epochs of ``history``, i.e. ``start`` for the next
+      export.
+
+    """
+    epochs = list.__getitem__(history, slice(start, None))
+    with open_file_like(f, "ab") as fp:
+        for epoch in epochs:
+            _write_epoch(fp, epoch)
+    return len(history)
+
+
+def read_history_export(f):
+    """Read the epochs written by :func:`export_history` into a
+    :class:`ColumnarHistory`.
+
+    Parameters
+    ----------
+    f : file-like object or str
+
+    """
+    history = ColumnarHistory()
+    with open_file_like(f, "rb") as fp:
+        while fp.read(1):
+            fp.seek(-1, 1)
+            history.append(_read_epoch(fp))
+    return history
@@ -0,0 +1,237 @@
+"""Initializing the hyperparameters of a GP from its training data.
+
+The default hyperparameters of GPyTorch modules (lengthscales and
+output scales of 1 or ``softplus(0)``, a small noise) only suit data
+that is scaled to unit range. For other data, most of the first
+epochs are spent moving the hyperparameters to the right order of
+magnitude. :func:`initialize_from_data` sets them from simple
+statistics of (a subsample of) the training data instead:
+
+* lengthscales: a quantile of the pairwise distances between the
+  inputs, per input dimension for ARD kernels,
+* output scales: the variance of the targets that is not explained by
+  the noise,
+* noise: half the mean squared difference between the targets of
+  nearest neighbours, a residual estimate that does not need a fit,
+* constant means: the mean of the targets.
+
+Hyperparameters are found by name, whether GPyTorch stores them as
+``raw_<name>`` (with a property that transforms them) or, as in its
+earlier versions, as ``log_<name>``.
+
+"""
+
+import warnings
+
+import numpy as np
+import torch
+
+import gpytorch
+from skorch.utils import to_numpy
+
+from gpwrapper.utils import distance_quantile
+from gpwrapper.utils import pairwise_distances
+
+
+__all__ = ["initialize_from_data"]
+
+
+def _own_parameters(module):
+    return module._parameters  # pylint: disable=protected-access
+
+
+def _has_hyperparameter(module, name):
+    params = _own_parameters(module)
+    return any(key in params for key in ("raw_" + name, "log_" + name, name))
+
+
+def _bounds(module, name):
+    """Return the lower and upper bound of the hyperparameter ``name``
+    of ``module`` (not of its raw or log parameter), each None if
+    there is none."""
+    constraint = getattr(module, "raw_{}_constraint".format(name), None)
+    if constraint is not None:
+        return constraint.lower_bound, constraint.upper_bound
+    # earlier versions register parameters with bounds
+    bounds = getattr(module, "_bounds", None) or {}
+    if "log_" + name in bounds:
+        lower, upper = bounds["log_" + name]
+        return torch.as_tensor(lower).exp(), torch.as_tensor(upper).exp()
+    return bounds.get(name, (None, None))
+
+
+def _clip(value, lower, upper):
+    # slightly inside of finite bounds, where the inverse transforms of
+    # constrained parameters are finite
+    if lower is not None:
+        lower = torch.as_tensor(lower, dtype=torch.float64)
+        margin = 1e-6 * lower.abs().clamp(min=1e-12)
+        value = torch.max(value, torch.where(torch.isfinite(lower), lower + margin, lower))
+    if upper is not None:
+        upper = torch.as_tensor(upper, dtype=torch.float64)
+        margin = 1e-6 * upper.abs().clamp(min=1e-12)
+        value = torch.min(value, torch.where(torch.isfinite(upper), upper - margin, upper))
+    return value
+
+
+def _set_hyperparameter(module, name, value):
+    """Set the hyperparameter ``name`` of ``module`` to ``value`` (a
+    float or a tensor that is broadcast to its shape), clipped into its
+    bounds with a warning, and return the value that was set."""
+    params = _own_parameters(module)
+    estimate = torch.as_tensor(value, dtype=torch.float64)
+    value = _clip(estimate, *_bounds(module, name))
+    if not torch.allclose(value, estimate, rtol=1e-4, atol=0):
+        lower, upper = _bounds(module, name)
+        warnings.warn(
+            "The {} of {} estimated from the data was clipped into its bounds "
+            "({}, {}).".format(
+                name,
+                np.round(to_numpy(estimate), 6).tolist(),
+                None if lower is None else float(lower),
+                None if upper is None else float(upper),
+            )
+        )
+    if "raw_" + name in params:
+        module.initialize(**{name: value.to(params["raw_" + name].dtype)})
+    elif "log_" + name in params:
+        param = params["log_" + name]
+        param.data.copy_(value.log().to(param.dtype).expand_as(param))
+    else:
+        param = params[name]
+        param.data.copy_(value.to(param.dtype).expand_as(param))
+    return value.item() if value.dim() == 0 else value.tolist()
+
+
+def _lengthscale_dims(module):
+    params = _own_parameters(module)
+    param = params.get("raw_lengthscale", params.get("log_lengthscale"))
+    return param.shape[-1] if param.dim() else 1
+
+
+def _lengthscale(X, kernel, n_dims, quantile):
+    active_dims = getattr(kernel, "active_dims", None)
+    if active_dims is not None:
+        X = X[:, to_numpy(torch.as_tensor(active_dims))]
+    rows, cols = np.triu_indices(len(X), 1)
+    if n_dims > 1 and n_dims == X.shape[1]:
+        # ARD: one lengthscale per dimension
+        return np.array(
+            [
+                distance_quantile(np.abs(X[rows, j] - X[cols, j]), quantile)
+                for j in range(n_dims)
+            ]
+        )
+    return distance_quantile(pairwise_distances(X)[rows, cols], quantile)
+
+
+def _nearest_neighbour_noise(X, y):
+    distances = pairwise_distances(X)
+    np.fill_diagonal(distances, np.inf)
+    neighbours = distances.argmin(1)
+    return 0.5 * float(np.mean((y - y[neighbours]) ** 2))
+
+
+def initialize_from_data(
+    module, likelihood, X, y=None, n_subsample=1000, quantile=0.5, random_state=0
+):
+    """Set the hyperparameters of ``module`` and ``likelihood`` from
+    the training data ``X`` and ``y``, see the module docstring.
+
+    The statistics of the targets are only used with a
+    ``GaussianLikelihood``. The noise estimate is clipped to between
+    1e-4 and 0.5 times the target variance; the rest of the variance
+    is split evenly among the output scales. All values are clipped
+    into the bounds (or constraints) of the hyperparameters, with a
+    warning.
+    Hyperparameters that the modules don't have are skipped.
+
+    Parameters
+    ----------
+    module : torch module
+      The GP model.
+
+    likelihood : gpytorch likelihood
+      The likelihood; may be a submodule of ``module``.
+
+    X : torch tensor or numpy array of shape (n_samples,) or
+      (n_samples, n_features)
+      The training inputs.
+
+    y : torch tensor, numpy array or None (default=None)
+      The training targets.
+
+    n_subsample : int (default=1000)
+      The statistics are computed on this many randomly chosen
+      samples, since the pairwise distances take quadratic time and
+      memory.
+
+    quantile : float (default=0.5)
+      The quantile of the pairwise distances used as lengthscale.
+
+    random_state : int or None (default=0)
+      Seed of the subsample.
+
+    Returns
+    -------
+    values : dict
+      The values that were set, by hyperparameter name.
+
+    """
+    X = to_numpy(torch.as_tensor(X)).astype(np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    idx = np.arange(len(X))
+    if len(X) > n_subsample:
+        rng = np.random.RandomState(random_state)
+        idx = np.sort(rng.choice(len(X), n_subsample, replace=False))
+    X = X[idx]
+
+    values = {}
+    lengthscales = []
+    for submodule in module.modules():
+        if _has_hyperparameter(submodule, "lengthscale"):
+            n_dims = _lengthscale_dims(submodule)
+            lengthscale = _lengthscale(X, submodule, n_dims, quantile)
+            lengthscale = _set_hyperparameter(submodule, "lengthscale", lengthscale)
+            lengthscales.append(np.atleast_1d(lengthscale).tolist())
+    if lengthscales:
+        values["lengthscale"] = lengthscales
+
+    if y is None or not isinstance(likelihood, gpytorch.likelihoods.GaussianLikelihood):
+        return values
+    y = to_numpy(torch.as_tensor(y)).astype(np.float64)
+    if y.ndim > 1 and y.shape[1:] != (1,):
+        # e.g. several tasks; the statistics would be per task
+        return values
+    y = y.reshape(-1)[idx]
+    variance = float(np.var(y))
+    if variance <= 0:
+        return values
+
+    noise = _nearest_neighbour_noise(X, y)
+    noise = min(max(noise, 1e-4 * variance), 0.5 * variance)
+    # modules shared by the model and the likelihood are visited once
+    likelihood_modules = list(likelihood.modules())
+    model_modules = [
+        m for m in module.modules() if not any(m is l for l in likelihood_modules)
+    ]
+
+    for submodule in likelihood_modules:
+        if _has_hyperparameter(submodule, "noise"):
+            noise = _set_hyperparameter(submodule, "noise", noise)
+            values["noise"] = noise
+
+    scaled = [m for m in model_modules if _has_hyperparameter(m, "outputscale")]
+    for submodule in scaled:
+        outputscale = max(variance - noise, 1e-4 * variance) / len(scaled)
+        values["outputscale"] = _set_hyperparameter(
+            submodule, "outputscale", outputscale
+        )
+
+    for submodule in model_modules:
+        if isinstance(submodule, gpytorch.means.ConstantMean):
+            values["constant"] = _set_hyperparameter(
+                submodule, "constant", float(np.mean(y))
+            )
+    return values
@@ -0,0 +1,235 @@
+"""Selecting the inducing points of variational GPs from the data.
+
+Variational models get the inducing points as the first argument of
+the module, and passing all of the training data (or its first rows)
+makes for slow or poorly converging fits. The functions here select
+``n_inducing`` points that cover the inputs:
+
+* :func:`kmeans_inducing_points` runs minibatch k-means, so each
+  iteration only reads a minibatch of rows,
+* :func:`greedy_variance_inducing_points` greedily picks the
+  candidate with the largest posterior variance given the points
+  picked so far, under an RBF kernel (a partial pivoted Cholesky
+  decomposition of the kernel matrix of the candidates).
+
+Both only read the rows they need, so ``X`` may be a numpy memmap
+larger than the memory.
+
+"""
+
+import numpy as np
+import torch
+
+from skorch.utils import to_numpy
+
+from gpwrapper.utils import distance_quantile
+from gpwrapper.utils import pairwise_distances
+
+
+__all__ = [
+    "greedy_variance_inducing_points",
+    "kmeans_inducing_points",
+    "select_inducing_points",
+]
+
+
+def _take(X, idx):
+    """Return the rows ``idx`` (sorted) of ``X`` as a 2-D float64
+    array."""
+    if isinstance(X, torch.Tensor):
+        rows = to_numpy(X[torch.as_tensor(idx)])
+    else:
+        rows = np.asarray(X[idx])
+    rows = rows.astype(np.float64)
+    return rows.reshape(len(rows), -1)
+
+
+def _sample(n_samples, size, rng):
+    if size >= n_samples:
+        return np.arange(n_samples)
+    return np.sort(rng.choice(n_samples, size, replace=False))
+
+
+def _sq_distances(A, B):
+    sq_dists = (A ** 2).sum(1)[:, None] + (B ** 2).sum(1)[None, :] - 2 * A.dot(B.T)
+    return np.maximum(sq_dists, 0)
+
+
+def _kmeans_plusplus(X, n_clusters, rng):
+    centers = [X[rng.randint(len(X))]]
+    closest = _sq_distances(X, centers[0][None])[:, 0]
+    for _ in range(1, n_clusters):
+        total = closest.sum()
+        if total > 0:
+            i = rng.choice(len(X), p=closest / total)
+        else:
+            i = rng.randint(len(X))
+        centers.append(X[i])
+        closest = np.minimum(closest, _sq_distances(X, X[i][None])[:, 0])
+    return np.array(centers)
+
+
+def kmeans_inducing_points(
+    X, n_inducing, batch_size=1024, n_iter=100, random_state=0
+):
+    """Return the centers of a minibatch k-means clustering of ``X``.
+
+    The centers are initialized by k-means++ on a subsample of
+    ``10 * n_inducing`` rows. Every iteration then assigns a random
+    minibatch of rows to their nearest centers and moves the centers
+    towards them with a per-center learning rate of one over the
+    number of rows assigned to it so far (Sculley, 2010).
+
+    Parameters
+    ----------
+    X : torch tensor or numpy array of shape (n_samples, n_features)
+      The inputs.
+
+    n_inducing : int
+      The number of inducing points. If ``X`` has no more rows, all
+      of its rows are returned.
+
+    batch_size : int (default=1024)
+      The number of rows per iteration.
+
+    n_iter : int (default=100)
+      The number of iterations.
+
+    random_state : int or None (default=0)
+      Seed of the initialization and of the minibatches.
+
+    Returns
+    -------
+    inducing_points : numpy array of shape (n_inducing, n_features)
+
+    """
+    rng = np.random.RandomState(random_state)
+    n_samples = len(X)
+    if n_samples <= n_inducing:
+        return _take(X, np.arange(n_samples))
+
+    centers = _kmeans_plusplus(
+        _take(X, _sample(n_samples, 10 * n_inducing, rng)), n_inducing, rng
+    )
+    counts = np.zeros(n_inducing)
+    for _ in range(n_iter):
+        batch = _take(X, _sample(n_samples, batch_size, rng))
+        labels = _sq_distances(batch, centers).argmin(1)
+        batch_counts = np.bincount(labels, minlength=n_inducing)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, batch)
+        assigned = batch_counts > 0
+        counts[assigned] += batch_counts[assigned]
+        # c <- c + (sum_j x_j - n_j * c) / n, the per-sample updates
+        # of the batch done at once
+        centers[assigned] += (
+            sums[assigned] - batch_counts[assigned, None] * centers[assigned]
+        ) / counts[assigned, None]
+    return centers
+
+
+def greedy_variance_inducing_points(
+    X, n_inducing, n_candidates=10000, lengthscale=None, random_state=0
+):
+    """Greedily select the rows of ``X`` with the largest conditional
+    variance.
+
+    Starting from a random candidate, the candidate whose prior
+    variance under an RBF kernel is explained least by the points
+    selected so far is added, until ``n_inducing`` points are selected
+    or the remaining candidates are explained (up to numerical
+    precision) already. This is a partial pivoted Cholesky
+    decomposition of the candidates' kernel matrix and takes
+    ``O(n_candidates * n_inducing ** 2)`` time.
+
+    Parameters
+    ----------
+    X : torch tensor or numpy array of shape (n_samples, n_features)
+      The inputs.
+
+    n_inducing : int
+      The maximum number of inducing points.
+
+    n_candidates : int (default=10000)
+      The number of randomly chosen rows of ``X`` to select from.
+
+    lengthscale : float or None (default=None)
+      The lengthscale of the RBF kernel. If None, the median distance
+      between (up to 1000 of) the candidates is used.
+
+    random_state : int or None (default=0)
+      Seed of the candidates and of the first point.
+
+    Returns
+    -------
+    inducing_points : numpy array of shape (n_selected, n_features)
+
+    """
+    rng = np.random.RandomState(random_state)
+    candidates = _take(X, _sample(len(X), n_candidates, rng))
+    n_inducing = min(n_inducing, len(candidates))
+    if lengthscale is None:
+        subset = candidates[_sample(len(candidates), 1000, rng)]
+        rows, cols = np.triu_indices(len(subset), 1)
+        lengthscale = distance_quantile(pairwise_distances(subset)[rows, cols], 0.5)
+    scaled = candidates / lengthscale
+
+    variances = np.ones(len(candidates))
+    factor = np.zeros((len(candidates), n_inducing))
+    selected = []
+    pivot = rng.randint(len(candidates))
+    for j in range(n_inducing):
+        if variances[pivot] <= 1e-10:
+            break
+        selected.append(pivot)
+        covariances = np.exp(-0.5 * _sq_distances(scaled, scaled[pivot][None])[:, 0])
+        column = covariances - factor[:, :j].dot(factor[pivot, :j])
+        column /= np.sqrt(variances[pivot])
+        factor[:, j] = column
+        variances = np.maximum(variances - column ** 2, 0)
+        variances[selected] = 0
+        pivot = int(variances.argmax())
+    return candidates[selected]
+
+
+_METHODS = {
+    "kmeans": kmeans_inducing_points,
+    "greedy_variance": greedy_variance_inducing_points,
+}
+
+
+def select_inducing_points(X, n_inducing, method="kmeans", **kwargs):
+    """Select ``n_inducing`` inducing points from the inputs ``X``.
+
+    Parameters
+    ----------
+    X : torch tensor or numpy array of shape (n_samples, n_features)
+      The inputs.
+
+    n_inducing : int
+      The number of inducing points.
+
+    method : str or callable (default='kmeans')
+      ``'kmeans'`` for :func:`kmeans_inducing_points`,
+      ``'greedy_variance'`` for
+      :func:`greedy_variance_inducing_points`, or a function with
+      the same signature.
+
+    kwargs
+      Passed to the method.
+
+    Returns
+    -------
+    inducing_points : numpy array of shape (n_selected,) + X.shape[1:]
+
+    """
+    if not callable(method):
+        try:
+            method = _METHODS[method]
+        except KeyError:
+            raise ValueError(
+                "Unknown inducing point method {!r}; use one of {} or a "
+                "callable.".format(method, sorted(_METHODS))
+            )
+    points = method(X, n_inducing, **kwargs)
+    return points.reshape((len(points),) + tuple(X.shape[1:]))
@@ -0,0 +1,188 @@
+"""Default GP models for the engines of
+:class:`gpwrapper.auto.AutoGaussianProcessRegressor` and the
+benchmarks.
+
+Every model has a constant mean and a scaled RBF kernel, like the
+models of the example notebooks. The models that put the kernel on a
+grid take the grid as arguments, which nets pass as ``module__``
+parameters, e.g. ``module__grid_size=100`` and
+``module__grid_bounds=[(0, 1)]``. All models are defined at module
+level so that nets using them can be pickled.
+
+The models work with the gpytorch versions that name their
+distributions ``GaussianRandomVariable`` and bound their parameters
+with ``bounds``, and with later ones, where the hyperparameters are
+unbounded and the models without a counterpart (the grid-inducing
+variational GPs) are None.
+
+"""
+
+import torch
+from torch import nn
+
+import gpytorch
+from gpytorch.kernels import GridInterpolationKernel
+from gpytorch.kernels import RBFKernel
+from gpytorch.means import ConstantMean
+
+try:
+    from gpytorch.random_variables import GaussianRandomVariable as Distribution
+
+    _BOUNDED_PARAMETERS = True
+except ImportError:  # later gpytorch versions renamed the random variables
+    from gpytorch.distributions import MultivariateNormal as Distribution
+
+    _BOUNDED_PARAMETERS = False
+
+try:
+    from gpytorch.kernels import AdditiveGridInterpolationKernel
+except ImportError:  # replaced by AdditiveStructureKernel
+    AdditiveGridInterpolationKernel = None
+
+
+__all__ = [
+    "AdditiveGridInducingModel",
+    "AdditiveKissGPModel",
+    "ExactGPModel",
+    "GridInducingModel",
+    "KissGPModel",
+    "VariationalGPModel",
+]
+
+
+_LOG_SCALE_BOUNDS = (-5, 6)
+
+
+def _rbf_kernel():
+    if _BOUNDED_PARAMETERS:
+        return RBFKernel(log_lengthscale_bounds=_LOG_SCALE_BOUNDS)
+    return RBFKernel()
+
+
+def _additive_grid_kernel(kernel, grid_size, grid_bounds, n_components):
+    """Return the sum of ``n_components`` one-dimensional KISS-GP
+    kernels on the grid ``grid_bounds``, one per input dimension."""
+    if AdditiveGridInterpolationKernel is not None:
+        return AdditiveGridInterpolationKernel(
+            kernel,
+            grid_size=grid_size,
+            grid_bounds=[grid_bounds],
+            n_components=n_components,
+        )
+    return gpytorch.kernels.AdditiveStructureKernel(
+        GridInterpolationKernel(
+            kernel, grid_size=grid_size, num_dims=1, grid_bounds=[grid_bounds]
+        ),
+        num_dims=n_components,
+    )
+
+
+class _ScaledRBFMixin(object):
+    """Sets up the constant mean and the scaled RBF kernel, optionally
+    wrapped by ``wrap_kernel``."""
+
+    def _init_modules(self, wrap_kernel=None):
+        self.mean_module = ConstantMean()
+        kernel = _rbf_kernel()
+        self.covar_module = kernel if wrap_kernel is None else wrap_kernel(kernel)
+        log_outputscale = nn.Parameter(torch.Tensor([0]))
+        if _BOUNDED_PARAMETERS:
+            self.register_parameter(
+                "log_outputscale", log_outputscale, bounds=_LOG_SCALE_BOUNDS
+            )
+        else:
+            self.register_parameter("log_outputscale", log_outputscale)
+
+    def forward(self, x):
+        mean_x = self.mean_module(x)
+        covar_x = self.covar_module(x).mul(self.log_outputscale.exp())
+        return Distribution(mean_x, covar_x)
+
+
+class ExactGPModel(_ScaledRBFMixin, gpytorch.models.ExactGP):
+    """Exact GP with a constant mean and a scaled RBF kernel."""
+
+    def __init__(self, train_x, train_y, likelihood):
+        super(ExactGPModel, self).__init__(train_x, train_y, likelihood)
+        self._init_modules()
+
+
+class VariationalGPModel(_ScaledRBFMixin, gpytorch.models.VariationalGP):
+    """Variational GP whose inducing points are initialized to
+    ``train_inputs``; see ``n_inducing`` of
+    :class:`gpwrapper.VariationalGaussianProcess`."""
+
+    def __init__(self, train_inputs):
+        super(VariationalGPModel, self).__init__(train_inputs)
+        self._init_modules()
+
+
+class KissGPModel(_ScaledRBFMixin, gpytorch.models.ExactGP):
+    """Exact GP whose kernel is interpolated from a grid of
+    ``grid_size ** len(grid_bounds)`` points (KISS-GP), which has
+    Kronecker structure for more than one dimension. ``grid_bounds``
+    holds a ``(lower, upper)`` pair per input dimension."""
+
+    def __init__(self, train_x, train_y, likelihood, grid_size, grid_bounds):
+        super(KissGPModel, self).__init__(train_x, train_y, likelihood)
+        self._init_modules(
+            lambda kernel: GridInterpolationKernel(
+                kernel, grid_size=grid_size, grid_bounds=grid_bounds
+            )
+        )
+
+
+class AdditiveKissGPModel(_ScaledRBFMixin, gpytorch.models.ExactGP):
+    """Exact GP with one one-dimensional KISS-GP kernel per input
+    dimension, summed. ``grid_bounds`` is a single ``(lower, upper)``
+    pair shared by all ``n_components`` dimensions."""
+
+    def __init__(
+        self, train_x, train_y, likelihood, grid_size, grid_bounds, n_components
+    ):
+        super(AdditiveKissGPModel, self).__init__(train_x, train_y, likelihood)
+        self._init_modules(
+            lambda kernel: _additive_grid_kernel(
+                kernel, grid_size, grid_bounds, n_components
+            )
+        )
+
+
+if hasattr(gpytorch.models, "GridInducingVariationalGP"):
+
+    class GridInducingModel(_ScaledRBFMixin, gpytorch.models.GridInducingVariationalGP):
+        """Variational GP whose inducing points are a grid of
+        ``grid_size ** len(grid_bounds)`` points."""
+
+        def __init__(self, grid_size, grid_bounds):
+            super(GridInducingModel, self).__init__(
+                grid_size=grid_size, grid_bounds=grid_bounds
+            )
+            self._init_modules()
+
+
+else:  # removed in later gpytorch versions
+    GridInducingModel = None
+
+
+if hasattr(gpytorch.models, "AdditiveGridInducingVariationalGP"):
+
+    class AdditiveGridInducingModel(
+        _ScaledRBFMixin, gpytorch.models.AdditiveGridInducingVariationalGP
+    ):
+        """Variational GP with one one-dimensional grid of
+        ``grid_size`` inducing points per input dimension.
+        ``grid_bounds`` is a single ``(lower, upper)`` pair shared by
+        all ``n_components`` dimensions."""
+
+        def __init__(self, grid_size, grid_bounds, n_components):
+            super(AdditiveGridInducingModel, self).__init__(
+                grid_size=grid_size,
+                grid_bounds=[grid_bounds],
+                n_components=n_components,
+            )
+            self._init_modules()
+
+
+else:  # removed in later gpytorch versions
+    AdditiveGridInducingModel = None
@@ -0,0 +1,384 @@
+"""Running several fits or predictions of a GP in parallel processes."""
+
+import copy
+import inspect
+import math
+import mmap
+import os
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from skorch.utils import is_dataset
+
+
+__all__ = ["fit_restarts", "predict_sharded", "shared_empty"]
+
+
+# Set in the parent before the pool is created; forked workers inherit
+# the net and the data through this instead of pickling them.
+_restart_state = {}
+
+_predict_state = {}
+
+
+def _perturb(module, generator, scale):
+    with torch.no_grad():
+        for param in module.parameters():
+            noise = torch.randn(param.shape, generator=generator, dtype=param.dtype)
+            param.add_(noise.to(param.device) * scale)
+
+
+def _get_likelihood_if_separate(net):
+    # exact GPs hold the likelihood as a submodule
+    if any(m is net.likelihood_ for m in net.module_.modules()):
+        return None
+    return net.likelihood_
+
+
+def _copy_instances(net):
+    """Give the net its own copies of the module and likelihood if they
+    are instances, which fitting would change in place; they are
+    copied together to keep references between them."""
+    module, likelihood = net.module, net.likelihood
+    if inspect.isclass(module) and inspect.isclass(likelihood):
+        return
+    net.module, net.likelihood = copy.deepcopy((module, likelihood))
+
+
+def _run_restart(seed, restart_idx):
+    """Fit a fresh copy of the net from a perturbed initialization and
+    return its final loss, parameters and history."""
+    state = _restart_state
+    net, X, y, fit_params = state["net"], state["X"], state["y"], state["fit_params"]
+    if not state["in_process"]:
+        # the net is a forked copy; don't interleave the workers' logs
+        net.verbose = 0
+
+    module, likelihood = net.module, net.likelihood
+    # the restart's random numbers, e.g. of the initialization and the
+    # shuffling, come from its seed without touching the caller's
+    with torch.random.fork_rng():
+        torch.manual_seed(seed)
+        _copy_instances(net)
+        try:
+            net.initialize(X, y)
+            # the first restart starts from the module's own
+            # initialization
+            if restart_idx > 0:
+                generator = torch.Generator().manual_seed(seed)
+                _perturb(net.module_, generator, state["scale"])
+                likelihood_ = _get_likelihood_if_separate(net)
+                if likelihood_ is not None:
+                    _perturb(likelihood_, generator, state["scale"])
+
+            net.notify("on_train_begin", X=X, y=y)
+            try:
+                net.fit_loop(X, y, **fit_params)
+            except KeyboardInterrupt:
+                pass
+            net.notify("on_train_end", X=X, y=y)
+        finally:
+            net.module, net.likelihood = module, likelihood
+
+    likelihood_ = _get_likelihood_if_separate(net)
+    return {
+        "seed": seed,
+        "train_loss": _last_train_loss(net.history),
+        "epochs": len(net.history),
+        "module_state": _detach_state(net.module_.state_dict()),
+        "likelihood_state": (
+            None if likelihood_ is None else _detach_state(likelihood_.state_dict())
+        ),
+        "history": net.history,
+    }
+
+
+def _last_train_loss(history):
+    """Return the training loss of the last epoch that has one, or inf
+    if none has, e.g. if the restart was interrupted in its first
+    epoch."""
+    for i in reversed(range(len(history))):
+        try:
+            return float(history[i, "train_loss"])
+        except KeyError:
+            continue
+    return math.inf
+
+
+def _detach_state(state_dict):
+    return {
+        key: val.detach().clone() if torch.is_tensor(val) else val
+        for key, val in state_dict.items()
+    }
+
+
+def _final_loss(result):
+    loss = result["train_loss"]
+    return math.inf if math.isnan(loss) else loss
+
+
+def _get_n_jobs(n_jobs, n_tasks):
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, n_tasks)
+    if "fork" not in mp.get_all_start_methods():
+        n_jobs = 1
+    return max(n_jobs, 1)
+
+
+class _SingleThreaded(object):
+    """Run torch single-threaded in the block, and hence in processes
+    forked in it.
+
+    A forked child inherits the state of the parent's intra-op thread
+    pool (e.g. OpenMP's) but not its threads, so a child that runs
+    parallel operations after the parent has run some may deadlock.
+    With one thread, torch runs the operations inline instead.
+
+    """
+
+    def __enter__(self):
+        self.n_threads = torch.get_num_threads()
+        torch.set_num_threads(1)
+
+    def __exit__(self, *exc_info):
+        torch.set_num_threads(self.n_threads)
+
+
+def _run_restart_star(args):
+    return _run_restart(*args)
+
+
+def fit_restarts(
+    net, X, y, n_restarts, n_jobs=1, scale=1.0, random_state=None, **fit_params
+):
+    """Fit ``net`` ``n_restarts`` times from different initializations
+    and keep the fit with the lowest final training loss.
+
+    The first restart starts from the initialization of the module;
+    for the other ones, every (raw) parameter of the module and the
+    likelihood is perturbed by Gaussian noise with standard deviation
+    ``scale``. Every restart has its own seed, drawn from
+    ``random_state``, of the initialization, the perturbation and the
+    shuffling of the data; the global random state of the caller is
+    left as it was. Module and likelihood instances (rather than
+    classes) are copied for every restart. With ``n_jobs`` other
+    than 1, the restarts run in a pool of forked processes, which see
+    the training data through the parent's copy-on-write memory
+    instead of copies; each worker runs torch with a single thread,
+    see :func:`predict_sharded`. A restart that has not finished an epoch, e.g. because a
+    callback interrupted it, has a final loss of inf.
+
+    After fitting, ``net`` holds the parameters and the history of the
+    best restart. The results of all restarts, without their
+    parameters, are stored in ``net.restarts_`` and recorded as
+    ``restarts`` in the last epoch of the history.
+
+    Parameters
+    ----------
+    net : GaussianProcess
+      The net to fit. It is (re-)initialized.
+
+    X, y : input and target data
+      As for ``net.fit``.
+
+    n_restarts : int
+      Number of fits.
+
+    n_jobs : int or None (default=1)
+      Number of worker processes. None or -1 means one per CPU. Falls
+      back to fitting one after another where ``fork`` is not
+      available.
+
+    scale : float (default=1.0)
+      Standard deviation of the perturbation of the raw parameters.
+
+    random_state : int or None (default=None)
+      Seed of the seeds of the restarts. If None, it is drawn from
+      torch's global random number generator, so that
+      ``torch.manual_seed`` makes the restarts reproducible.
+
+    **fit_params : dict
+      Additional parameters passed to ``net.fit_loop``.
+
+    """
+    n_jobs = _get_n_jobs(n_jobs, n_restarts)
+    if random_state is None:
+        random_state = int(torch.randint(2 ** 31 - 1, (1,)))
+    generator = torch.Generator().manual_seed(random_state)
+    seeds = torch.randint(2 ** 31 - 1, (n_restarts,), generator=generator).tolist()
+    _restart_state.update(
+        net=net, X=X, y=y, fit_params=fit_params, scale=scale, in_process=n_jobs == 1
+    )
+    try:
+        if n_jobs == 1:
+            results = [_run_restart(seed, idx) for idx, seed in enumerate(seeds)]
+        else:
+            tasks = [(seed, idx) for idx, seed in enumerate(seeds)]
+            with _SingleThreaded():
+                with mp.get_context("fork").Pool(n_jobs) as pool:
+                    results = pool.map(_run_restart_star, tasks)
+    finally:
+        _restart_state.clear()
+
+    best = min(results, key=_final_loss)
+    # the initial parameters are overwritten, so they must not use up
+    # the caller's random numbers
+    with torch.random.fork_rng():
+        net.initialize(X, y)
+    net.module_.load_state_dict(best["module_state"])
+    likelihood = _get_likelihood_if_separate(net)
+    if likelihood is not None:
+        likelihood.load_state_dict(best["likelihood_state"])
+
+    net.restarts_ = [
+        {
+            "seed": result["seed"],
+            "train_loss": result["train_loss"],
+            "epochs": result["epochs"],
+            "best": result is best,
+        }
+        for result in results
+    ]
+    net.history = best["history"]
+    net.history.record("restarts", net.restarts_)
+    return net
+
+
+def _slice(X, start, stop):
+    if isinstance(X, torch.utils.data.Dataset):
+        return torch.utils.data.Subset(X, range(start, stop))
+    if isinstance(X, (tuple, list)):
+        return type(X)(part[start:stop] for part in X)
+    return X[start:stop]
+
+
+def shared_empty(shape, dtype):
+    """Return an uninitialized numpy array in anonymous shared memory,
+    which processes forked afterwards write to in place."""
+    dtype = np.dtype(dtype)
+    n_bytes = int(np.prod(shape)) * dtype.itemsize
+    buf = mmap.mmap(-1, max(n_bytes, 1))
+    return np.frombuffer(buf, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def _is_shared(array):
+    """Whether writes to ``array`` in a forked process are seen by the
+    parent, i.e. it is a view of a shared memory map."""
+    if isinstance(array, torch.Tensor):
+        return array.is_shared()
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return array.mode in ("r+", "w+")
+        if isinstance(array, mmap.mmap):
+            return True
+        if isinstance(array, memoryview):
+            array = array.obj
+        else:
+            array = getattr(array, "base", None)
+    return False
+
+
+def _predict_shard(bounds):
+    state = _predict_state
+    start, stop = bounds
+    var_out = state["var_out"]
+    state["net"].predict_into(
+        _slice(state["X"], start, stop),
+        state["mean_out"][start:stop],
+        None if var_out is None else var_out[start:stop],
+        chunk_size=state["chunk_size"],
+    )
+
+
+def predict_sharded(net, X, mean_out, var_out=None, n_jobs=None, chunk_size=None):
+    """Write the predictive mean (and variance) of ``X`` into
+    ``mean_out`` (and ``var_out``), sharding ``X`` across a pool of
+    forked processes.
+
+    The workers inherit the net, including its parameters and
+    prediction caches, and ``X`` from the parent through ``fork``, so
+    nothing is pickled but the bounds of the shards; the caches are
+    computed in the parent before the pool is started. Each worker
+    predicts its shards chunk by chunk (see ``net.predict_into``) and
+    writes them to the output arrays in place, so these must be
+    shared with the workers: arrays from :func:`shared_empty` or
+    memory-mapped files (``np.memmap`` with mode ``'r+'`` or
+    ``'w+'``). Each worker runs torch with a single thread, since
+    forked processes can't safely use the intra-op thread pool of a
+    parent that has already used it; use about one worker per core.
+
+    Parameters
+    ----------
+    net : GaussianProcess
+      The fitted net.
+
+    X : input data, compatible with skorch.dataset.Dataset
+      The samples to predict. Arrays, memory-mapped arrays and tensors
+      (or lists/tuples of them) are sliced into shards; anything else
+      goes through ``net.get_dataset`` and each worker predicts
+      subsets of the dataset with ``iterator_test``.
+
+    mean_out, var_out : numpy ndarray
+      The shared output arrays; ``var_out`` may be None. A ValueError
+      is raised if they are not shared with the workers.
+
+    n_jobs : int or None (default=None)
+      Number of worker processes. None or -1 means one per CPU. Falls
+      back to predicting in this process where ``fork`` is not
+      available.
+
+    chunk_size : int or None (default=None)
+      The chunk size used by the workers, see
+      ``net.predict_proba_iter``.
+
+    Returns
+    -------
+    mean_out, var_out
+      The output arrays that were passed in.
+
+    """
+    parts = X if isinstance(X, (tuple, list)) else [X]
+    if not all(isinstance(part, (np.ndarray, torch.Tensor)) for part in parts):
+        # the workers predict subsets of the dataset
+        X = X if is_dataset(X) else net.get_dataset(X)
+        parts = [X]
+    n_samples = len(parts[0])
+    n_jobs = _get_n_jobs(n_jobs, n_samples)
+    if n_jobs == 1 or n_samples == 0:
+        return net.predict_into(X, mean_out, var_out, chunk_size=chunk_size)
+    for name, out in [("mean_out", mean_out), ("var_out", var_out)]:
+        if out is not None and not _is_shared(out):
+            raise ValueError(
+                "{} is not shared with the worker processes, so their "
+                "predictions would be lost; create it with shared_empty or as "
+                "an np.memmap with mode 'r+' or 'w+', or use n_jobs=1.".format(name)
+            )
+
+    # a few shards per worker balance the load if some are slower
+    n_shards = min(4 * n_jobs, n_samples)
+    edges = np.linspace(0, n_samples, n_shards + 1).astype(int)
+    shards = list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+    # the workers share the caches that this prediction computes
+    # instead of each computing them on its own
+    net.predict_into(
+        _slice(X, 0, 1),
+        mean_out[:1],
+        None if var_out is None else var_out[:1],
+        chunk_size=1,
+    )
+
+    _predict_state.update(
+        net=net, X=X, mean_out=mean_out, var_out=var_out, chunk_size=chunk_size
+    )
+    try:
+        # the parent has just predicted, possibly with several threads
+        with _SingleThreaded():
+            with mp.get_context("fork").Pool(n_jobs) as pool:
+                pool.map(_predict_shard, shards, chunksize=1)
+    finally:
+        _predict_state.clear()
+    return mean_out, var_out
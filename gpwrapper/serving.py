@@ -0,0 +1,347 @@
+"""Serving predictions of a fitted GP to many small concurrent requests.
+
+Every call of ``predict_proba`` has a fixed overhead (evaluating the
+cross-covariance with the training data, dispatching many small BLAS
+calls), which dominates when requests carry only a few points. A
+:class:`PredictionService` queues the requests and coalesces them into
+batched predictions, then hands each request its share of the result.
+
+"""
+
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+import numpy as np
+import torch
+
+
+__all__ = ["PredictionService", "LocalClient"]
+
+
+class _Request(object):
+    __slots__ = ("X", "n_samples", "future", "submitted")
+
+    def __init__(self, X):
+        self.X = X
+        self.n_samples = len(X)
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class _Call(object):
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.future.set_exception(exc)
+        else:
+            self.future.set_result(result)
+
+
+_STOP = object()
+
+
+def _check_samples(X):
+    if X.ndim == 0:
+        raise ValueError("A request needs an array of samples, got a scalar.")
+    if isinstance(X, torch.Tensor):
+        numeric = not X.is_complex()
+    else:
+        numeric = X.dtype.kind in "biuf"
+    if not numeric:
+        raise TypeError(
+            "A request needs real numbers as samples, got dtype {}.".format(X.dtype)
+        )
+
+
+class PredictionService(object):
+    """Coalesces concurrent prediction requests to a fitted
+    :class:`gpwrapper.GaussianProcess` into batched predictions.
+
+    Requests are submitted from any thread and answered by a single
+    worker thread, which owns the net. The worker takes the oldest
+    request and keeps collecting requests until either
+    ``max_batch_size`` samples are collected or ``max_latency``
+    seconds have passed since the oldest request was submitted, after
+    which only requests that are already waiting are added. It then
+    predicts all samples at once and scatters the predictive
+    means and variances back to the requests' futures. If the batch
+    fails, its requests are predicted one by one, so that only the
+    futures of the failing requests get the exception.
+
+    Other work on the net, e.g. a ``predict_proba`` call whose result
+    can't be split per request, can be run on the worker thread with
+    :meth:`run`, so that the net is never used by two threads at once.
+
+    Use the service as a context manager, or call :meth:`close` when
+    done; requests still in the queue are answered before the worker
+    stops.
+
+    Parameters
+    ----------
+    net : GaussianProcess
+      The fitted net. It should not be used by other threads while
+      the service is running.
+
+    max_batch_size : int (default=1024)
+      The maximum number of samples predicted at once. A single
+      request with more samples is predicted on its own.
+
+    max_latency : float (default=0.005)
+      The maximum time in seconds a request waits for other requests
+      to be batched with.
+
+    return_std : bool (default=False)
+      Whether to return the predictive standard deviation instead of
+      the variance.
+
+    Attributes
+    ----------
+    n_requests : int
+      Number of requests answered so far.
+
+    n_batches : int
+      Number of batched predictions made so far.
+
+    """
+
+    def __init__(self, net, max_batch_size=1024, max_latency=0.005, return_std=False):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.net = net
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.return_std = return_std
+
+        self.n_requests = 0
+        self.n_batches = 0
+        self._n_samples = 0
+        self._max_batch_samples = 0
+        self._max_queue_depth = 0
+        self._wait_time = 0.0
+        self._predict_time = 0.0
+        self._lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._carry = None
+        self._closed = False
+        self._worker = threading.Thread(
+            target=self._run, name="PredictionService", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, X):
+        """Queue a request for the predictions of ``X`` and return a
+        :class:`concurrent.futures.Future`.
+
+        ``X`` is a numpy array or a torch tensor of real numbers whose
+        first dimension are the samples; other input raises a
+        TypeError or ValueError right away. The future's result is a
+        tuple of numpy arrays, the predictive mean and variance (or
+        standard deviation) of the samples.
+
+        """
+        if isinstance(X, (tuple, list, dict)):
+            raise TypeError(
+                "PredictionService only supports a single array or tensor of "
+                "samples per request, got a {}.".format(type(X).__name__)
+            )
+        if not isinstance(X, torch.Tensor):
+            X = np.asarray(X)
+        _check_samples(X)
+        return self._put(_Request(X))
+
+    def run(self, fn, *args, **kwargs):
+        """Queue the call ``fn(*args, **kwargs)`` to be run on the
+        worker thread, in order with the requests, and return a
+        :class:`concurrent.futures.Future` of its result."""
+        return self._put(_Call(fn, args, kwargs))
+
+    def _put(self, item):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit to a closed PredictionService.")
+            self._queue.put(item)
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return item.future
+
+    def predict(self, X, timeout=None):
+        """Submit a request and wait for its result; see
+        :meth:`submit`."""
+        return self.submit(X).result(timeout=timeout)
+
+    def metrics(self):
+        """Return a dict with the current queue depth and statistics
+        of the batches predicted so far.
+
+        The keys are ``queue_depth`` (requests waiting right now),
+        ``max_queue_depth``, ``n_requests``, ``n_batches``,
+        ``n_samples``, ``mean_batch_size`` and ``max_batch_size`` (in
+        samples), ``mean_requests_per_batch``, ``mean_wait`` (seconds
+        from submitting a request until its batch is predicted) and
+        ``mean_predict_time`` (seconds per batch).
+
+        """
+        with self._lock:
+            n_batches = max(self.n_batches, 1)
+            n_requests = max(self.n_requests, 1)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "n_requests": self.n_requests,
+                "n_batches": self.n_batches,
+                "n_samples": self._n_samples,
+                "mean_batch_size": self._n_samples / n_batches,
+                "max_batch_size": self._max_batch_samples,
+                "mean_requests_per_batch": self.n_requests / n_batches,
+                "mean_wait": self._wait_time / n_requests,
+                "mean_predict_time": self._predict_time / n_batches,
+            }
+
+    def close(self, timeout=None):
+        """Answer the requests that are queued and stop the worker."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        if threading.current_thread() is not self._worker:
+            self._worker.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _next_request(self, timeout=None):
+        if self._carry is not None:
+            request, self._carry = self._carry, None
+            return request
+        if timeout is not None and timeout <= 0:
+            return self._queue.get_nowait()
+        return self._queue.get(timeout=timeout)
+
+    def _collect(self):
+        """Block until a batch of requests or a call is ready and
+        return it, or return None once the service is closed."""
+        request = self._next_request()
+        if request is _STOP:
+            return None
+        if isinstance(request, _Call):
+            return request
+        batch, n_samples = [request], request.n_samples
+        deadline = request.submitted + self.max_latency
+        while n_samples < self.max_batch_size:
+            # once the deadline has passed, only requests that are
+            # already waiting are added
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._next_request(timeout=remaining)
+            except queue.Empty:
+                break
+            if (
+                request is _STOP
+                or isinstance(request, _Call)
+                or n_samples + request.n_samples > self.max_batch_size
+            ):
+                # handled after this batch
+                self._carry = request
+                break
+            batch.append(request)
+            n_samples += request.n_samples
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._collect()
+            if item is None:
+                return
+            if isinstance(item, _Call):
+                item.run()
+                continue
+            batch = [r for r in item if r.future.set_running_or_notify_cancel()]
+            if batch:
+                self._predict(batch)
+
+    def _predict(self, batch):
+        tic = time.perf_counter()
+        try:
+            # converted one by one, so that requests of different
+            # dtypes can be concatenated
+            parts = [self.net.convert_input(request.X) for request in batch]
+            X = parts[0] if len(parts) == 1 else torch.cat(parts)
+            mean, var = self.net._predict_mean_var(  # pylint: disable=protected-access
+                X, return_std=self.return_std, chunk_size=-1
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            if len(batch) == 1:
+                batch[0].future.set_exception(exc)
+                return
+            # e.g. a request with the wrong number of features; it
+            # should not fail the other requests
+            for request in batch:
+                self._predict([request])
+            return
+        toc = time.perf_counter()
+
+        start = 0
+        for request in batch:
+            stop = start + request.n_samples
+            request.future.set_result((mean[start:stop], var[start:stop]))
+            start = stop
+
+        with self._lock:
+            self.n_requests += len(batch)
+            self.n_batches += 1
+            self._n_samples += start
+            self._max_batch_samples = max(self._max_batch_samples, start)
+            self._wait_time += sum(tic - request.submitted for request in batch)
+            self._predict_time += toc - tic
+
+
+class LocalClient(object):
+    """In-process stand-in for a remote client of a
+    :class:`PredictionService`, e.g. to test or load-test the service
+    without an RPC layer.
+
+    Like a remote client, it only exchanges numpy arrays with the
+    service: the samples are copied before they are submitted, so the
+    caller may reuse its buffers.
+
+    Parameters
+    ----------
+    service : PredictionService
+      The service to send the requests to.
+
+    timeout : float or None (default=None)
+      How long to wait for a result, in seconds.
+
+    """
+
+    def __init__(self, service, timeout=None):
+        self.service = service
+        self.timeout = timeout
+
+    def predict(self, X):
+        """Return the predictive mean and variance of ``X``."""
+        return self.service.predict(np.array(X), timeout=self.timeout)
+
+    def predict_many(self, Xs):
+        """Submit one request per element of ``Xs`` at once, as
+        concurrent clients would, and return their results in
+        order."""
+        futures = [self.service.submit(np.array(X)) for X in Xs]
+        return [future.result(timeout=self.timeout) for future in futures]
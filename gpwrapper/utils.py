@@ -0,0 +1,361 @@
+"""Helper classes and functions for the GP wrappers."""
+
+import io
+import pickle
+import time
+import warnings
+
+import numpy as np
+import torch
+
+from skorch.utils import is_pandas_ndframe
+
+
+_EXHAUSTED = object()
+
+
+class PhaseTimer(object):
+    """Accumulates the wall time spent in named phases.
+
+    Use an instance as a context manager factory:
+
+    >>> timer = PhaseTimer()
+    >>> with timer("infer"):
+    ...     y_pred = net.infer(Xi)
+    >>> timer.pop()
+    {'infer': 0.0123}
+
+    Durations of the same phase are summed until ``pop`` is called.
+    Phases may be nested, in which case the time spent in the inner
+    phase is not counted towards the outer one; e.g. the ``step`` of
+    an optimizer that re-evaluates the loss through a closure only
+    counts the time of the update itself.
+
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self._nested = []
+
+    def __call__(self, phase):
+        return _TimedPhase(self, phase)
+
+    def iterate(self, iterable, phase):
+        """Yield from ``iterable``, timing each ``next`` call as
+        ``phase``. The final call, which finds the iterator exhausted,
+        is not counted."""
+        iterator = iter(iterable)
+        while True:
+            before = self.durations.get(phase)
+            with self(phase):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    item = _EXHAUSTED
+            if item is _EXHAUSTED:
+                # it would be counted towards whatever comes next
+                if before is None:
+                    self.durations.pop(phase, None)
+                else:
+                    self.durations[phase] = before
+                return
+            yield item
+
+    def pop(self):
+        """Return the accumulated durations and start over."""
+        durations, self.durations = self.durations, {}
+        return durations
+
+
+class _TimedPhase(object):
+    __slots__ = ("timer", "phase", "tic")
+
+    def __init__(self, timer, phase):
+        self.timer = timer
+        self.phase = phase
+        self.tic = None
+
+    def __enter__(self):
+        # time spent in phases nested in this one
+        self.timer._nested.append(0.0)
+        self.tic = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.tic
+        nested = self.timer._nested
+        own = elapsed - nested.pop()
+        if nested:
+            nested[-1] += elapsed
+        durations = self.timer.durations
+        durations[self.phase] = durations.get(self.phase, 0.0) + own
+
+
+class NoPhaseTimer(object):
+    """Drop-in replacement for :class:`PhaseTimer` that measures
+    nothing, used when phase timing is turned off."""
+
+    def __call__(self, phase):
+        return _NO_PHASE
+
+    def iterate(self, iterable, phase):
+        return iterable
+
+    def pop(self):
+        return {}
+
+
+class _NoPhase(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def get_torch_dtype(dtype):
+    """Return the floating point torch dtype corresponding to
+    ``dtype``, which may be a torch dtype, a numpy dtype or a string
+    such as ``'float32'``."""
+    if not isinstance(dtype, torch.dtype):
+        dtype = torch.from_numpy(np.empty(0, dtype=np.dtype(dtype))).dtype
+    if not dtype.is_floating_point:
+        raise ValueError("dtype must be a floating point type, got {}.".format(dtype))
+    return dtype
+
+
+def pairwise_distances(X):
+    """Return the Euclidean distances between the rows of the 2-D
+    array ``X``."""
+    sq_norms = (X ** 2).sum(1)
+    sq_dists = sq_norms[:, None] + sq_norms[None, :] - 2 * X.dot(X.T)
+    return np.sqrt(np.maximum(sq_dists, 0))
+
+
+def distance_quantile(distances, quantile):
+    """Return the ``quantile`` of the positive ``distances``, or 1 if
+    there are none, e.g. a typical lengthscale of the inputs."""
+    distances = distances[distances > 0]
+    if not len(distances):
+        return 1.0
+    return float(np.quantile(distances, quantile))
+
+
+class InputConverter(object):
+    """Converts input data to tensors of a fixed floating point dtype,
+    copying only when necessary.
+
+    Arrays (including ``np.memmap``) and tensors that already have the
+    target dtype are shared with the resulting tensor instead of being
+    copied; a memory-mapped array hence stays backed by its file.
+    pandas objects are converted through their ``values``, and the
+    parts of lists, tuples and dicts are converted one by one.
+    Anything else, e.g. a ``Dataset``, is returned unchanged.
+
+    Parameters
+    ----------
+    dtype : torch dtype, numpy dtype or str (default=torch.float32)
+      The floating point dtype of the converted tensors.
+
+    Attributes
+    ----------
+    n_shared : int
+      Number of arrays that were wrapped as tensors without a copy.
+
+    n_copied : int
+      Number of arrays and tensors that had to be copied.
+
+    bytes_copied : int
+      Total size of the copies in bytes.
+
+    """
+
+    def __init__(self, dtype=torch.float32):
+        self.dtype = get_torch_dtype(dtype)
+        self.numpy_dtype = torch.empty(0, dtype=self.dtype).numpy().dtype
+        self.n_shared = 0
+        self.n_copied = 0
+        self.bytes_copied = 0
+
+    def __call__(self, data, keep_integer=False):
+        """Convert ``data``.
+
+        If ``keep_integer`` is True, integer and boolean data (e.g.
+        class labels) keep their dtype and are only wrapped as tensors.
+        The parts of a list or tuple after the first one, e.g. the task
+        indices of a multitask model, are always converted this way.
+
+        """
+        if data is None:
+            return None
+        if isinstance(data, (tuple, list)):
+            return type(data)(
+                self(part, keep_integer or i > 0) for i, part in enumerate(data)
+            )
+        if isinstance(data, dict):
+            return {key: self(val, keep_integer) for key, val in data.items()}
+        if is_pandas_ndframe(data):
+            data = data.values
+        if isinstance(data, np.ndarray):
+            return self._convert_array(data, keep_integer)
+        if isinstance(data, torch.Tensor):
+            return self._convert_tensor(data, keep_integer)
+        return data
+
+    def _convert_array(self, arr, keep_integer):
+        native_dtype = arr.dtype.newbyteorder("=")
+        if keep_integer and native_dtype.kind in "biu":
+            dtype = native_dtype
+        else:
+            dtype = self.numpy_dtype
+        if arr.dtype == dtype and all(stride >= 0 for stride in arr.strides):
+            with warnings.catch_warnings():
+                # read-only arrays, e.g. memmaps opened with mode="r",
+                # are shared as well; they are not written to
+                warnings.simplefilter("ignore", UserWarning)
+                tensor = torch.from_numpy(arr)
+            self.n_shared += 1
+            return tensor
+        tensor = torch.from_numpy(np.ascontiguousarray(arr, dtype=dtype))
+        self._count_copy(tensor)
+        return tensor
+
+    def _convert_tensor(self, tensor, keep_integer):
+        if tensor.dtype == self.dtype or (
+            keep_integer and not tensor.dtype.is_floating_point
+        ):
+            return tensor
+        tensor = tensor.to(self.dtype)
+        self._count_copy(tensor)
+        return tensor
+
+    def _count_copy(self, tensor):
+        self.n_copied += 1
+        self.bytes_copied += tensor.numel() * tensor.element_size()
+
+    def __repr__(self):
+        return "{}(dtype={}, n_shared={}, n_copied={}, bytes_copied={})".format(
+            type(self).__name__, self.dtype, self.n_shared, self.n_copied,
+            self.bytes_copied,
+        )
+
+
+class TensorExport(object):
+    """Pickles an object graph such that its tensors are exported as
+    numpy arrays.
+
+    ``torch.save`` serializes all tensors into one byte stream that
+    the enclosing pickle then copies again. Instead, the tensors of
+    ``obj`` are handed to the enclosing pickler as numpy arrays that
+    share memory with CPU tensors, so that with pickle protocol 5 and
+    a ``buffer_callback`` they are transferred out-of-band without any
+    copy, and with earlier protocols they are at least copied only
+    once. On unpickling, tensors are moved back to their device, or
+    to the CPU if CUDA is not available.
+
+    Tensors that numpy can't represent (e.g. sparse or bfloat16
+    tensors) fall back to ``torch.save``. Distinct tensors that share
+    storage are exported separately.
+
+    Parameters
+    ----------
+    obj : object
+      Any picklable object, typically a dict of modules and
+      optimizers.
+
+    Attributes
+    ----------
+    remapped_to_cpu : bool
+      Whether CUDA tensors were loaded onto the CPU on unpickling.
+
+    """
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.remapped_to_cpu = False
+
+    def __reduce_ex__(self, protocol):
+        tensors = []
+        f = io.BytesIO()
+        protocol = min(protocol, pickle.HIGHEST_PROTOCOL)
+        _TensorExportPickler(f, tensors, protocol=protocol).dump(self.obj)
+        records = [_export_tensor(tensor) for tensor in tensors]
+        return _import_tensor_export, (f.getvalue(), records)
+
+
+class _TensorExportPickler(pickle.Pickler):
+    def __init__(self, f, tensors, protocol):
+        super(_TensorExportPickler, self).__init__(f, protocol=protocol)
+        self.tensors = tensors
+        self.tensor_ids = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, torch.Tensor):
+            return None
+        # the same tensor object, e.g. a parameter referenced by both a
+        # module and an optimizer, stays the same object
+        key = id(obj)
+        if key not in self.tensor_ids:
+            self.tensor_ids[key] = len(self.tensors)
+            self.tensors.append(obj)
+        return self.tensor_ids[key]
+
+
+class _TensorExportUnpickler(pickle.Unpickler):
+    def __init__(self, f, tensors):
+        super(_TensorExportUnpickler, self).__init__(f)
+        self.tensors = tensors
+
+    def persistent_load(self, pid):
+        return self.tensors[pid]
+
+
+def _export_tensor(tensor):
+    meta = {
+        "device": str(tensor.device),
+        "requires_grad": tensor.requires_grad,
+        "parameter": isinstance(tensor, torch.nn.Parameter),
+    }
+    data = tensor.detach()
+    try:
+        # a view on CPU memory, only non-CPU tensors are copied here
+        return meta, data.cpu().numpy()
+    except (RuntimeError, TypeError):
+        f = io.BytesIO()
+        torch.save(data.cpu(), f)
+        return meta, f.getvalue()
+
+
+def _import_tensor(meta, data):
+    if isinstance(data, bytes):
+        tensor = torch.load(io.BytesIO(data))
+    else:
+        if not data.flags.writeable:
+            # e.g. reconstructed from the pickle stream; tensors (and
+            # hence parameters) have to be writable
+            data = data.copy()
+        tensor = torch.from_numpy(data)
+    remapped = False
+    device = torch.device(meta["device"])
+    if device.type == "cuda" and not torch.cuda.is_available():
+        remapped = True
+    elif device.type != "cpu":
+        tensor = tensor.to(device)
+    if meta["parameter"]:
+        tensor = torch.nn.Parameter(tensor, requires_grad=meta["requires_grad"])
+    elif meta["requires_grad"]:
+        tensor.requires_grad_()
+    return tensor, remapped
+
+
+def _import_tensor_export(payload, records):
+    tensors, remapped = [], False
+    for meta, data in records:
+        tensor, tensor_remapped = _import_tensor(meta, data)
+        tensors.append(tensor)
+        remapped = remapped or tensor_remapped
+    export = TensorExport(_TensorExportUnpickler(io.BytesIO(payload), tensors).load())
+    export.remapped_to_cpu = remapped
+    return export
@@ -16,7 +16,7 @@ setup(
     },
     license="MIT",
     classifiers=["Development Status :: 2 - Pre-Alpha", "Programming Language :: Python :: 3"],
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     python_requires=">=3.6",
     install_requires=[
         "torch>=1.0.0",
@@ -0,0 +1,67 @@
+"""Shared fixtures: a small exact GP model and regression data."""
+
+import copy
+
+import gpytorch
+import pytest
+import torch
+
+try:
+    from gpytorch.random_variables import GaussianRandomVariable as Distribution
+except ImportError:  # gpytorch >= 0.1 renamed the random variables
+    from gpytorch.distributions import MultivariateNormal as Distribution
+
+
+class ExactModel(gpytorch.models.ExactGP):
+    def __init__(self, train_x, train_y, likelihood):
+        super(ExactModel, self).__init__(train_x, train_y, likelihood)
+        self.mean_module = gpytorch.means.ConstantMean()
+        self.covar_module = gpytorch.kernels.RBFKernel()
+
+    def forward(self, x):
+        return Distribution(self.mean_module(x), self.covar_module(x))
+
+
+def make_data(n_samples=60, n_dims=1, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    X = torch.rand(n_samples, n_dims, generator=generator)
+    y = torch.sin(6 * X.sum(-1)) + 0.1 * torch.randn(n_samples, generator=generator)
+    return X, y
+
+
+def posterior_mean_var(net, X_train, y_train, X_test):
+    """Return the predictive mean and variance at ``X_test`` of the
+    exact GP of ``net`` conditioned on ``X_train, y_train``, computed
+    by gpytorch on a copy of the module without the net's caches."""
+    module = copy.deepcopy(net.module_)
+    module.set_train_data(X_train, y_train, strict=False)
+    # leaving training mode drops gpytorch's own caches
+    module.train()
+    module.eval()
+    module.likelihood.eval()
+    with torch.no_grad():
+        pred = module.likelihood(module(X_test))
+    mean = pred.mean() if callable(pred.mean) else pred.mean
+    var = pred.var() if callable(getattr(pred, "var", None)) else pred.variance
+    return mean.numpy(), var.numpy()
+
+
+@pytest.fixture
+def data():
+    return make_data()
+
+
+@pytest.fixture
+def exact_net_cls():
+    from gpwrapper import ExactGaussianProcessRegressor
+
+    return ExactGaussianProcessRegressor
+
+
+@pytest.fixture
+def exact_net(exact_net_cls, data):
+    X, y = data
+    net = exact_net_cls(
+        ExactModel, batch_size=-1, max_epochs=3, train_split=None, verbose=0
+    )
+    return net.fit(X, y)
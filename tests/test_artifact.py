@@ -0,0 +1,47 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ExactModel
+from conftest import make_data
+
+
+def _cache_owner(net):
+    if getattr(net.module_, "prediction_strategy", None) is not None:
+        return "prediction_strategy"
+    return "module"
+
+
+@pytest.mark.parametrize("owner", ["module", "prediction_strategy"])
+@pytest.mark.parametrize("mmap", [True, False])
+def test_artifact_round_trip_reuses_the_caches(
+    exact_net_cls, exact_net, tmp_path, monkeypatch, owner, mmap
+):
+    if _cache_owner(exact_net) != owner:
+        pytest.skip("this gpytorch version keeps the caches elsewhere")
+    X_test, _ = make_data(n_samples=11, seed=1)
+    expected_mean, expected_var = exact_net.predict_mean_var(X_test)
+
+    path = str(tmp_path / "artifact")
+    exact_net.save_artifact(path)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    assert meta["cache_owner"] == owner
+    assert set(meta["caches"]) == {"mean_cache", "covar_cache"}
+
+    net = exact_net_cls(ExactModel, train_split=None, verbose=0)
+    net.load_artifact(path, mmap=mmap)
+    cache = net.prediction_cache_
+    assert cache is not None
+
+    def recompute():
+        raise AssertionError("the prediction caches were recomputed")
+
+    monkeypatch.setattr(net, "initialize_prediction_cache", recompute)
+    mean, var = net.predict_mean_var(X_test)
+    assert net.prediction_cache_ is cache
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-6, atol=1e-7)
+    np.testing.assert_allclose(var, expected_var, rtol=1e-6, atol=1e-7)
+
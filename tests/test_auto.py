@@ -0,0 +1,98 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from gpwrapper.auto import AutoGaussianProcessRegressor
+from gpwrapper.auto import ENGINES
+from gpwrapper.models import GridInducingModel
+
+from conftest import make_data
+
+
+@pytest.mark.parametrize(
+    "n_samples, n_dims, additive, engine",
+    [
+        (100, 1, False, "exact"),
+        (100, 10, False, "exact"),
+        (10 ** 6, 1, False, "kissgp"),
+        (10 ** 5, 3, False, "kissgp"),
+        (10 ** 5, 10, True, "additive_kissgp"),
+        (10 ** 6, 10, False, "variational"),
+    ],
+)
+def test_choose_engine(n_samples, n_dims, additive, engine):
+    auto = AutoGaussianProcessRegressor(additive=additive)
+    decision = auto.choose_engine(n_samples, n_dims)
+    assert decision["engine"] == engine
+    assert decision["reason"] == "first engine within the budget"
+    assert [cost["engine"] for cost in decision["candidates"]][0] == "exact"
+
+
+def test_choose_engine_falls_back_to_least_memory():
+    auto = AutoGaussianProcessRegressor(memory_budget=1)
+    with pytest.warns(UserWarning, match="No engine fits the budget"):
+        decision = auto.choose_engine(1000, 1)
+    least = min(decision["candidates"], key=lambda cost: cost["memory_bytes"])
+    assert decision["engine"] == least["engine"]
+
+
+def test_choose_engine_rejects_engines_that_do_not_apply():
+    with pytest.raises(ValueError, match="does not apply"):
+        AutoGaussianProcessRegressor(engine="kissgp").choose_engine(100, 10)
+    with pytest.raises(ValueError, match="Unknown engine"):
+        AutoGaussianProcessRegressor(engine="svgp").choose_engine(100, 1)
+
+
+def _auto(engine, **kwargs):
+    return AutoGaussianProcessRegressor(
+        engine=engine,
+        additive=True,
+        grid_size=10,
+        n_inducing=16,
+        batch_size=30,
+        max_epochs=2,
+        net_params={"train_split": None},
+        **kwargs
+    )
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_fit_predict_every_engine(engine):
+    if engine == "grid_inducing" and GridInducingModel is None:
+        pytest.skip("GridInducingVariationalGP is not available")
+    X, y = make_data(n_samples=60, n_dims=2)
+    X_test, _ = make_data(n_samples=7, n_dims=2, seed=1)
+    auto = _auto(engine).fit(X, y)
+    assert auto.decision_["engine"] == engine
+    assert len(auto.net_.history) == 2
+
+    mean, var = auto.predict_mean_var(X_test)
+    assert mean.shape == var.shape == (7,)
+    assert np.isfinite(mean).all() and (var > 0).all()
+    np.testing.assert_allclose(auto.predict(X_test), mean, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("engine", ["kissgp", "additive_kissgp"])
+def test_grid_engine_nets_can_be_pickled(engine):
+    X, y = make_data(n_samples=60, n_dims=2)
+    X_test, _ = make_data(n_samples=7, n_dims=2, seed=1)
+    auto = _auto(engine).fit(X, y)
+    restored = pickle.loads(pickle.dumps(auto))
+    np.testing.assert_allclose(
+        restored.predict(X_test), auto.predict(X_test), rtol=1e-6
+    )
+
+
+def test_decision_is_passed_to_sink():
+    messages = []
+    X, y = make_data(n_samples=20)
+    auto = AutoGaussianProcessRegressor(
+        max_epochs=1,
+        verbose=1,
+        sink=messages.append,
+        net_params={"verbose": 0, "train_split": None},
+    )
+    auto.fit(X, y)
+    assert len(messages) == 1
+    assert "'exact' engine for 20 samples" in messages[0]
@@ -0,0 +1,151 @@
+from types import SimpleNamespace
+
+import pytest
+import torch
+from skorch.callbacks import Callback
+from skorch.history import History
+
+from gpwrapper.callbacks import Convergence
+
+from conftest import ExactModel
+
+
+class EpochCounter(Callback):
+    def __init__(self):
+        self.n_epochs = 0
+
+    def on_epoch_end(self, net, **kwargs):
+        self.n_epochs += 1
+
+
+def test_replaced_callback_is_notified(exact_net_cls, data):
+    X, y = data
+    old, new = EpochCounter(), EpochCounter()
+    net = exact_net_cls(
+        ExactModel,
+        batch_size=-1,
+        max_epochs=2,
+        train_split=None,
+        verbose=0,
+        callbacks=[("counter", old)],
+    )
+    net.fit(X, y)
+    assert old.n_epochs == 2
+
+    net.set_params(callbacks__counter=new)
+    net.partial_fit(X, y)
+    assert dict(net.callbacks_)["counter"] is new
+    assert new.n_epochs == 2
+    assert old.n_epochs == 2
+
+
+def test_convergence_stops_after_patience(exact_net_cls, data):
+    X, y = data
+    net = exact_net_cls(
+        ExactModel,
+        batch_size=-1,
+        max_epochs=20,
+        train_split=None,
+        verbose=0,
+        # no improvement is large enough
+        callbacks=[Convergence(rtol=1e9, patience=2)],
+    )
+    net.fit(X, y)
+    assert len(net.history) == 3
+    assert net.history[-1, "epochs_saved"] == 17
+    assert "train_loss improved by less than" in net.history[-1, "stop_reason"]
+
+
+def test_convergence_stops_on_small_gradients(exact_net_cls, data):
+    X, y = data
+    net = exact_net_cls(
+        ExactModel,
+        batch_size=-1,
+        max_epochs=20,
+        train_split=None,
+        verbose=0,
+        callbacks=[Convergence(rtol=0, gtol=1e9, patience=1)],
+    )
+    net.fit(X, y)
+    assert len(net.history) == 1
+    assert net.history[-1, "grad_norm"] > 0
+    assert "gradient norm" in net.history[-1, "stop_reason"]
+
+
+def _run_convergence(callback, scores):
+    """Feed ``scores`` as the monitored losses to ``callback``. The
+    module's weight is the number of optimizer steps taken: an epoch
+    starts with the weight of the previous one and increments it."""
+    module = torch.nn.Linear(1, 1, bias=False)
+    module.weight.data.fill_(0)
+    net = SimpleNamespace(
+        history=History(),
+        module_=module,
+        likelihood_=torch.nn.Linear(1, 1, bias=False),
+        max_epochs=len(scores),
+        verbose=0,
+    )
+    callback.initialize()
+    callback.on_train_begin(net)
+    try:
+        for epoch, score in enumerate(scores, 1):
+            net.history.new_epoch()
+            net.history.record("epoch", epoch)
+            callback.on_epoch_begin(net)
+            if callback.monitor == "train_loss":
+                # computed before the optimizer step
+                net.history.record("train_loss", score)
+                module.weight.data.fill_(epoch)
+            else:
+                module.weight.data.fill_(epoch)
+                net.history.record(callback.monitor, score)
+            callback.on_epoch_end(net)
+    except KeyboardInterrupt:
+        pass
+    callback.on_train_end(net)
+    return net
+
+
+def test_convergence_restores_best_epoch_below_rtol():
+    callback = Convergence(rtol=0.1, patience=3)
+    # epoch 2 improves by less than rtol but is still the best
+    net = _run_convergence(callback, [1.0, 0.99, 2.0, 2.0, 2.0])
+    assert len(net.history) == 4
+    assert callback.best_epoch_ == 2
+    # the parameters epoch 2 computed its loss with
+    assert net.module_.weight.item() == 1
+
+
+@pytest.mark.parametrize("monitor, weight", [("train_loss", 2), ("valid_loss", 3)])
+def test_convergence_restores_the_parameters_that_were_scored(monitor, weight):
+    callback = Convergence(monitor=monitor, patience=5)
+    net = _run_convergence(callback, [3.0, 2.0, 1.0, 4.0])
+    assert callback.best_epoch_ == 3
+    assert net.module_.weight.item() == weight
+
+
+def test_convergence_keeps_the_last_parameters_if_they_are_best():
+    callback = Convergence(monitor="valid_loss", patience=5)
+    net = _run_convergence(callback, [3.0, 2.0, 1.0])
+    assert net.module_.weight.item() == 3
+
+
+@pytest.mark.parametrize("restore_best, weight", [(True, 0), (False, 3)])
+def test_convergence_restore_best(restore_best, weight):
+    callback = Convergence(patience=5, restore_best=restore_best)
+    net = _run_convergence(callback, [1.0, 2.0, 3.0])
+    assert net.module_.weight.item() == weight
+
+
+@pytest.mark.parametrize("gtol, subscribed", [(None, False), (1e-3, True)])
+def test_convergence_subscribes_to_gradients_only_with_gtol(
+    exact_net_cls, gtol, subscribed
+):
+    net = exact_net_cls(
+        ExactModel, callbacks=[("convergence", Convergence(gtol=gtol))]
+    ).initialize_callbacks()
+    assert net.has_subscribers("on_grad_computed") is subscribed
+    assert net.has_subscribers("on_epoch_end")
+
+    net.set_params(callbacks__convergence__gtol=None if subscribed else 1e-3)
+    assert net.has_subscribers("on_grad_computed") is not subscribed
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+import torch
+from torch.utils.data import Subset
+
+from skorch.dataset import CVSplit
+
+from gpwrapper.dataset import BlockShuffleLoader
+from gpwrapper.dataset import ChunkedDataset
+
+from conftest import ExactModel
+from conftest import make_data
+
+
+@pytest.fixture
+def dataset():
+    # rows are numbered by their first column, over chunks of uneven size
+    X = np.arange(103 * 2, dtype=np.float32).reshape(103, 2) / 2
+    y = np.arange(103, dtype=np.float32)
+    return ChunkedDataset([X[:40], X[40:41], X[41:]], [y[:70], y[70:]])
+
+
+def rows_seen(loader):
+    seen = []
+    for Xi, yi in loader:
+        assert torch.equal(Xi[:, 0], yi)
+        seen.extend(yi.long().tolist())
+    return seen
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+@pytest.mark.parametrize("block_size, n_buffer_blocks", [(7, 1), (16, 3), (500, 1)])
+def test_block_shuffle_loader_visits_every_row_once(
+    dataset, shuffle, block_size, n_buffer_blocks
+):
+    loader = BlockShuffleLoader(
+        dataset,
+        batch_size=10,
+        shuffle=shuffle,
+        block_size=block_size,
+        n_buffer_blocks=n_buffer_blocks,
+    )
+    batch_sizes = [len(Xi) for Xi, _ in loader]
+    assert batch_sizes == [10] * 10 + [3]
+    assert len(loader) == len(batch_sizes)
+
+    seen = rows_seen(loader)
+    assert sorted(seen) == list(range(len(dataset)))
+    if not shuffle:
+        assert seen == list(range(len(dataset)))
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_block_shuffle_loader_subset(dataset, shuffle):
+    indices = np.r_[0:20, 50:103, 30:35, 21]
+    subset = Subset(Subset(dataset, np.arange(len(dataset))), indices)
+    loader = BlockShuffleLoader(subset, batch_size=8, shuffle=shuffle, block_size=16)
+    seen = rows_seen(loader)
+    assert sorted(seen) == sorted(indices.tolist())
+    if not shuffle:
+        assert seen == indices.tolist()
+
+
+def test_block_shuffle_loader_follows_manual_seed(dataset):
+    loader = BlockShuffleLoader(dataset, batch_size=10, shuffle=True, block_size=16)
+    torch.manual_seed(0)
+    first = rows_seen(loader)
+    torch.manual_seed(0)
+    assert rows_seen(loader) == first
+
+
+def test_get_iterator_reads_subsets_in_blocks(exact_net, dataset):
+    iterator = exact_net.get_iterator(Subset(dataset, range(80)), training=True)
+    assert isinstance(iterator, BlockShuffleLoader)
+
+
+def test_get_iterator_checks_dtype(exact_net, dataset):
+    exact_net.set_params(dtype="float64")
+    with pytest.raises(ValueError, match="dtype=torch.float64"):
+        exact_net.get_iterator(dataset, training=True)
+
+
+def test_get_iterator_rejects_dataloader_params(exact_net, dataset):
+    exact_net.set_params(iterator_train__num_workers=2)
+    with pytest.raises(ValueError, match="iterator_train__num_workers"):
+        exact_net.get_iterator(dataset, training=True)
+
+
+def test_get_full_batch_returns_the_data(exact_net, data):
+    X, y = data
+    Xi, yi = exact_net.get_full_batch(exact_net.get_dataset(X, y), training=True)
+    assert Xi.data_ptr() == X.data_ptr()
+    assert yi.data_ptr() == y.data_ptr()
+
+    exact_net.set_params(iterator_train__num_workers=0)
+    assert exact_net.get_full_batch(exact_net.get_dataset(X, y), training=True) is None
+
+
+def test_get_full_batch_of_split_matches_dataloader(exact_net, data):
+    X, y = data
+    dataset_train, dataset_valid = CVSplit(5)(exact_net.get_dataset(X, y))
+    for dataset in [dataset_train, dataset_valid]:
+        Xi, yi = exact_net.get_full_batch(dataset)
+        Xl, yl = next(iter(exact_net.get_iterator(dataset)))
+        assert torch.equal(Xi, Xl)
+        assert torch.equal(yi, yl)
+
+
+def test_full_batch_fit_matches_dataloader_fit(exact_net_cls):
+    X, y = make_data()
+    X_test, _ = make_data(n_samples=11, seed=1)
+    params = {
+        "batch_size": -1,
+        "max_epochs": 3,
+        "train_split": None,
+        "verbose": 0,
+        "dtype": torch.float64,
+    }
+    fast = exact_net_cls(ExactModel, **params).fit(X, y)
+    # an iterator parameter makes the net go through the DataLoader
+    slow = exact_net_cls(ExactModel, iterator_train__num_workers=0, **params)
+    slow.fit(X, y)
+
+    np.testing.assert_allclose(
+        fast.history[:, "train_loss"], slow.history[:, "train_loss"], rtol=1e-6
+    )
+    np.testing.assert_allclose(
+        fast.predict_mean_var(X_test)[0], slow.predict_mean_var(X_test)[0], rtol=1e-6
+    )
@@ -0,0 +1,83 @@
+import inspect
+
+import gpytorch
+import numpy as np
+import pytest
+import torch
+
+from conftest import Distribution
+from conftest import ExactModel
+from conftest import make_data
+
+
+def _batch_kwargs(cls, batch_size):
+    # gpytorch >= 0.1 takes a batch_shape instead of a batch_size
+    if "batch_shape" in inspect.signature(cls.__init__).parameters:
+        return {"batch_shape": torch.Size([batch_size])}
+    return {"batch_size": batch_size}
+
+
+class BatchModel(gpytorch.models.ExactGP):
+    """``ExactModel`` with one set of hyperparameters per series."""
+
+    def __init__(self, train_x, train_y, likelihood, batch_size=1):
+        super(BatchModel, self).__init__(train_x, train_y, likelihood)
+        self.mean_module = gpytorch.means.ConstantMean(
+            **_batch_kwargs(gpytorch.means.ConstantMean, batch_size)
+        )
+        self.covar_module = gpytorch.kernels.RBFKernel(
+            **_batch_kwargs(gpytorch.kernels.Kernel, batch_size)
+        )
+
+    def forward(self, x):
+        return Distribution(self.mean_module(x), self.covar_module(x))
+
+
+def test_fit_many_matches_separate_fits(exact_net_cls):
+    # two series of the same length are fit as one batch
+    series = [
+        make_data(n_samples=n, seed=seed) for n, seed in [(30, 0), (30, 1), (20, 2)]
+    ]
+    Xs = [X for X, _ in series]
+    ys = [y for _, y in series]
+    params = {"max_epochs": 5, "verbose": 0, "dtype": torch.float64}
+    net = exact_net_cls(BatchModel, **params).fit_many(Xs, ys)
+    assert len(net.series_nets_) == 2
+    X_test = torch.linspace(0, 1, 7).unsqueeze(-1)
+    predictions = net.predict_many([X_test] * len(Xs))
+
+    for i, (X, y) in enumerate(series):
+        single = exact_net_cls(ExactModel, train_split=None, **params).fit(X, y)
+        mean, var = single.predict_mean_var(X_test)
+        np.testing.assert_allclose(predictions[i][0], mean, rtol=1e-4, atol=1e-6)
+        np.testing.assert_allclose(predictions[i][1], var, rtol=1e-4, atol=1e-6)
+        np.testing.assert_allclose(
+            net.get_series_history(i),
+            single.history[:, "train_loss"],
+            rtol=1e-4,
+        )
+
+
+class SharedMeanModel(BatchModel):
+    """``BatchModel`` whose mean is shared by all series."""
+
+    def __init__(self, train_x, train_y, likelihood, batch_size=1):
+        super(SharedMeanModel, self).__init__(
+            train_x, train_y, likelihood, batch_size=batch_size
+        )
+        self.mean_module = gpytorch.means.ConstantMean()
+
+
+def test_fit_many_batches_the_likelihood(exact_net_cls):
+    X, y = make_data(n_samples=30)
+    net = exact_net_cls(BatchModel, verbose=0)._get_series_net(3)
+    net.initialize(torch.stack([X] * 3), torch.stack([y] * 3))
+    for name, param in net.likelihood_.named_parameters():
+        assert param.shape[0] == 3, name
+
+
+def test_fit_many_rejects_parameters_shared_by_the_series(exact_net_cls):
+    X, y = make_data(n_samples=30)
+    net = exact_net_cls(SharedMeanModel, verbose=0)
+    with pytest.raises(ValueError, match="one set of hyperparameters per series"):
+        net.fit_many([X, X], [y, y])
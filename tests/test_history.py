@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from gpwrapper.callbacks import HistoryExport
+from gpwrapper.history import ColumnarHistory
+from gpwrapper.history import export_history
+from gpwrapper.history import read_history_export
+
+from conftest import ExactModel
+
+
+def make_history(n_epochs=3, n_batches=4):
+    history = ColumnarHistory()
+    for epoch in range(n_epochs):
+        history.new_epoch()
+        history.record("epoch", epoch + 1)
+        for batch in range(n_batches):
+            history.new_batch()
+            history.record_batch("train_loss", 1.0 / (epoch + batch + 1))
+            history.record_batch("train_batch_size", 8)
+            if batch % 2:
+                # a masked column
+                history.record_batch("valid_loss", float(batch))
+            history.record_batch("tags", ["a", batch])
+        history.record("train_loss", float(epoch))
+    return history
+
+
+def test_export_round_trip(tmp_path):
+    history = make_history()
+    path = str(tmp_path / "history.npy")
+    assert export_history(history, path) == 3
+
+    loaded = read_history_export(path)
+    assert loaded.to_list() == history.to_list()
+    assert loaded[:, "train_loss"] == [0.0, 1.0, 2.0]
+    assert loaded[-1, "batches", :, "valid_loss"] == [1.0, 3.0]
+    assert loaded[0, "batches", 1, ("train_loss", "tags")] == history[
+        0, "batches", 1, ("train_loss", "tags")
+    ]
+
+
+def test_export_appends_from_start(tmp_path):
+    history = make_history(n_epochs=2)
+    path = str(tmp_path / "history.npy")
+    start = export_history(history, path)
+    history.new_epoch()
+    history.record("epoch", 3)
+    history.new_batch()
+    history.record_batch("train_loss", 0.5)
+    assert export_history(history, path, start=start) == 3
+
+    loaded = read_history_export(path)
+    assert loaded[:, "epoch"] == [1, 2, 3]
+    assert loaded.to_list() == history.to_list()
+
+
+def test_indexing_like_skorch_history():
+    # pylint: disable=pointless-statement
+    history = make_history()
+    with pytest.raises(KeyError):
+        history[:, "missing"]
+    with pytest.raises(KeyError):
+        history[0, "batches", 0, "train_loss", "extra"]
+    with pytest.warns(DeprecationWarning):
+        assert history[0, "batches", "train_batch_size"] == [8, 8, 8, 8]
+
+
+def test_history_export_callback(exact_net_cls, data, tmp_path):
+    X, y = data
+    path = str(tmp_path / "history.npy")
+    net = exact_net_cls(
+        ExactModel,
+        batch_size=-1,
+        max_epochs=2,
+        train_split=None,
+        verbose=0,
+        callbacks=[("export", HistoryExport(path))],
+    )
+    net.fit(X, y)
+    net.partial_fit(X, y)
+    loaded = read_history_export(path)
+    assert loaded[:, "epoch"] == [1, 2, 3, 4]
+    np.testing.assert_allclose(
+        loaded[:, "batches", :, "train_loss"],
+        net.history[:, "batches", :, "train_loss"],
+    )
+
+    # fit starts the file over
+    net.fit(X, y)
+    assert read_history_export(path)[:, "epoch"] == [1, 2]
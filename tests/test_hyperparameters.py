@@ -0,0 +1,90 @@
+import warnings
+
+import gpytorch
+import numpy as np
+import pytest
+import torch
+
+from gpwrapper.hyperparameters import _bounds
+from gpwrapper.hyperparameters import initialize_from_data
+from gpwrapper.models import ExactGPModel
+
+from conftest import ExactModel
+
+
+@pytest.mark.parametrize("input_scale", [1, 100])
+def test_data_init_recovers_known_scales(input_scale):
+    rng = np.random.RandomState(0)
+    width = 4 * np.pi * input_scale
+    X = rng.uniform(0, width, size=(2000, 1))
+    # mean 5, signal variance 2 and noise variance 0.09
+    y = 5 + 2 * np.sin(X[:, 0] / input_scale) + 0.3 * rng.randn(len(X))
+    likelihood = gpytorch.likelihoods.GaussianLikelihood()
+    module = ExactGPModel(
+        torch.as_tensor(X, dtype=torch.float32),
+        torch.as_tensor(y, dtype=torch.float32),
+        likelihood,
+    )
+
+    values = initialize_from_data(module, likelihood, X, y)
+
+    # the median distance between uniform points on [0, width]
+    expected_lengthscale = (1 - 2 ** -0.5) * width
+    assert values["lengthscale"][0][0] == pytest.approx(expected_lengthscale, rel=0.1)
+    assert values["noise"] == pytest.approx(0.09, rel=0.2)
+    assert values["outputscale"] == pytest.approx(2, rel=0.15)
+    assert values["constant"] == pytest.approx(5, abs=0.1)
+
+    lengthscale = module.covar_module.lengthscale
+    assert float(lengthscale) == pytest.approx(values["lengthscale"][0][0], rel=1e-4)
+    assert float(likelihood.noise) == pytest.approx(values["noise"], rel=1e-4)
+    outputscale = module.log_outputscale.exp()
+    assert float(outputscale) == pytest.approx(values["outputscale"], rel=1e-4)
+    constant = module.mean_module.constant
+    assert float(constant) == pytest.approx(values["constant"], rel=1e-4)
+
+
+def test_data_init_clips_noise_into_bounds(exact_net_cls, data):
+    X, y = data
+    net = exact_net_cls(
+        ExactModel,
+        verbose=0,
+        init_hyperparameters=True,
+        likelihood__log_noise_bounds=(-10, -5),
+    )
+    # targets whose noise estimate is below the bounds
+    with pytest.warns(UserWarning, match="noise .* was clipped into its bounds"):
+        net.initialize(X, y * 1e-4)
+    noise_module = next(
+        m for m in net.likelihood_.modules() if _bounds(m, "noise") != (None, None)
+    )
+    lower, upper = _bounds(noise_module, "noise")
+    noise = net.hyperparameter_init_["noise"]
+    assert noise >= float(lower)
+    assert upper is None or noise <= float(upper)
+
+
+def test_data_init_noise_is_not_capped_by_the_default_bounds(exact_net_cls):
+    gen = torch.Generator().manual_seed(0)
+    X = torch.rand(500, 1, generator=gen) * 10
+    y = torch.sin(X[:, 0]) + 0.3 * torch.randn(len(X), generator=gen)
+    net = exact_net_cls(ExactModel, verbose=0, init_hyperparameters=True)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", UserWarning)
+        net.initialize(X, y)
+    assert net.hyperparameter_init_["noise"] == pytest.approx(0.09, rel=0.3)
+    assert float(net.likelihood_.noise) == pytest.approx(
+        net.hyperparameter_init_["noise"], rel=1e-4
+    )
+
+
+def test_init_hyperparameters_params_are_routed(exact_net_cls):
+    net = exact_net_cls(ExactModel, init_hyperparameters__quantile=0.25)
+    net.set_params(init_hyperparameters=True, init_hyperparameters__n_subsample=50)
+    params = net.get_params()
+    assert params["init_hyperparameters"] is True
+    assert params["init_hyperparameters__quantile"] == 0.25
+    assert net._get_params_for("init_hyperparameters") == {
+        "quantile": 0.25,
+        "n_subsample": 50,
+    }
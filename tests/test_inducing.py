@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from scipy.spatial import Delaunay
+
+from gpwrapper import VariationalGaussianProcessRegressor
+from gpwrapper.inducing import select_inducing_points
+from gpwrapper.models import VariationalGPModel
+
+from conftest import ExactModel
+
+
+def test_inducing_params_are_routed():
+    net = VariationalGaussianProcessRegressor(ExactModel, inducing__n_iter=5)
+    net.set_params(inducing_method="greedy_variance", inducing__random_state=1)
+    params = net.get_params()
+    assert params["inducing_method"] == "greedy_variance"
+    assert params["inducing__n_iter"] == 5
+    assert net._get_params_for("inducing") == {"n_iter": 5, "random_state": 1}
+    assert not any("inducing_method".startswith(p) for p in net.prefixes_)
+
+
+def clustered_data(n_samples=300, seed=0):
+    """Return 2-D inputs in three small clusters far apart, and smooth
+    targets."""
+    rng = np.random.RandomState(seed)
+    centers = np.array([[0.0, 0.0], [4.0, 0.0], [2.0, 4.0]])
+    X = centers[rng.randint(len(centers), size=n_samples)]
+    X = X + 0.3 * rng.randn(n_samples, 2)
+    y = np.sin(X[:, 0]) + np.cos(X[:, 1]) + 0.05 * rng.randn(n_samples)
+    return X.astype(np.float32), y.astype(np.float32)
+
+
+@pytest.mark.parametrize("method", ["kmeans", "greedy_variance"])
+def test_inducing_points_are_distinct_and_inside_the_data(method):
+    X, _ = clustered_data()
+    points = select_inducing_points(X, 12, method=method, random_state=0)
+    assert points.shape == (12, 2)
+    assert len(np.unique(points, axis=0)) == 12
+    assert (Delaunay(X).find_simplex(points) >= 0).all()
+
+
+def random_inducing_points(X, n_inducing, random_state=0):
+    # uniform in the bounding box of the data
+    rng = np.random.RandomState(random_state)
+    X = np.asarray(X)
+    return rng.uniform(X.min(0), X.max(0), size=(n_inducing, X.shape[1]))
+
+
+def fit_with(method):
+    X, y = clustered_data()
+    net = VariationalGaussianProcessRegressor(
+        VariationalGPModel,
+        n_inducing=6,
+        inducing_method=method,
+        batch_size=-1,
+        max_epochs=30,
+        train_split=None,
+        verbose=0,
+    )
+    net.fit(X, y)
+    X_test, y_test = clustered_data(n_samples=100, seed=1)
+    mse = float(np.mean((net.predict(X_test).numpy() - y_test) ** 2))
+    return net.history[-1, "train_loss"], mse
+
+
+@pytest.mark.parametrize("method", ["kmeans", "greedy_variance"])
+def test_selected_inducing_points_beat_random_ones(method):
+    loss, mse = fit_with(method)
+    random_loss, random_mse = fit_with(random_inducing_points)
+    # the train loss is the negative ELBO
+    assert loss < random_loss
+    assert mse < random_mse
@@ -0,0 +1,38 @@
+import pytest
+import torch
+
+from conftest import ExactModel
+
+
+def test_fit_with_lbfgs_records_the_closure_losses(exact_net_cls, data):
+    net = exact_net_cls(
+        ExactModel,
+        optimizer=torch.optim.LBFGS,
+        optimizer__max_iter=5,
+        optimizer__line_search_fn="strong_wolfe",
+        lr=1,
+        batch_size=-1,
+        max_epochs=3,
+        train_split=None,
+        verbose=0,
+        dtype=torch.float64,
+    )
+    net.fit(*data)
+
+    for batches in net.history[:, "batches"]:
+        assert len(batches) == 1
+        closure_losses = batches[0]["closure_losses"]
+        assert len(closure_losses) > 1
+        # the step's loss is the one before the parameters were updated
+        assert batches[0]["train_loss"] == pytest.approx(closure_losses[0])
+        assert closure_losses[-1] < closure_losses[0]
+    train_losses = net.history[:, "train_loss"]
+    assert all(b < a for a, b in zip(train_losses, train_losses[1:]))
+
+
+def test_fit_with_adam_records_a_single_closure_loss(exact_net_cls, data):
+    net = exact_net_cls(ExactModel, max_epochs=2, train_split=None, verbose=0)
+    net.fit(*data)
+    for batches in net.history[:, "batches"]:
+        for batch in batches:
+            assert batch["closure_losses"] == [pytest.approx(batch["train_loss"])]
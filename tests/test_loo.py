@@ -0,0 +1,93 @@
+import math
+
+import gpytorch
+import pytest
+from skorch.history import History
+import torch
+
+from gpwrapper import loo_scores
+from gpwrapper.history import ColumnarHistory
+
+from conftest import ExactModel
+from conftest import make_data
+
+
+def _predict(model, likelihood, X_train, y_train, X_test):
+    model.set_train_data(X_train, y_train, strict=False)
+    model.eval()
+    likelihood.eval()
+    with torch.no_grad():
+        pred = likelihood(model(X_test))
+    mean = pred.mean() if callable(pred.mean) else pred.mean
+    var = pred.var() if callable(getattr(pred, "var", None)) else pred.variance
+    return mean.item(), var.item()
+
+
+def test_loo_scores_match_refits_without_each_point():
+    X, y = make_data(n_samples=25)
+    X, y = X.double(), y.double()
+    likelihood = gpytorch.likelihoods.GaussianLikelihood().double()
+    model = ExactModel(X, y, likelihood).double()
+    model.train()
+    likelihood.train()
+    with torch.no_grad():
+        nlpd, mse = loo_scores(likelihood(model(X)), y)
+
+    log_densities, sq_errors = [], []
+    for i in range(len(X)):
+        keep = torch.arange(len(X)) != i
+        mean, var = _predict(model, likelihood, X[keep], y[keep], X[i:i + 1])
+        sq_error = (y[i].item() - mean) ** 2
+        sq_errors.append(sq_error)
+        log_densities.append(-0.5 * (math.log(2 * math.pi * var) + sq_error / var))
+
+    assert nlpd == pytest.approx(-sum(log_densities) / len(X), rel=1e-5)
+    assert mse == pytest.approx(sum(sq_errors) / len(X), rel=1e-5)
+
+
+def test_loo_validation_warns_for_large_data(exact_net_cls, data, monkeypatch):
+    import gpwrapper
+
+    X, y = data
+    monkeypatch.setattr(gpwrapper, "LOO_WARN_SAMPLES", len(X) - 1)
+    net = exact_net_cls(
+        ExactModel, batch_size=-1, max_epochs=1, loo_validation=True, verbose=0
+    )
+    with pytest.warns(UserWarning, match="loo_validation factorizes"):
+        net.fit(X, y)
+    assert net.history[-1, "valid_mse"] > 0
+
+
+def test_loo_validation_every_k_epochs(exact_net_cls, data):
+    X, y = data
+    net = exact_net_cls(
+        ExactModel, batch_size=-1, max_epochs=4, loo_validation=2, verbose=0
+    )
+    net.fit(X, y)
+    assert [("valid_loss" in row) for row in net.history] == [False, True, False, True]
+    assert all(("valid_mse" in row) == ("valid_loss" in row) for row in net.history)
+
+
+@pytest.mark.parametrize("history_cls", [History, ColumnarHistory])
+def test_valid_loss_only_recorded_in_scored_epochs(exact_net_cls, history_cls):
+    net = exact_net_cls(ExactModel, verbose=0)
+    net.history = history_cls()
+    scoring = dict(net.get_default_callbacks())["valid_loss"]
+    scoring.initialize()
+    for epoch, scores in enumerate([[0.5], [], [0.4], []]):
+        net.history.new_epoch()
+        net.history.record("epoch", epoch + 1)
+        net.history.new_batch()
+        net.history.record_batch("train_loss", 1.0)
+        for score in scores:
+            net.history.record_batch("valid_loss", score)
+            net.history.record_batch("valid_batch_size", 10)
+        scoring.on_epoch_end(net)
+    assert [("valid_loss" in row) for row in net.history] == [True, False, True, False]
+    assert [("valid_loss_best" in row) for row in net.history] == [
+        True,
+        False,
+        True,
+        False,
+    ]
+    assert net.history[2, "valid_loss"] == pytest.approx(0.4)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+import torch
+import torch.multiprocessing as mp
+
+from skorch.dataset import Dataset
+
+from gpwrapper.parallel import predict_sharded
+from gpwrapper.parallel import shared_empty
+
+from conftest import make_data
+
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in mp.get_all_start_methods(), reason="needs fork"
+)
+
+
+@pytest.fixture
+def X_test():
+    return make_data(n_samples=37, seed=1)[0].numpy()
+
+
+@pytest.fixture
+def expected(exact_net, X_test):
+    mean = np.empty(len(X_test), dtype=np.float32)
+    var = np.empty(len(X_test), dtype=np.float32)
+    return exact_net.predict_into(X_test, mean, var, chunk_size=5)
+
+
+def test_predict_sharded_matches_single_process(exact_net, X_test, expected):
+    mean = shared_empty(len(X_test), np.float32)
+    var = shared_empty(len(X_test), np.float32)
+    predict_sharded(exact_net, X_test, mean, var, n_jobs=2, chunk_size=4)
+    np.testing.assert_allclose(mean, expected[0], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(var, expected[1], rtol=1e-5, atol=1e-6)
+
+
+def test_predict_sharded_into_memmap(exact_net, X_test, expected, tmp_path):
+    mean = np.lib.format.open_memmap(
+        str(tmp_path / "mean.npy"), mode="w+", dtype=np.float32, shape=(len(X_test),)
+    )
+    exact_net.predict_into(X_test, mean, n_jobs=2, chunk_size=4)
+    mean.flush()
+    np.testing.assert_allclose(
+        np.load(str(tmp_path / "mean.npy")), expected[0], rtol=1e-5, atol=1e-6
+    )
+
+
+def test_predict_sharded_dataset(exact_net, X_test, expected):
+    mean = shared_empty(len(X_test), np.float32)
+    predict_sharded(exact_net, Dataset(X_test, None), mean, n_jobs=2)
+    np.testing.assert_allclose(mean, expected[0], rtol=1e-5, atol=1e-6)
+
+
+def test_predict_mean_var_n_jobs(exact_net, X_test, expected):
+    mean, var = exact_net.predict_mean_var(X_test, n_jobs=2, chunk_size=4)
+    np.testing.assert_allclose(mean, expected[0], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(var, expected[1], rtol=1e-5, atol=1e-6)
+
+
+def test_predict_sharded_rejects_private_output(exact_net, X_test):
+    mean = np.empty(len(X_test), dtype=np.float32)
+    with pytest.raises(ValueError, match="not shared"):
+        exact_net.predict_into(X_test, mean, n_jobs=2)
+
+
+def test_predict_sharded_after_multithreaded_predict(exact_net, X_test, expected):
+    n_threads = torch.get_num_threads()
+    torch.set_num_threads(2)
+    try:
+        # the parent's thread pool is in use before the workers fork
+        exact_net.predict_mean_var(make_data(n_samples=500, seed=2)[0])
+        mean = shared_empty(len(X_test), np.float32)
+        predict_sharded(exact_net, X_test, mean, n_jobs=2, chunk_size=4)
+        assert torch.get_num_threads() == 2
+    finally:
+        torch.set_num_threads(n_threads)
+    np.testing.assert_allclose(mean, expected[0], rtol=1e-5, atol=1e-6)
@@ -0,0 +1,39 @@
+import pickle
+
+import numpy as np
+import pytest
+import torch
+
+from conftest import make_data
+
+
+@pytest.mark.parametrize("protocol", [2, pickle.HIGHEST_PROTOCOL])
+def test_pickle_round_trip_keeps_predictions(exact_net, protocol):
+    X_test, _ = make_data(n_samples=11, seed=1)
+    expected = exact_net.predict_mean_var(X_test)
+
+    net = pickle.loads(pickle.dumps(exact_net, protocol=protocol))
+    mean, var = net.predict_mean_var(X_test)
+    np.testing.assert_allclose(mean, expected[0], rtol=1e-6)
+    np.testing.assert_allclose(var, expected[1], rtol=1e-6)
+
+
+def test_pickle_keeps_the_optimizer_on_the_module(exact_net, data):
+    net = pickle.loads(pickle.dumps(exact_net, protocol=5))
+    params = {id(param) for param in net.module_.parameters()}
+    optimized = {
+        id(param) for group in net.optimizer_.param_groups for param in group["params"]
+    }
+    assert optimized <= params
+    # the restored net keeps training
+    net.partial_fit(*data)
+    assert len(net.history) == len(exact_net.history) + 3
+
+
+def test_pickle_out_of_band_buffers(exact_net):
+    buffers = []
+    dump = pickle.dumps(exact_net, protocol=5, buffer_callback=buffers.append)
+    assert buffers
+    net = pickle.loads(dump, buffers=buffers)
+    for name, param in exact_net.module_.named_parameters():
+        assert torch.equal(dict(net.module_.named_parameters())[name], param)
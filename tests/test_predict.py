@@ -0,0 +1,106 @@
+import numpy as np
+import torch
+
+import gpwrapper
+
+from conftest import ExactModel
+from conftest import make_data
+from conftest import posterior_mean_var
+
+
+def test_predict_iter_does_not_leak_no_grad(exact_net):
+    X = make_data(n_samples=10, seed=1)[0]
+    for _ in exact_net.predict_iter(X, chunk_size=4):
+        assert torch.is_grad_enabled()
+
+
+def test_predict_iter_chunks_match_predict(exact_net):
+    X = make_data(n_samples=10, seed=1)[0]
+    means = [mean for mean, _ in exact_net.predict_iter(X, chunk_size=4)]
+    assert [len(mean) for mean in means] == [4, 4, 2]
+    torch.testing.assert_close(
+        torch.from_numpy(np.concatenate(means)),
+        exact_net.predict(X),
+        rtol=1e-5,
+        atol=1e-6,
+    )
+
+
+def test_default_chunk_size_bounds_the_covariance_memory(
+    exact_net_cls, data, monkeypatch
+):
+    X, y = data
+    net = exact_net_cls(ExactModel, verbose=0, dtype=torch.float64)
+    net.initialize(X, y)
+    # room for the covariance of the training data and 7 test samples
+    monkeypatch.setattr(gpwrapper, "PREDICTION_CHUNK_BYTES", len(X) * 8 * 7)
+    X_test = make_data(n_samples=20, seed=1)[0]
+    chunks = list(net._iter_prediction_chunks(X_test))
+    assert [len(chunk) for chunk in chunks] == [7, 7, 6]
+
+    net.set_params(iterator_test__batch_size=-1)
+    assert [len(chunk) for chunk in net._iter_prediction_chunks(X_test)] == [20]
+
+
+def test_predict_empty(exact_net):
+    y_pred = exact_net.predict(torch.empty(0, 1))
+    assert y_pred.shape == (0,)
+    assert y_pred.dtype == torch.float32
+
+
+def test_predict_mean_var_empty(exact_net):
+    mean, std = exact_net.predict_mean_var(np.empty((0, 1)), return_std=True)
+    assert mean.shape == std.shape == (0,)
+    assert mean.dtype == std.dtype == np.float32
+
+
+def assert_predicts_posterior(net, X_train, y_train, X_test):
+    mean, var = net.predict_mean_var(X_test)
+    expected_mean, expected_var = posterior_mean_var(net, X_train, y_train, X_test)
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(var, expected_var, rtol=1e-4, atol=1e-5)
+
+
+def test_prediction_cache_is_reused(exact_net, data):
+    X_test = make_data(n_samples=10, seed=1)[0]
+    cache = exact_net.prediction_cache_
+    assert cache is not None
+    assert_predicts_posterior(exact_net, *data, X_test)
+    exact_net.predict(X_test)
+    assert exact_net.prediction_cache_ is cache
+
+
+def test_prediction_cache_rebuilt_after_set_train_data(exact_net):
+    X_test = make_data(n_samples=10, seed=1)[0]
+    exact_net.predict(X_test)
+    cache = exact_net.prediction_cache_
+    X, y = make_data(n_samples=30, seed=2)
+    exact_net.module_.set_train_data(X, y, strict=False)
+    assert_predicts_posterior(exact_net, X, y, X_test)
+    assert exact_net.prediction_cache_ is not cache
+
+
+def test_prediction_cache_rebuilt_after_refit(exact_net, data):
+    X_test = make_data(n_samples=10, seed=1)[0]
+    before = exact_net.predict(X_test)
+    cache = exact_net.prediction_cache_
+    exact_net.partial_fit(*data)
+    assert_predicts_posterior(exact_net, *data, X_test)
+    assert exact_net.prediction_cache_ is not cache
+    assert not torch.allclose(exact_net.predict(X_test), before)
+
+    X, y = make_data(n_samples=30, seed=2)
+    exact_net.fit(X, y)
+    assert_predicts_posterior(exact_net, X, y, X_test)
+
+
+def test_prediction_cache_rebuilt_after_parameter_change(exact_net, data):
+    X_test = make_data(n_samples=10, seed=1)[0]
+    exact_net.predict(X_test)
+    cache = exact_net.prediction_cache_
+    # e.g. an optimizer step or load_state_dict outside of fit
+    with torch.no_grad():
+        for param in exact_net.module_.parameters():
+            param.add_(0.5)
+    assert_predicts_posterior(exact_net, *data, X_test)
+    assert exact_net.prediction_cache_ is not cache
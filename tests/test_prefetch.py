@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+import torch
+from torch.utils.data import DataLoader
+from torch.utils.data import TensorDataset
+
+from gpwrapper.dataset import PrefetchIterator
+
+
+class Counting(object):
+    """Yields 0, 1, ... and counts the items fetched; fails at
+    ``fail_at``."""
+
+    def __init__(self, n_items, fail_at=None):
+        self.n_items = n_items
+        self.fail_at = fail_at
+        self.n_fetched = 0
+
+    def __iter__(self):
+        for i in range(self.n_items):
+            if i == self.fail_at:
+                raise RuntimeError("failed at {}".format(i))
+            self.n_fetched += 1
+            yield i
+
+
+def prefetch_threads():
+    return [t for t in threading.enumerate() if t.name == "PrefetchIterator"]
+
+
+def test_prefetch_yields_all_items_in_order():
+    iterator = PrefetchIterator(Counting(50), n_prefetch=3, transform=lambda i: 2 * i)
+    assert list(iterator) == [2 * i for i in range(50)]
+    assert iterator.n_items == 50
+    assert list(iterator) == [2 * i for i in range(50)]
+    assert not prefetch_threads()
+
+
+def test_prefetch_empty():
+    assert list(PrefetchIterator(Counting(0))) == []
+
+
+@pytest.mark.parametrize("fail_at", [0, 5])
+def test_prefetch_reraises_errors(fail_at):
+    iterator = PrefetchIterator(Counting(50, fail_at=fail_at), n_prefetch=2)
+    seen = []
+    with pytest.raises(RuntimeError, match="failed at {}".format(fail_at)):
+        for item in iterator:
+            seen.append(item)
+    assert seen == list(range(fail_at))
+    assert not prefetch_threads()
+
+
+def test_prefetch_stops_early():
+    items = Counting(10000)
+    gen = iter(PrefetchIterator(items, n_prefetch=2))
+    assert [next(gen), next(gen)] == [0, 1]
+    gen.close()
+    assert not prefetch_threads()
+    n_fetched = items.n_fetched
+    assert n_fetched < 10
+    assert items.n_fetched == n_fetched
+
+
+def test_prefetch_shuffle_follows_manual_seed():
+    loader = DataLoader(TensorDataset(torch.arange(200)), batch_size=10, shuffle=True)
+
+    def order(prefetch):
+        torch.manual_seed(0)
+        batches = PrefetchIterator(loader, 2) if prefetch else loader
+        seen = []
+        for (batch,) in batches:
+            # the consumer draws random numbers while the worker runs
+            torch.rand(100)
+            seen.extend(batch.tolist())
+        return seen
+
+    expected = order(prefetch=False)
+    for _ in range(5):
+        assert order(prefetch=True) == expected
+
+
+def test_net_creates_converter_before_prefetching(exact_net, data):
+    exact_net.set_params(prefetch=2)
+    del exact_net.input_converter_
+    iterator = exact_net.get_prefetch_iterator([data])
+    assert exact_net.input_converter_.dtype == torch.float32
+    assert [Xi.shape for Xi, _ in iterator] == [data[0].shape]
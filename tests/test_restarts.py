@@ -0,0 +1,85 @@
+import math
+
+import torch
+from skorch.callbacks import Callback
+
+from conftest import ExactModel
+
+
+def fit(exact_net_cls, data, **kwargs):
+    net = exact_net_cls(
+        ExactModel,
+        batch_size=-1,
+        max_epochs=3,
+        train_split=None,
+        verbose=0,
+        n_restarts=3,
+        **kwargs
+    )
+    return net.fit(*data)
+
+
+def test_restarts_reproducible_with_random_state(exact_net_cls, data):
+    net0 = fit(exact_net_cls, data, restart_random_state=1)
+    net1 = fit(exact_net_cls, data, restart_random_state=1)
+    assert net0.restarts_ == net1.restarts_
+    assert len({restart["seed"] for restart in net0.restarts_}) == 3
+
+
+def test_restarts_leave_global_random_state(exact_net_cls, data):
+    torch.manual_seed(0)
+    expected = torch.rand(3)
+    torch.manual_seed(0)
+    fit(exact_net_cls, data, restart_random_state=1)
+    assert torch.equal(torch.rand(3), expected)
+
+
+def test_restarts_follow_manual_seed(exact_net_cls, data):
+    torch.manual_seed(0)
+    seeds0 = [restart["seed"] for restart in fit(exact_net_cls, data).restarts_]
+    torch.manual_seed(0)
+    seeds1 = [restart["seed"] for restart in fit(exact_net_cls, data).restarts_]
+    assert seeds0 == seeds1
+
+
+def test_parallel_restarts_leave_inputs_unshared(exact_net_cls, data):
+    X, y = data
+    fit(exact_net_cls, (X, y), n_jobs=2)
+    assert not X.is_shared()
+    assert not y.is_shared()
+
+
+class RandomInitModel(ExactModel):
+    """Draws from the global random number generator when built."""
+
+    def __init__(self, train_x, train_y, likelihood):
+        super(RandomInitModel, self).__init__(train_x, train_y, likelihood)
+        # e.g. a random initialization of a parameter
+        torch.rand(1)
+
+
+def test_restarts_leave_global_random_state_of_random_init(exact_net_cls, data):
+    torch.manual_seed(0)
+    expected = torch.rand(3)
+    torch.manual_seed(0)
+    exact_net_cls(
+        RandomInitModel,
+        batch_size=-1,
+        max_epochs=1,
+        train_split=None,
+        verbose=0,
+        n_restarts=2,
+        restart_random_state=1,
+    ).fit(*data)
+    assert torch.equal(torch.rand(3), expected)
+
+
+class Interrupt(Callback):
+    def on_batch_begin(self, net, **kwargs):
+        raise KeyboardInterrupt
+
+
+def test_restarts_interrupted_in_the_first_epoch(exact_net_cls, data):
+    net = fit(exact_net_cls, data, callbacks=[Interrupt()])
+    assert [restart["train_loss"] for restart in net.restarts_] == [math.inf] * 3
+    assert sum(restart["best"] for restart in net.restarts_) == 1
@@ -0,0 +1,87 @@
+import asyncio
+import gc
+import threading
+
+import numpy as np
+import pytest
+
+from gpwrapper.serving import PredictionService
+
+from conftest import ExactModel
+from conftest import make_data
+
+
+def service_threads():
+    return [t for t in threading.enumerate() if t.name == "PredictionService"]
+
+
+@pytest.fixture(autouse=True)
+def no_leftover_threads():
+    yield
+    for thread in service_threads():
+        thread.join(5)
+
+
+def test_apredict_proba_evaluates_on_the_worker(exact_net):
+    X = make_data(n_samples=7, seed=1)[0]
+    y_proba = asyncio.run(exact_net.apredict_proba(X))
+    mean, var = exact_net.predict_mean_var(X)
+    covar = getattr(y_proba, "covariance_matrix", None)
+    if covar is None:
+        covar = y_proba.covar()
+    assert not covar.requires_grad
+    np.testing.assert_allclose(covar.diagonal().numpy(), var, rtol=1e-4, atol=1e-6)
+    exact_net.close()
+
+
+def test_close_stops_the_service(exact_net):
+    X = make_data(n_samples=3, seed=1)[0]
+    with exact_net:
+        asyncio.run(exact_net.apredict(X))
+        assert len(service_threads()) == 1
+    assert not service_threads()
+    assert "prediction_service_" not in vars(exact_net)
+
+    # restarted on demand
+    asyncio.run(exact_net.apredict(X))
+    assert len(service_threads()) == 1
+    exact_net.close()
+    assert not service_threads()
+
+
+def test_service_stops_when_net_is_collected(exact_net_cls, data):
+    net = exact_net_cls(
+        ExactModel, batch_size=-1, max_epochs=1, train_split=None, verbose=0
+    )
+    net.fit(*data)
+    asyncio.run(net.apredict(data[0][:3]))
+    worker = service_threads()[0]
+    del net
+    gc.collect()
+    worker.join(5)
+    assert not worker.is_alive()
+
+
+def test_service_batches_mixed_dtypes_and_isolates_failures(exact_net):
+    X = make_data(n_samples=9, seed=1)[0]
+    expected, _ = exact_net.predict_mean_var(X)
+    with PredictionService(exact_net, max_latency=1.0, max_batch_size=9) as service:
+        futures = [
+            service.submit(X[:3].numpy().astype(np.float64)),
+            service.submit(np.ones((3, 2))),  # wrong number of features
+            service.submit(X[3:6]),
+            service.submit(X[6:].numpy()),
+        ]
+        with pytest.raises(RuntimeError):
+            futures[1].result(timeout=10)
+        means = [futures[i].result(timeout=10)[0] for i in (0, 2, 3)]
+    np.testing.assert_allclose(np.concatenate(means), expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "X, error", [(np.float32(1.0), ValueError), (np.array(["a", "b"]), TypeError)]
+)
+def test_service_rejects_malformed_requests(exact_net, X, error):
+    with PredictionService(exact_net) as service:
+        with pytest.raises(error):
+            service.submit(X)
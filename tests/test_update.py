@@ -0,0 +1,64 @@
+import warnings
+
+import numpy as np
+import pytest
+import torch
+
+from conftest import ExactModel
+from conftest import make_data
+from conftest import posterior_mean_var
+
+
+def fit_first(exact_net_cls, X, y, n_first=40):
+    net = exact_net_cls(
+        ExactModel,
+        batch_size=-1,
+        max_epochs=3,
+        train_split=None,
+        verbose=0,
+        dtype=torch.float64,
+    )
+    return net.fit(X[:n_first], y[:n_first])
+
+
+def test_update_matches_posterior_of_all_data(exact_net_cls):
+    X, y = make_data()
+    X, y = X.double(), y.double()
+    X_test = torch.linspace(0, 1, 11, dtype=torch.float64).unsqueeze(-1)
+    net = fit_first(exact_net_cls, X, y)
+    if not hasattr(net.module_, "get_fantasy_model"):
+        pytest.skip("this gpytorch version has no fantasy models")
+    expected = posterior_mean_var(net, X, y, X_test)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        net.update(X[40:], y[40:])
+    assert net.update_method_ == "fantasy_model"
+    assert len(net.module_.train_targets) == len(y)
+    mean, var = net.predict_mean_var(X_test)
+    np.testing.assert_allclose(mean, expected[0], rtol=1e-5, atol=1e-8)
+    np.testing.assert_allclose(var, expected[1], rtol=1e-5, atol=1e-8)
+
+
+def test_update_without_prediction_strategy(exact_net_cls, monkeypatch):
+    # as with gpytorch versions without prediction strategies, the
+    # training data is replaced and the posterior recomputed
+    X, y = make_data()
+    X, y = X.double(), y.double()
+    X_test = torch.linspace(0, 1, 11, dtype=torch.float64).unsqueeze(-1)
+    net = fit_first(exact_net_cls, X, y)
+    expected = posterior_mean_var(net, X, y, X_test)
+    module = net.module_
+    monkeypatch.setattr(net, "_load_prediction_cache", lambda: None)
+    module.prediction_strategy = None
+
+    with pytest.warns(UserWarning, match="recomputed in O"):
+        net.update(X[40:], y[40:])
+    monkeypatch.undo()
+    assert net.update_method_ == "recompute"
+    assert net.module_ is module
+    assert net.prediction_cache_ is None
+    assert len(module.train_targets) == len(y)
+    mean, var = net.predict_mean_var(X_test)
+    np.testing.assert_allclose(mean, expected[0], rtol=1e-5, atol=1e-8)
+    np.testing.assert_allclose(var, expected[1], rtol=1e-5, atol=1e-8)
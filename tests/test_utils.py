@@ -0,0 +1,156 @@
+import time
+
+import gpytorch
+import numpy as np
+import torch
+
+from gpwrapper.utils import InputConverter
+from gpwrapper.utils import PhaseTimer
+
+from conftest import Distribution
+from conftest import ExactModel
+from conftest import make_data
+
+
+def slow_items(n_items, delay):
+    for i in range(n_items):
+        yield i
+    time.sleep(delay)
+
+
+def test_iterate_does_not_count_the_final_next():
+    timer = PhaseTimer()
+    items = []
+    for item in timer.iterate(slow_items(2, delay=0.05), "data"):
+        items.append(item)
+        assert set(timer.pop()) == {"data"}
+    assert items == [0, 1]
+    assert timer.pop() == {}
+
+
+def test_iterate_keeps_earlier_durations_of_the_phase():
+    timer = PhaseTimer()
+    with timer("data"):
+        time.sleep(0.01)
+    list(timer.iterate(slow_items(0, delay=0.05), "data"))
+    assert 0.01 <= timer.pop()["data"] < 0.05
+
+
+class SlowModel(ExactModel):
+    """``ExactModel`` whose forward pass takes at least 20ms."""
+
+    def forward(self, x):
+        time.sleep(0.02)
+        return super(SlowModel, self).forward(x)
+
+
+def _dur_keys(row):
+    return {key for key in row if key.startswith("dur_")}
+
+
+def test_fit_records_phase_durations(exact_net_cls, data):
+    net = exact_net_cls(
+        ExactModel, max_epochs=2, train_split=None, verbose=0, time_phases=True
+    )
+    net.fit(*data)
+    net.partial_fit(*data)
+    assert len(net.history) == 4
+    phases = {"data", "infer", "get_loss", "backward", "step"}
+    for row in net.history:
+        assert {"dur_" + phase for phase in phases} <= _dur_keys(row)
+        for batch in row["batches"]:
+            assert _dur_keys(batch) == _dur_keys(row)
+
+
+def test_step_duration_excludes_the_closure_phases(exact_net_cls, data):
+    net = exact_net_cls(
+        SlowModel,
+        optimizer=torch.optim.LBFGS,
+        optimizer__max_iter=5,
+        optimizer__line_search_fn="strong_wolfe",
+        lr=1,
+        max_epochs=1,
+        train_split=None,
+        verbose=0,
+        time_phases=True,
+        dtype=torch.float64,
+    )
+    net.fit(*data)
+    batch = net.history[-1, "batches", -1]
+    n_calls = len(batch["closure_losses"])
+    assert n_calls > 1
+    assert batch["dur_infer"] >= 0.02 * n_calls
+    assert batch["dur_step"] < batch["dur_infer"] / 2
+
+
+def test_fit_records_no_durations_by_default(exact_net_cls, data):
+    net = exact_net_cls(ExactModel, max_epochs=2, train_split=None, verbose=0)
+    net.fit(*data)
+    for row in net.history:
+        assert not _dur_keys(row)
+        assert not any(_dur_keys(batch) for batch in row["batches"])
+
+
+def test_converter_keeps_integer_dtypes_of_index_parts_and_targets():
+    converter = InputConverter(torch.float64)
+    X, i = converter((np.zeros((3, 1), dtype="f"), np.arange(3)))
+    assert X.dtype == torch.float64
+    assert i.dtype == torch.int64
+    assert converter(np.arange(3), keep_integer=True).dtype == torch.int64
+    mask = torch.ones(3, dtype=torch.bool)
+    assert converter({"mask": mask}, keep_integer=True)["mask"] is mask
+
+
+def test_converter_casts_integer_inputs():
+    converter = InputConverter(torch.float32)
+    X = converter(np.arange(6).reshape(3, 2))
+    assert X.dtype == torch.float32
+    np.testing.assert_array_equal(X.numpy(), np.arange(6).reshape(3, 2))
+    assert converter(torch.arange(3)).dtype == torch.float32
+    X, i = converter([np.arange(3), np.arange(3)])
+    assert X.dtype == torch.float32
+    assert i.dtype == torch.int64
+
+
+def test_fit_with_integer_inputs(exact_net_cls):
+    X, y = make_data(n_samples=20)
+    X = (X * 10).long().numpy()
+    net = exact_net_cls(
+        ExactModel, batch_size=-1, max_epochs=1, train_split=None, verbose=0
+    )
+    net.fit(X, y)
+    assert net.module_.train_inputs[0].dtype == torch.float32
+    assert net.predict(X[:5]).shape == (5,)
+
+
+class MultitaskModel(gpytorch.models.ExactGP):
+    def __init__(self, train_x, train_y, likelihood):
+        super(MultitaskModel, self).__init__(train_x, train_y, likelihood)
+        self.mean_module = gpytorch.means.ConstantMean()
+        self.covar_module = gpytorch.kernels.RBFKernel()
+        try:
+            self.task_covar_module = gpytorch.kernels.IndexKernel(n_tasks=2, rank=1)
+        except TypeError:  # gpytorch >= 0.1 renamed n_tasks
+            self.task_covar_module = gpytorch.kernels.IndexKernel(num_tasks=2, rank=1)
+
+    def forward(self, x, i):
+        assert not i.dtype.is_floating_point
+        covar = self.covar_module(x).mul(self.task_covar_module(i))
+        return Distribution(self.mean_module(x), covar)
+
+
+def test_fit_with_integer_task_indices(exact_net_cls):
+    X, y = make_data(n_samples=40)
+    i = (torch.arange(40) % 2).unsqueeze(-1)
+    net = exact_net_cls(
+        MultitaskModel,
+        batch_size=-1,
+        max_epochs=2,
+        train_split=None,
+        verbose=0,
+        dtype=torch.float64,
+    )
+    net.fit((X, i), y)
+    assert net.module_.train_inputs[1].dtype == torch.int64
+    mean = net.predict((X[:5], i[:5]))
+    assert mean.shape == (5,)